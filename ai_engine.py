@@ -1,117 +1,392 @@
 import flet as ft
 import pandas as pd
 import numpy as np
-import joblib
 import os
-import requests
+import re
+import sys
+import threading
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datos import cargar_dataset, agregar_derivadas
+from indices import IndiceDatos
+from equipos import construir_tabla_equipos, probabilidad
+from cache_predicciones import AlmacenPredicciones
+from modelos import RegistroModelos, ModeloNoDisponible
+from nombres import IndiceNombres, ALIAS_EQUIPOS, PALABRAS_CLUB
+from historial import HistorialChat
+from ingesta import LectorDelta
+import instrumentacion
+from instrumentacion import instrumentar, tramo, contar
+from almacen import AlmacenJugadores, FEATURES_VALOR, FEATURES_GK_PARADAS, IDX_VALOR, IDX_GK_PARADAS
 
 
-df = pd.read_csv("final.csv")
-df['Potencial'] = (df['SCA'] + df['Gls'] + df['Ast']) / df['Age']
-df['Eficiencia'] = df['Gls'] / (df['SoT'] + 1)
-df['DefImpact'] = df['Tkl'] + df['Int']
+# 🔹 DATOS DEL MOTOR
+# Todas las estructuras derivadas del dataset se construyen aquí, una vez.
+# usar_dataset() permite cambiar de dataset en caliente (benchmarks, datos
+# nuevos) sin reimportar el módulo.
+def usar_dataset(nuevo):
+    global df, indice, almacen, tabla_equipos, nombres_jugadores, nombres_equipos, predicciones
+    df = nuevo
+    
+    # Índice de búsqueda (nombre -> fila, equipo -> filas), construido una vez
+    indice = IndiceDatos(df)
+    
+    # Almacén compacto: matriz float64 con las features de los modelos por jugador
+    almacen = AlmacenJugadores(df, indice=indice)
+    
+    # Agregados por equipo (ataque, defensa, posesión...), un groupby al cargar
+    tabla_equipos = construir_tabla_equipos(df)
+    
+    # Resolución de nombres del chat: sin acentos, con erratas, por prefijo y con
+    # alias de equipos ("courtois", "real madrid cf", "barça")
+    nombres_jugadores = IndiceNombres(df['Player'].astype(str).tolist(), prioridad=df['Min'])
+    nombres_equipos = IndiceNombres(tabla_equipos.index, alias=ALIAS_EQUIPOS, ignorar=PALABRAS_CLUB)
+    
+    # Las predicciones precalculadas corresponden al dataset anterior
+    predicciones = None
+
+
+# Filas que llegan por ingesta.py (delta.jsonl): se aplican en caliente al
+# empezar cada consulta, sin recargar final.csv ni reiniciar
+flujo = LectorDelta(lambda: agregar_derivadas(cargar_dataset(imagenes=False)), derivadas=True)
+usar_dataset(flujo.df)
+SEPARADOR_PARTIDO = re.compile(r"\s+(?:vs\.?|contra)\s+", re.IGNORECASE)
+
+# Modelos: se cargan la primera vez que se usan.
+# MODELOS_MMAP=r mapea los arrays desde disco (páginas compartidas entre procesos).
+# MODELOS_COMPILADOS=rf_paradas,... | todos sirve esos bosques compilados (arboles.py).
+modelos = RegistroModelos(mmap_mode=os.environ.get("MODELOS_MMAP") or None)
+
+MODELOS_PORTERO = ["scaler_valor_porteros", "rf_valor_porteros", "scaler_paradas", "rf_paradas"]
+MODELOS_CAMPO = ["scaler_valor_jugadores", "rf_valor_jugadores", "rf_goles", "rf_asistencias"]
+
+# Columna de la respuesta -> (scaler, bosque, bloque de features). Si falta
+# alguno de los dos modelos sólo esa columna queda sin valor.
+PREDICCIONES_PORTERO = {
+    'Valor_M': ("scaler_valor_porteros", "rf_valor_porteros", IDX_VALOR),
+    'Paradas': ("scaler_paradas", "rf_paradas", IDX_GK_PARADAS),
+}
+PREDICCIONES_CAMPO = {
+    'Valor_M': ("scaler_valor_jugadores", "rf_valor_jugadores", IDX_VALOR),
+    'Goles': ("scaler_valor_jugadores", "rf_goles", IDX_VALOR),
+    'Asistencias': ("scaler_valor_jugadores", "rf_asistencias", IDX_VALOR),
+}
 
-df['Score_Ataque'] = df['xG']*2 + df['Gls'] + df['Ast'] + df['KP'] + df['PPA'] + df['CrsPA']
-df['Score_Defensa'] = df['Tkl'] + df['Int'] + df['Blocks'] + df['Clr'] + df['Def 3rd_stats_possession']
-df['Score_Posesion'] = df[['Live_stats_possession','Touches','PrgDist']].mean(axis=1)
+# Features (definidas en almacen.py junto con su posición en la matriz)
+features_valor = FEATURES_VALOR
+features_gk_paradas = FEATURES_GK_PARADAS
 
 
-rf_valor_jugadores = joblib.load("rf_valor_jugadores.pkl")
-scaler_valor_jugadores = joblib.load("scaler_valor_jugadores.pkl")
+def modelos_faltantes(familia):
+    return modelos.faltantes(sorted({m for scaler, bosque, _ in familia.values() for m in (scaler, bosque)}))
 
-rf_valor_porteros = joblib.load("rf_valor_porteros.pkl")
-scaler_valor_porteros = joblib.load("scaler_valor_porteros.pkl")
 
-rf_goles = joblib.load("rf_goles.pkl")
-rf_asistencias = joblib.load("rf_asistencias.pkl")
-rf_paradas = joblib.load("rf_paradas.pkl")
-scaler_paradas = joblib.load("scaler_paradas.pkl")
+# 🔹 CANCELACIÓN
+# Un hilo no se puede detener desde fuera: responder() anota la consulta que
+# atiende su hilo y las etapas pesadas (carga de un .pkl, escalado, cada
+# bosque) comprueban antes de empezar si se ha cancelado. Una etapa ya
+# empezada termina y su resultado se descarta.
+class ConsultaCancelada(Exception):
+    pass
 
-# Features
-features_valor = [
-    "Age","MP","Starts","Min","Touches","Carries","PrgDist",
-    "PrgC","PrgP","PrgR","Succ%","Gls","Ast","G+A",
-    "xG","xAG","KP","SCA","GCA","Tkl+Int","Blocks","FatigueIndex",
-    "Sh","SoT","SoT%","Sh/90","SoT/90","G/Sh","G/SoT"
-]
 
-features_gk_paradas = ["MP","Min","Rec","GCA","Tkl+Int","FatigueIndex"]
+_en_curso = threading.local()
 
 
+def comprobar_cancelada():
+    consulta = getattr(_en_curso, 'consulta', None)
+    if consulta is not None and consulta.cancelada:
+        contar("ai_engine.canceladas")
+        raise ConsultaCancelada()
+
+
+def predecir_familia(familia, X):
+    # Columna -> predicciones para las filas de X; cada scaler se aplica una
+    # vez aunque lo compartan varios bosques (los tres de campo)
+    escalados = {}
+    salida = {}
+    for columna, (scaler, bosque, bloque) in familia.items():
+        if modelos.faltantes([scaler, bosque]):
+            continue
+        if scaler not in escalados:
+            comprobar_cancelada()
+            with tramo("ai_engine.escalado"):
+                escalados[scaler] = modelos[scaler].transform(X[:, bloque])
+        comprobar_cancelada()
+        with tramo("ai_engine.bosque"):
+            salida[columna] = modelos[bosque].predict(escalados[scaler])
+    return salida
+
+
+@instrumentar()
 def predecir_jugador(nombre):
-    row = df[df['Player'].str.lower() == nombre.lower()]
-    if row.empty:
+    with tramo("ai_engine.nombres"):
+        encontrado = nombres_jugadores.resolver(nombre)
+    if encontrado is None:
+        sugerencias = nombres_jugadores.sugerencias(nombre)
+        if sugerencias:
+            return f"No se encontró ese jugador. ¿Quizás {', '.join(sugerencias)}?"
         return "No se encontró ese jugador."
+    comprobar_cancelada()
     
-    row = row.iloc[0]
+    # Si el nombre no era exacto se indica a quién corresponde la respuesta
+    cabecera = {} if encontrado.strip().lower() == nombre.strip().lower() else {'Jugador': encontrado}
     
-    if row['Pos'] == 'GK':
-        # Portero
-        X_gk = row[features_valor].values.reshape(1,-1)
-        X_gk_scaled = scaler_valor_porteros.transform(X_gk)
-        valor = rf_valor_porteros.predict(X_gk_scaled)[0]
-        
-        Xp = row[features_gk_paradas].values.reshape(1,-1)
-        Xp_scaled = scaler_paradas.transform(Xp)
-        paradas = rf_paradas.predict(Xp_scaled)[0]
-        
-        return {
-            'Tipo': 'Portero',
-            'Valor_M': round(valor,1),
-            'Paradas': int(paradas),
-            'FatigueIndex': round(row['FatigueIndex'],2)
-        }
+    # Respuesta servida desde la caché de predicciones si existe
+    if predicciones is not None and encontrado not in flujo.modificados:
+        resp = predicciones.buscar(encontrado)
+        if resp is not None:
+            contar("predicciones.cache_aciertos")
+            # Mismo aviso que la ruta sin caché si falta algún modelo
+            faltan = modelos_faltantes(PREDICCIONES_PORTERO if resp['Tipo'] == 'Portero' else PREDICCIONES_CAMPO)
+            return {**cabecera, **resp, **({'Sin modelo': ', '.join(faltan)} if faltan else {})}
+        contar("predicciones.cache_fallos")
+    
+    row = almacen.registro(encontrado)
+    
+    es_gk = row['Pos'] == 'GK'
+    familia = PREDICCIONES_PORTERO if es_gk else PREDICCIONES_CAMPO
+    faltan = modelos_faltantes(familia)
+    
+    # Mismos float64 que el CSV con el que se ajustaron scalers y bosques
+    pred = predecir_familia(familia, row.vector(slice(None)))
+    if not pred:
+        return f"No se puede valorar a este jugador: faltan los modelos {', '.join(faltan)}."
+    
+    resp = {**cabecera, 'Tipo': 'Portero' if es_gk else 'Campo'}
+    if 'Valor_M' in pred:
+        resp['Valor_M'] = round(pred['Valor_M'][0], 1)
+    if es_gk:
+        if 'Paradas' in pred:
+            resp['Paradas'] = int(pred['Paradas'][0])
     else:
-        # Campo
-        X_field = row[features_valor].values.reshape(1,-1)
-        X_field_scaled = scaler_valor_jugadores.transform(X_field)
-        valor = rf_valor_jugadores.predict(X_field_scaled)[0]
-        goles = rf_goles.predict(X_field_scaled)[0]
-        asistencias = rf_asistencias.predict(X_field_scaled)[0]
-        
-        return {
-            'Tipo': 'Campo',
-            'Valor_M': round(valor,1),
-            'Goles': round(goles,1),
-            'Asistencias': round(asistencias,1),
-            'FatigueIndex': round(row['FatigueIndex'],2)
-        }
+        for columna in ['Goles', 'Asistencias']:
+            if columna in pred:
+                resp[columna] = round(pred[columna][0], 1)
+    resp['FatigueIndex'] = round(row['FatigueIndex'], 2)
+    if faltan:
+        resp['Sin modelo'] = ', '.join(faltan)
+    return resp
+
+
+# 🔹 PREDICCIÓN POR LOTES
+# Una pasada de scaler por familia de modelos y un predict vectorizado sobre
+# todas las filas (porteros y jugadores de campo por separado).
+@instrumentar()
+def predecir_jugadores(nombres=None):
+    if nombres is None:
+        filas = np.arange(len(df))
+    else:
+        filas = [indice.posicion(n) for n in nombres]
+        filas = np.array([f for f in filas if f is not None], dtype=np.intp)
+    
+    sub = df.iloc[filas]
+    # Mismos valores (float64 del almacén) que la ruta individual
+    X = almacen.matriz[filas]
+    es_gk = (sub['Pos'] == 'GK').to_numpy()
+    
+    salida = pd.DataFrame({
+        'Player': sub['Player'].to_numpy(),
+        'Squad': sub['Squad'].to_numpy(),
+        'Pos': sub['Pos'].to_numpy(),
+        'Tipo': np.where(es_gk, 'Portero', 'Campo'),
+        'Valor_M': np.nan,
+        'Goles': np.nan,
+        'Asistencias': np.nan,
+        'Paradas': pd.array([pd.NA] * len(sub), dtype='Int64'),
+        'FatigueIndex': sub['FatigueIndex'].round(2).to_numpy()
+    }, index=sub.index)
+    
+    # Un modelo ausente deja su columna en NaN para esa familia, no aborta el
+    # lote; los que faltan quedan en salida.attrs['faltantes']
+    faltantes = []
+    for mascara, familia in [(es_gk, PREDICCIONES_PORTERO), (~es_gk, PREDICCIONES_CAMPO)]:
+        if not mascara.any():
+            continue
+        faltantes += modelos_faltantes(familia)
+        for columna, valores in predecir_familia(familia, X[mascara]).items():
+            if columna == 'Paradas':
+                salida.loc[mascara, columna] = np.trunc(valores).astype(np.int64)
+            else:
+                salida.loc[mascara, columna] = valores.round(1)
+    
+    salida = salida.reset_index(drop=True)
+    salida.attrs['faltantes'] = sorted(set(faltantes))
+    return salida
 
 
+@instrumentar()
 def predecir_partido(equipoA, equipoB):
-    dfA = df[df['Squad'].str.lower() == equipoA.lower()]
-    dfB = df[df['Squad'].str.lower() == equipoB.lower()]
+    with tramo("ai_engine.nombres"):
+        A = nombres_equipos.resolver(equipoA)
+        B = nombres_equipos.resolver(equipoB)
     
-    if dfA.empty or dfB.empty:
+    if A is None or B is None:
+        # Nombre desconocido o ambiguo ("Real"): se proponen los más parecidos
+        sugerencias = [nombres_equipos.sugerencias(e) for e, r in ((equipoA, A), (equipoB, B)) if r is None]
+        sugerencias = [s for lista in sugerencias for s in lista]
+        if sugerencias:
+            return f"No se encontraron datos para uno de los equipos. ¿Quizás {', '.join(sugerencias)}?"
         return "No se encontraron datos para uno de los equipos."
     
-    ataqueA = dfA['Score_Ataque'].sum()
-    defensaA = dfA['Score_Defensa'].sum()
-    posesionA = dfA['Score_Posesion'].mean()
+    ataqueA = tabla_equipos.at[A, 'Ataque']
+    defensaA = tabla_equipos.at[A, 'Defensa']
+    posesionA = tabla_equipos.at[A, 'Posesion']
     
-    ataqueB = dfB['Score_Ataque'].sum()
-    defensaB = dfB['Score_Defensa'].sum()
-    posesionB = dfB['Score_Posesion'].mean()
+    ataqueB = tabla_equipos.at[B, 'Ataque']
+    defensaB = tabla_equipos.at[B, 'Defensa']
+    posesionB = tabla_equipos.at[B, 'Posesion']
     
-    scoreA = (ataqueA / (defensaB + 1)) * 0.6 + posesionA*0.4
-    scoreB = (ataqueB / (defensaA + 1)) * 0.6 + posesionB*0.4
+    probA = probabilidad(ataqueA, defensaA, posesionA, ataqueB, defensaB, posesionB)
+    probB = 1 - probA
     
-    total = scoreA + scoreB
-    probA = scoreA / total
-    probB = scoreB / total
-    
-    analisis = f"Análisis: {equipoA} tiene ataque {round(ataqueA,1)} y posesión {round(posesionA,1)}; {equipoB} tiene defensa {round(defensaB,1)} y posesión {round(posesionB,1)}"
+    analisis = f"Análisis: {A} tiene ataque {round(ataqueA,1)} y posesión {round(posesionA,1)}; {B} tiene defensa {round(defensaB,1)} y posesión {round(posesionB,1)}"
     
     return {
-        'EquipoA': equipoA,
-        'EquipoB': equipoB,
+        'EquipoA': A,
+        'EquipoB': B,
         'ProbabilidadA': round(probA*100,1),
         'ProbabilidadB': round(probB*100,1),
         'Analisis': analisis
     }
 
 
-def main(page: ft.Page):
+# Caché persistente: se reconstruye sólo si cambian final.csv o algún .pkl.
+# Al importar sólo se lee (si existe); la construcción se lanza en segundo plano.
+# Su clave es la huella de final.csv, así que sólo guarda jugadores de la base:
+# los que tienen filas del delta (flujo.modificados) se quedan fuera y se
+# calculan al consultarlos. 'predicciones' se reasigna con _cerrojo_predicciones.
+_cerrojo_predicciones = threading.Lock()
+
+
+def preparar_predicciones():
+    global predicciones
+    recargas = flujo.recargas
+    excluidos = set(flujo.modificados)
+
+    def construir():
+        jugadores = [n for n in pd.unique(df['Player'].astype(str)) if n not in excluidos]
+        tabla = predecir_jugadores(jugadores)
+        # Jugadores que han llegado por el delta mientras se calculaba
+        return tabla[~tabla['Player'].astype(str).isin(flujo.modificados)].reset_index(drop=True)
+
+    try:
+        nuevas = AlmacenPredicciones.cargar_o_construir(construir)
+    except ModeloNoDisponible:
+        return
+    with _cerrojo_predicciones:
+        # Si la base se ha recargado entretanto, la caché es del dataset anterior
+        if flujo.recargas == recargas:
+            predicciones = nuevas
+
+predicciones = AlmacenPredicciones.cargar()
+
+
+def sincronizar_dataset():
+    global predicciones
+    with _cerrojo_predicciones:
+        recargas = flujo.recargas
+        if not flujo.sincronizar():
+            return
+        anteriores = predicciones
+        usar_dataset(flujo.df)
+        # La caché sigue valiendo para los jugadores que no han cambiado (se
+        # consulta flujo.modificados); si el delta se consolidó, es la de final.csv
+        predicciones = anteriores if flujo.recargas == recargas else AlmacenPredicciones.cargar()
+
+
+# 🔹 RESPUESTAS DEL CHAT
+# Texto de la consulta -> texto de la respuesta. Se ejecuta en el pool de
+# inferencia, nunca en el bucle de eventos de la interfaz. Con TRAZAS=1 cada
+# consulta es un ciclo de la instrumentación. Con 'consulta' se lanza
+# ConsultaCancelada en cuanto se cancele (entre etapas).
+def responder(text, consulta=None):
+    instrumentacion.nuevo_ciclo()
+    _en_curso.consulta = consulta
+    try:
+        with tramo("ai_engine.responder"):
+            comprobar_cancelada()
+            with tramo("ai_engine.ingesta"):
+                sincronizar_dataset()
+            comprobar_cancelada()
+            return _responder(text)
+    finally:
+        _en_curso.consulta = None
+
+
+def _responder(text):
+    if text.strip().lower() == "/trazas":
+        return resumen_trazas()
+    
+    if text.strip().lower() == "/modelos":
+        # Estado del registro y tiempos de carga
+        lineas = [f"{n}: {estado}" + (f" ({t*1000:.0f} ms)" if t is not None else "") for n, estado, t in modelos.resumen()]
+        faltan = modelos.faltantes(MODELOS_PORTERO + MODELOS_CAMPO)
+        if faltan:
+            lineas.append(f"No disponibles: {', '.join(faltan)}")
+        return "\n".join(lineas)
+    
+    if SEPARADOR_PARTIDO.search(text):
+        partes = SEPARADOR_PARTIDO.split(text.strip())
+        if len(partes) != 2:
+            return "Formato de partido: 'Equipo A vs Equipo B'."
+        equipoA, equipoB = partes
+        resp = predecir_partido(equipoA.strip(), equipoB.strip())
+        if isinstance(resp,str):
+            return resp
+        return f"{resp['EquipoA']} {resp['ProbabilidadA']}% vs {resp['EquipoB']} {resp['ProbabilidadB']}%\n{resp['Analisis']}"
+    
+    resp = predecir_jugador(text)
+    if isinstance(resp,str):
+        return resp
+    salida = ""
+    for k,v in resp.items():
+        if k != 'Tipo':
+            salida += f"{k}: {v}\n"
+    return salida
+
+
+def resumen_trazas(n=10):
+    # /trazas: tramos más costosos, contadores y exportación a JSONL
+    if not instrumentacion.ACTIVA:
+        return "Instrumentación desactivada (arranca con TRAZAS=1)."
+    lineas = [f"{f['nombre']}: {f['llamadas']} llamadas, media {f['medio_ms']:.2f} ms, máx {f['max_ms']:.2f} ms" for f in instrumentacion.registro.resumen()[:n]]
+    lineas += [f"{nombre}: {valor}" for nombre, valor in sorted(instrumentacion.registro.leer_contadores().items())]
+    lineas.append(f"Trazas exportadas en {instrumentacion.registro.exportar()}")
+    return "\n".join(lineas)
+
+
+# 🔹 COLA DE INFERENCIA
+# Hilos y no procesos: los modelos y el dataset ya están en memoria y el
+# predict de los árboles libera el GIL. MAX_INFERENCIAS limita cuántas
+# consultas se calculan a la vez; el resto espera en la cola.
+MAX_INFERENCIAS = 2
+INTERVALO_UPDATE = 0.05  # segundos entre envíos de la vista al cliente
+PAGINA_HISTORIAL = 20    # mensajes antiguos que se recuperan por clic
+
+ejecutor = ThreadPoolExecutor(max_workers=MAX_INFERENCIAS, thread_name_prefix="inferencia")
+
+
+class Consulta:
+    __slots__ = ("texto", "burbuja", "fila", "mensaje", "cancelada", "futuro")
+
+    def __init__(self, texto, burbuja, fila, mensaje):
+        self.texto = texto
+        self.burbuja = burbuja
+        self.fila = fila
+        self.mensaje = mensaje
+        self.cancelada = False
+        self.futuro = None
+
+    def cancelar(self):
+        # En cola: no llega a calcularse. En curso: responder() se corta en la
+        # siguiente comprobación (la etapa que se esté ejecutando termina)
+        self.cancelada = True
+        if self.futuro is not None:
+            self.futuro.cancel()
+
+
+async def main(page: ft.Page):
     # 🎨 Colores de la web
     colors = {
         "olive_leaf": "#606c38",
@@ -128,64 +403,145 @@ def main(page: ft.Page):
     page.window_height = 800
     page.bgcolor = colors["black_forest"]
     
-    # Area de chat
-    chat_area = ft.Column(expand=True, spacing=10, scroll="auto")
+    # Area de chat: ListView (sólo se construyen las burbujas visibles) con los
+    # últimos VENTANA mensajes; los anteriores se leen del log bajo demanda
+    historial = HistorialChat()
+    primero = 0  # id del primer mensaje pintado
+    chat_area = ft.ListView(expand=True, spacing=10, auto_scroll=True)
+    boton_anteriores = ft.TextButton("Ver mensajes anteriores", visible=False)
     chat_box = ft.Container(
-        content=chat_area, expand=True, 
+        content=ft.Column([boton_anteriores, chat_area], expand=True), expand=True, 
         bgcolor=colors["olive_leaf"], padding=20, border_radius=12,
         border=ft.border.all(2, colors["sunlit_clay"])
     )
     
     input_box = ft.TextField(expand=True, label="Escribe tu consulta", text_style=ft.TextStyle(color=colors["text_white"], size=16), bgcolor=colors["pitch_dark"], border_radius=8)
     
+    loop = asyncio.get_running_loop()
+    cola = asyncio.Queue()
+    pendientes = set()
+    hay_cambios = asyncio.Event()
+    
+    # Los cambios se acumulan y se envían juntos cada INTERVALO_UPDATE
+    def refrescar():
+        hay_cambios.set()
+    
+    async def volcar_cambios():
+        while True:
+            await hay_cambios.wait()
+            await asyncio.sleep(INTERVALO_UPDATE)
+            hay_cambios.clear()
+            page.update()
+    
     # Burbujas de chat
-    def bubble(role, text):
+    def crear_burbuja(role, text, acciones=()):
         is_user = role == "user"
         bubble_color = colors["copperwood"] if is_user else colors["pitch_dark"]
-        chat_area.controls.append(
-            ft.Row(
-                [ft.Container(
-                    content=ft.Text(text, color=colors["text_white"], size=14),
-                    bgcolor=bubble_color,
-                    padding=14,
-                    border_radius=14,
-                    width=600
-                )],
-                alignment=ft.MainAxisAlignment.END if is_user else ft.MainAxisAlignment.START
-            )
+        texto = ft.Text(text, color=colors["text_white"], size=14)
+        fila = ft.Row(
+            [ft.Container(
+                content=ft.Row([texto, *acciones], wrap=True),
+                bgcolor=bubble_color,
+                padding=14,
+                border_radius=14,
+                width=600
+            )],
+            alignment=ft.MainAxisAlignment.END if is_user else ft.MainAxisAlignment.START
         )
-        page.update()
+        return texto, fila
+    
+    def bubble(role, text, acciones=()):
+        nonlocal primero
+        mensaje = historial.agregar(role, text)
+        texto, fila = crear_burbuja(role, text, acciones)
+        chat_area.controls.append(fila)
+        chat_area.auto_scroll = True
+        
+        # Fuera de la ventana: se quitan de la vista (ya están en el log)
+        sobran = len(chat_area.controls) - historial.ventana
+        if sobran > 0:
+            del chat_area.controls[:sobran]
+            primero += sobran
+        boton_anteriores.visible = primero > 0
+        refrescar()
+        return texto, fila, mensaje
+    
+    async def cargar_anteriores(_):
+        nonlocal primero
+        antiguos = historial.leer(primero - PAGINA_HISTORIAL, primero)
+        chat_area.controls[:0] = [crear_burbuja(m.rol, m.texto)[1] for m in antiguos]
+        chat_area.auto_scroll = False
+        primero -= len(antiguos)
+        boton_anteriores.visible = primero > 0
+        refrescar()
+    
+    boton_anteriores.on_click = cargar_anteriores
+    
+    async def al_desconectar(_):
+        historial.volcar_todo()
+        if instrumentacion.ACTIVA:
+            instrumentacion.registro.exportar()
+    
+    page.on_disconnect = al_desconectar
+    
+    def mostrar(consulta, respuesta):
+        consulta.burbuja.value = respuesta
+        historial.actualizar(consulta.mensaje, respuesta)
+        consulta.fila.controls[0].content.controls[1:] = []
+        pendientes.discard(consulta)
+        refrescar()
+    
+    def cancelar(consulta):
+        if consulta in pendientes:
+            en_curso = consulta.futuro is not None
+            consulta.cancelar()
+            mostrar(consulta, "Consulta cancelada." + (" El cálculo que ya estaba en marcha termina en segundo plano y se descarta." if en_curso else ""))
     
-    # Enviar mensaje
-    def send(_):
+    # Trabajadores: sacan consultas de la cola y las calculan en el pool
+    async def atender():
+        while True:
+            consulta = await cola.get()
+            try:
+                if consulta.cancelada:
+                    continue
+                consulta.futuro = loop.run_in_executor(ejecutor, responder, consulta.texto, consulta)
+                respuesta = await consulta.futuro
+            except asyncio.CancelledError:
+                if not consulta.cancelada:
+                    raise
+                continue
+            except ConsultaCancelada:
+                continue
+            except Exception as e:
+                respuesta = f"Error al procesar la consulta: {e}"
+            finally:
+                cola.task_done()
+            if not consulta.cancelada:
+                mostrar(consulta, respuesta)
+    
+    # Enviar mensaje: sólo encola y muestra la burbuja de "pensando"
+    async def send(_):
         if not input_box.value:
             return
         text = input_box.value
+        input_box.value = ""
         bubble("user", text)
         
-        text_lower = text.lower()
-        if " vs " in text_lower or " contra " in text_lower:
-            partes = text_lower.replace(" contra "," vs ").split(" vs ")
-            if len(partes)==2:
-                equipoA, equipoB = partes
-                resp = predecir_partido(equipoA.strip(), equipoB.strip())
-                if isinstance(resp,str):
-                    bubble("assistant", resp)
-                else:
-                    bubble("assistant", f"{resp['EquipoA']} {resp['ProbabilidadA']}% vs {resp['EquipoB']} {resp['ProbabilidadB']}%\n{resp['Analisis']}")
-        else:
-            resp = predecir_jugador(text)
-            if isinstance(resp,str):
-                bubble("assistant", resp)
-            else:
-                salida = ""
-                for k,v in resp.items():
-                    if k != 'Tipo':
-                        salida += f"{k}: {v}\n"
-                bubble("assistant", salida)
+        if text.strip().lower() == "/cancelar":
+            for consulta in list(pendientes):
+                cancelar(consulta)
+            return
+        
+        boton = ft.TextButton("Cancelar")
+        texto, fila, mensaje = bubble("assistant", "Analizando…", acciones=[boton])
+        consulta = Consulta(text, texto, fila, mensaje)
+        
+        async def al_cancelar(_):
+            cancelar(consulta)
         
-        input_box.value=""
-        page.update()
+        boton.on_click = al_cancelar
+        pendientes.add(consulta)
+        cola.put_nowait(consulta)
     
     # Título premium
     page.add(
@@ -195,6 +551,27 @@ def main(page: ft.Page):
     )
     
     bubble("assistant", "Sistema listo. Puedes preguntar por jugadores o partidos (Ej: 'Courtois' o 'Real Madrid vs Barcelona').")
+    
+    faltan = modelos.faltantes(MODELOS_PORTERO + MODELOS_CAMPO)
+    if faltan:
+        bubble("assistant", f"Aviso: faltan los modelos {', '.join(faltan)}. Las valoraciones afectadas no estarán disponibles.")
+    
+    # Tareas de fondo: envío agrupado de la vista y trabajadores de la cola
+    page.run_task(volcar_cambios)
+    for _ in range(MAX_INFERENCIAS):
+        page.run_task(atender)
+    
+    # La caché de predicciones se genera sin bloquear la interfaz
+    if predicciones is None:
+        threading.Thread(target=preparar_predicciones, daemon=True).start()
 
 # ===============================
-ft.app(target=main)
+if __name__ == "__main__":
+    # python ai_engine.py --lote predicciones.csv -> valoración de toda la base
+    if len(sys.argv) == 3 and sys.argv[1] == "--lote":
+        lote = predecir_jugadores()
+        lote.to_csv(sys.argv[2], index=False)
+        if lote.attrs['faltantes']:
+            print(f"Aviso: faltan los modelos {', '.join(lote.attrs['faltantes'])}; sus columnas quedan vacías.", file=sys.stderr)
+    else:
+        ft.app(target=main)
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from indices import obtener_indice, cache_por_frame
+
+# Features de los modelos (mismo orden con el que se entrenaron los scalers)
+FEATURES_VALOR = [
+    "Age","MP","Starts","Min","Touches","Carries","PrgDist",
+    "PrgC","PrgP","PrgR","Succ%","Gls","Ast","G+A",
+    "xG","xAG","KP","SCA","GCA","Tkl+Int","Blocks","FatigueIndex",
+    "Sh","SoT","SoT%","Sh/90","SoT/90","G/Sh","G/SoT"
+]
+
+FEATURES_GK_PARADAS = ["MP","Min","Rec","GCA","Tkl+Int","FatigueIndex"]
+
+# Columnas de texto que se guardan como códigos (una tabla de valores por columna)
+COLUMNAS_META = ['Player', 'Squad', 'Pos', 'Comp', 'Nation']
+
+# 🔹 ESQUEMA FIJO DE LA MATRIZ
+# Cada bloque de features ocupa columnas consecutivas (las compartidas se
+# repiten), así el vector de un modelo es un slice sin copia de la fila.
+COLUMNAS = FEATURES_VALOR + FEATURES_GK_PARADAS
+
+IDX_VALOR = slice(0, len(FEATURES_VALOR))
+IDX_GK_PARADAS = slice(len(FEATURES_VALOR), len(FEATURES_VALOR) + len(FEATURES_GK_PARADAS))
+
+
+# 🔹 REGISTRO DE JUGADOR
+# Vista ligera sobre una fila del almacén: no copia datos, sólo guarda la posición.
+class RegistroJugador:
+    __slots__ = ('almacen', 'fila')
+
+    def __init__(self, almacen, fila):
+        self.almacen = almacen
+        self.fila = fila
+
+    def __getitem__(self, columna):
+        return self.almacen.valor(self.fila, columna)
+
+    def vector(self, bloque, dtype=None):
+        return self.almacen.vector(self.fila, bloque, dtype)
+
+    @property
+    def nombre(self):
+        return self['Player']
+
+    @property
+    def equipo(self):
+        return self['Squad']
+
+    @property
+    def pos(self):
+        return self['Pos']
+
+    def __repr__(self):
+        return f"RegistroJugador({self.nombre!r}, {self.equipo!r}, {self.pos!r})"
+
+
+# 🔹 ALMACÉN COMPACTO DE JUGADORES
+# Matriz float64 contigua (filas = posiciones del DataFrame) + códigos de las
+# columnas de texto. Las búsquedas por nombre reutilizan IndiceDatos.
+# Las features se guardan en float64, igual que el CSV: con float32 la
+# diferencia con el .pkl llegaba a 0.1 en alguna predicción (un valor que
+# cruzaba el umbral de un split); en float64 es 0 en toda la base.
+class AlmacenJugadores:
+    def __init__(self, df, columnas=None, indice=None, dtype=np.float64):
+        self.indice = obtener_indice(df, indice)
+        self.columnas = list(COLUMNAS if columnas is None else columnas)
+
+        # Columna -> primera posición en la matriz
+        self.col = {}
+        for j, c in enumerate(self.columnas):
+            self.col.setdefault(c, j)
+
+        self.matriz = np.ascontiguousarray(df[self.columnas].to_numpy(dtype=dtype))
+
+        self.codigos = {}
+        self.valores = {}
+        for c in COLUMNAS_META:
+            if c in df.columns:
+                codigos, valores = pd.factorize(df[c], sort=False)
+                tipo = np.int16 if len(valores) < np.iinfo(np.int16).max else np.int32
+                self.codigos[c] = codigos.astype(tipo)
+                self.valores[c] = np.asarray(valores, dtype=object)
+
+    def __len__(self):
+        return len(self.matriz)
+
+    @property
+    def nbytes(self):
+        return self.matriz.nbytes + sum(c.nbytes for c in self.codigos.values())
+
+    # --- ACCESO ---
+    def registro(self, nombre):
+        fila = self.indice.posicion(nombre)
+        if fila is None:
+            return None
+        return RegistroJugador(self, fila)
+
+    def vector(self, fila, bloque, dtype=None):
+        # Vista 2D (1, n_features) lista para scaler.transform; con dtype se
+        # devuelve una copia convertida (29 valores como mucho)
+        vista = self.matriz[fila:fila + 1, bloque]
+        return vista if dtype is None else vista.astype(dtype)
+
+    def valor(self, fila, columna):
+        if columna in self.col:
+            return float(self.matriz[fila, self.col[columna]])
+        codigo = self.codigos[columna][fila]
+        return None if codigo < 0 else self.valores[columna][codigo]
+
+    def valores_fila(self, fila, columnas):
+        return self.matriz[fila, [self.col[c] for c in columnas]]
+
+
+def obtener_almacen(df, almacen=None):
+    if almacen is not None:
+        return almacen
+    return cache_por_frame(df, 'almacen', AlmacenJugadores)
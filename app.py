@@ -1,15 +1,32 @@
+import threading
 import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-from mplsoccer import Pitch
 from utils import radar_data, matchup_predictor, jugadores_similares, compare_players
+from datos import cargar_dataset
+from indices import IndiceDatos, obtener_indice
+from percentiles import MatrizPercentiles
+from similitud import IndiceSimilitud
+from equipos import construir_tabla_equipos
+from cache_predicciones import AlmacenPredicciones, archivos_huella, firma_rapida, huella
+from campo import campo_png
+from filtros import MotorFiltros
+from rankings import Clasificaciones, FRANJAS_EDAD
+from ingesta import LectorDelta
+from imagenes import CacheImagenes
+from comparacion import Comparacion, MAX_JUGADORES, ZONAS
+import instrumentacion
+from instrumentacion import instrumentar, tramo
 
 # --------------------------------------------------
 # CONFIGURACIÓN PROFESIONAL
 # --------------------------------------------------
 st.set_page_config(page_title="Football Intel Pro", layout="wide", page_icon="⚽")
 
+# Con TRAZAS=1 cada rerun es un ciclo de la instrumentación (panel al final)
+instrumentacion.nuevo_ciclo()
+
 colors = {
     "olive-leaf": "#606c38",
     "black-forest": "#283618",
@@ -38,100 +55,104 @@ st.markdown(f"""
     </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_data():
-    return pd.read_csv("final.csv")
-
-df = load_data()
+# Dataset vivo: final.csv + filas que llegan por ingesta.py (delta.jsonl).
+# Cada rerun aplica sólo las líneas nuevas del delta; 'version' cambia con
+# cada lote y es la clave de todas las estructuras derivadas.
+@st.cache_resource
+def load_flujo():
+    return LectorDelta(cargar_dataset)
+
+@st.cache_data(max_entries=2)
+@instrumentar()
+def load_data(version):
+    return load_flujo().df
+
+# Versión del dataset (clave de las figuras cacheadas); sólo se recalcula
+# cuando cambia el tamaño/mtime de final.csv
+@st.cache_resource
+@instrumentar()
+def load_version(firma):
+    return huella(["final.csv"])[:12]
+
+# El índice sólo guarda posiciones de fila, así que sirve para cualquier copia
+# que devuelva load_data() y se construye una única vez por versión del dataset.
+@st.cache_resource(max_entries=2)
+@instrumentar()
+def load_indice(version):
+    return IndiceDatos(load_data(version))
+
+@st.cache_resource(max_entries=2)
+@instrumentar()
+def load_percentiles(version):
+    return MatrizPercentiles(load_data(version), indice=load_indice(version))
+
+@st.cache_resource(max_entries=2)
+@instrumentar()
+def load_similitud(version):
+    return IndiceSimilitud(load_data(version), indice=load_indice(version))
+
+@st.cache_resource(max_entries=2)
+@instrumentar()
+def load_tabla_equipos(version):
+    return construir_tabla_equipos(load_data(version))
+
+# Una sola Clasificaciones por carga de la base: cada lote del delta se le
+# aplica en su sitio (filas añadidas y grupos de las filas reemplazadas)
+@st.cache_resource
+def load_clasificaciones():
+    return {'cerrojo': threading.Lock(), 'recargas': None, 'posicion': 0, 'clasificaciones': None}
+
+@instrumentar()
+def clasificaciones_actuales(flujo):
+    estado = load_clasificaciones()
+    with estado['cerrojo']:
+        df, recargas, posicion, filas = flujo.cambios(estado['recargas'], estado['posicion'])
+        if estado['clasificaciones'] is None or filas is None:
+            estado['clasificaciones'] = Clasificaciones(df)
+        elif len(filas):
+            estado['clasificaciones'].actualizar(df, filas)
+        estado['recargas'], estado['posicion'] = recargas, posicion
+        return estado['clasificaciones']
+
+@st.cache_resource(max_entries=2)
+@instrumentar()
+def load_filtros(version):
+    return MotorFiltros(load_data(version))
+
+# La firma (tamaño + mtime de final.csv y los .pkl) forma parte de la clave,
+# así que la caché se recarga sola cuando cambian los archivos.
+@st.cache_resource
+@instrumentar()
+def load_predicciones(firma):
+    return AlmacenPredicciones.cargar()
+
+# Miniaturas locales de PlayerImg / TeamImg (imagenes.py): las tarjetas llevan
+# data URIs de 70/140/250 px en lugar de la imagen completa de Wikimedia
+@st.cache_resource
+def load_imagenes():
+    return CacheImagenes()
+
+with tramo("app.carga"):
+    flujo = load_flujo()
+    with tramo("app.ingesta"):
+        flujo.sincronizar()
+    version = flujo.version
+    df = load_data(version)
+    indice = load_indice(version)
+    percentiles = load_percentiles(version)
+    similitud = load_similitud(version)
+    tabla_equipos = load_tabla_equipos(version)
+    filtros = load_filtros(version)
+    clasificaciones = clasificaciones_actuales(flujo)
+    predicciones = load_predicciones(firma_rapida(archivos_huella()))
+    version_datos = load_version(firma_rapida(["final.csv"]))
+    img = load_imagenes().src
+    if flujo.posicion:
+        version_datos += f"+{flujo.posicion}"
 def draw_tactical_pitch(df, team_left, team_right):
     fig = go.Figure()
 
 
-def draw_mplsoccer_pitch_from_csv(df, team_left, team_right):
-    pitch = Pitch(
-        pitch_type="statsbomb",
-        pitch_color="#1a1a1a",
-        line_color="#444444"
-    )
-
-    fig, ax = pitch.draw(figsize=(14, 9))
-    fig.set_facecolor("#1a1a1a")
-
-    # --- POSICIÓN X (NO CRUZA MITAD) ---
-    def get_x(pos, side):
-        x_map_left = {
-            "GK": 6,
-            "DF": 20,
-            "MF": 38,
-            "FW": 54
-        }
-
-        x_map_right = {
-            "GK": 114,
-            "DF": 100,
-            "MF": 82,
-            "FW": 66
-        }
-
-        pos_key = pos[:2]
-        return x_map_left.get(pos_key, 38) if side == "left" else x_map_right.get(pos_key, 82)
-
-    # --- POSICIÓN Y ---
-    def get_y(idx, total):
-        if total == 1:
-            return 40
-        step = 60 / (total - 1)
-        return 10 + idx * step
-
-    # --- DIBUJO DE JUGADORES ---
-    for team, side in [(team_left, "left"), (team_right, "right")]:
-        lineup = (
-            df[df["Squad"] == team]
-            .nlargest(11, "Min")
-            .copy()
-        )
-
-        lineup["Line"] = lineup["Pos"].str[:2]
-        counts = lineup["Line"].value_counts()
-        idxs = {l: 0 for l in counts.index}
-
-        for _, p in lineup.iterrows():
-            x = get_x(p["Line"], side)
-            y = get_y(idxs[p["Line"]], counts[p["Line"]])
-            idxs[p["Line"]] += 1
-
-            rating = p.get("Rating", 6.5)
-            color = "#2ecc71" if rating >= 7 else "#f1c40f"
-
-            pitch.scatter(
-                x, y,
-                s=700,
-                color="white",
-                edgecolors="#333",
-                ax=ax,
-                zorder=3
-            )
-
-            ax.text(
-                x, y + 3.5,
-                f"{rating:.2f}",
-                ha="center", va="center",
-                color="white",
-                fontsize=9,
-                fontweight="bold",
-                bbox=dict(facecolor=color, edgecolor="none", boxstyle="round,pad=0.25")
-            )
-
-            ax.text(
-                x, y - 6,
-                p["Player"].split()[-1],
-                ha="center", va="center",
-                color="white",
-                fontsize=10,
-                fontweight="bold"
-            )
-
-    return fig
 # --------------------------------------------------
 # INTERFAZ PRINCIPAL
 # --------------------------------------------------
@@ -147,25 +168,32 @@ tab1, tab2, tab3, tab4, tab5 = st.tabs([
 # -----------------
 # TAB 1: SCOUTING INDIVIDUAL
 # -----------------
-with tab1:
+with tab1, tramo("app.tab1"):
     col_sel, _ = st.columns([1, 2])
     p_name = col_sel.selectbox("Seleccionar Jugador", sorted(df["Player"].unique()), key="scout_p")
-    row = df[df["Player"] == p_name].iloc[0]
+    row = indice.fila(df, p_name)
 
     c1, c2 = st.columns([1.2, 3.5])
     with c1:
         st.markdown(f"""
         <div class="player-card">
-            <img src="{row['PlayerImg']}" style="width:100%; border-radius:12px; border:2px solid {colors['cornsilk']}">
+            <img src="{img(row['PlayerImg'], 250)}" style="width:100%; border-radius:12px; border:2px solid {colors['cornsilk']}">
             <h2 style="margin-top:10px;">{row['Player']}</h2>
             <p style="color:{colors['sunlit-clay']}">{row['Squad']} | {row['Pos']} | {int(row['Age'])} años</p>
-            <img src="{row['TeamImg']}" width="60">
+            <img src="{img(row['TeamImg'], 60)}" width="60">
         </div>
         """, unsafe_allow_html=True)
     with c2:
         m_c1, m_c2 = st.columns(2)
         metrics = [("Expected Goals (xG)", row["xG"]), ("Expected Assists (xAG)", row["xAG"]), 
                    ("Progression (m)", row["PrgDist"]), ("Fatigue Index", row["FatigueIndex"])]
+        # Valoración del modelo (caché generada por ai_engine.py; no vale para
+        # jugadores cuyas filas han llegado por ingesta)
+        pred = predicciones.buscar(p_name) if predicciones is not None and p_name not in flujo.modificados else None
+        if pred is not None:
+            # Las columnas de un modelo ausente no están en la respuesta
+            proyectadas = [("Valor Estimado (M€)", "Valor_M"), ("Paradas Proyectadas", "Paradas"), ("Goles Proyectados", "Goles")]
+            metrics += [(label, pred[clave]) for label, clave in proyectadas if clave in pred]
         for i, (label, val) in enumerate(metrics):
             target_col = m_c1 if i % 2 == 0 else m_c2
             target_col.markdown(f'<div class="metric-box"><div class="metric-title">{label}</div><div class="metric-value">{val:.2f}</div></div>', unsafe_allow_html=True)
@@ -176,7 +204,7 @@ with tab1:
             </div>
         """, unsafe_allow_html=True)
 
-        labels, values = radar_data(df[df['Player']==p_name], row['Squad'])
+        labels, values = radar_data(df.iloc[[indice.posicion(p_name)]], row['Squad'])
         fig = go.Figure(go.Scatterpolar(
             r=values + [values[0]], 
             theta=labels + [labels[0]], 
@@ -199,14 +227,14 @@ with tab1:
 
     st.divider()
     st.subheader("Jugadores de Perfil Similar")
-    sims = jugadores_similares(df, p_name)
+    sims = jugadores_similares(df, p_name, indice=indice, similitud=similitud)
     if not sims.empty:
         cols = st.columns(len(sims))
         for i, srow in enumerate(sims.iloc):
             with cols[i]:
                 st.markdown(f"""
                 <div style="background:{colors['olive-leaf']}; padding:15px; border-radius:10px; text-align:center; border:1px solid {colors['sunlit-clay']}">
-                    <img src="{srow['PlayerImg']}" width="70" style="border-radius:50%">
+                    <img src="{img(srow['PlayerImg'], 70)}" width="70" style="border-radius:50%">
                     <p style="margin:5px 0 0 0;"><b>{srow['Player']}</b></p>
                     <small style="color:{colors['sunlit-clay']}">{srow['Similarity']:.1%} Match</small>
                 </div>
@@ -214,14 +242,14 @@ with tab1:
 # -----------------
 # TAB 2: ANÁLISIS DE EQUIPOS
 # -----------------
-with tab2:
+with tab2, tramo("app.tab2"):
     t1_col, t2_col = st.columns(2)
     teamA = t1_col.selectbox("Equipo Local (Izquierda)", sorted(df["Squad"].unique()), index=0, key="team_a_sel")
     teamB = t2_col.selectbox("Equipo Visitante (Derecha)", sorted(df["Squad"].unique()), index=1, key="team_b_sel")
     
     st.markdown(f"""
         <div style="text-align:center; padding:15px; background:rgba(221,161,94,0.1); border-radius:15px; border:1px solid {colors['sunlit-clay']}; margin-bottom:25px;">
-            <h3 style='margin:0; color:{colors['sunlit-clay']};'>Predicción: {matchup_predictor(df, teamA, teamB)}</h3>
+            <h3 style='margin:0; color:{colors['sunlit-clay']};'>Predicción: {matchup_predictor(df, teamA, teamB, tabla=tabla_equipos)}</h3>
         </div>
     """, unsafe_allow_html=True)
     
@@ -229,8 +257,10 @@ with tab2:
     
     with col_pitch:
         st.markdown(f"<p style='text-align:center; color:{colors['cornsilk']}'><b>Disposición Táctica y Calificaciones</b></p>", unsafe_allow_html=True)
-        fig = draw_mplsoccer_pitch_from_csv(df, teamA, teamB)
-        st.pyplot(fig)    
+        # PNG cacheado por (local, visitante, versión del dataset)
+        with tramo("app.tab2.campo"):
+            png = campo_png(df, teamA, teamB, version_datos, indice=indice)
+        st.image(png, use_container_width=True)
 
     with col_fatiga:
         # TÍTULO ESTILO APP
@@ -242,9 +272,9 @@ with tab2:
         """, unsafe_allow_html=True)
         
         # FILTRADO DE JUGADORES POR LOS DOS EQUIPOS SELECCIONADOS
-        fatigued_players = df[
-            (df['Squad'].isin([teamA, teamB])) & 
-            (df['FatigueIndex'] >= 1.5) # Umbral para mostrar en el ranking
+        equipos_df = indice.filas_equipos(df, [teamA, teamB])
+        fatigued_players = equipos_df[
+            equipos_df['FatigueIndex'] >= 1.5 # Umbral para mostrar en el ranking
         ].sort_values('FatigueIndex', ascending=False).head(6)
 
         if not fatigued_players.empty:
@@ -277,7 +307,7 @@ with tab2:
     st.markdown(f"<h4 style='text-align:center; margin-top:30px; margin-bottom:20px; color:{colors['cornsilk']}'> Jugadores con mayor impacto (G+A)</h4>", unsafe_allow_html=True)
 
     def get_key_players(df_total, team_name):
-        team_df = df_total[df_total['Squad'] == team_name].copy()
+        team_df = indice.filas_equipo(df_total, team_name).copy()
         min_limit = team_df['Min'].max() * 0.5
         team_df['G+A'] = team_df['Gls'] + team_df['Ast']
         return team_df[team_df['Min'] >= min_limit].sort_values(['G+A', 'Min'], ascending=False).head(2)
@@ -292,7 +322,7 @@ with tab2:
         with s_cols[i]:
             st.markdown(f"""
             <div style="background:{colors['olive-leaf']}; padding:15px; border-radius:15px; border:2px solid {side_color}; text-align:center; min-height:220px;">
-                <img src="{p['PlayerImg']}" style="width:70px; height:70px; border-radius:50%; object-fit:cover; border:2px solid white;">
+                <img src="{img(p['PlayerImg'], 70)}" style="width:70px; height:70px; border-radius:50%; object-fit:cover; border:2px solid white;">
                 <div style="font-weight:bold; font-size:15px; margin-top:5px; color:white;">{p['Player']}</div>
                 <div style="font-size:11px; color:{colors['cornsilk']}; opacity:0.8;">{p['Pos']} | {int(p['Min'])} min</div>
                 <div style="display:flex; justify-content:space-around; margin-top:15px; border-top:1px solid rgba(255,255,255,0.1); padding-top:10px;">
@@ -305,7 +335,7 @@ with tab2:
 # -----------------
 # TAB 3: JUGADOR VS JUGADOR (ELITE ANALYTICS) - VERSIÓN VISUAL COMPLETA
 # -----------------
-with tab3:
+with tab3, tramo("app.tab3"):
     st.markdown(f"""
         <div style="text-align:center; padding:20px; margin-bottom:20px; border-radius:15px; 
         background: linear-gradient(90deg, {colors['black-forest']}, {colors['pitch-dark']}); 
@@ -322,8 +352,13 @@ with tab3:
     with c_sel2:
         p2_name = st.selectbox("Seleccionar Jugador B", sorted(df["Player"].unique()), index=1, key="vs_p2_final")
 
-    p1 = df[df["Player"] == p1_name].iloc[0]
-    p2 = df[df["Player"] == p2_name].iloc[0]
+    p1 = indice.fila(df, p1_name)
+    p2 = indice.fila(df, p2_name)
+
+    # KPIs, diferencias, percentiles y tercios de los dos jugadores en una pasada
+    # (B es la referencia de las diferencias)
+    with tramo("app.tab3.percentiles"):
+        duelo = Comparacion(df, [p1_name, p2_name], indice, percentiles, referencia=p2_name)
 
     # --- TARJETAS DE JUGADOR VISUALES ---
     t_col1, t_vs, t_col2 = st.columns([2, 0.5, 2])
@@ -331,7 +366,7 @@ with tab3:
     with t_col1:
         st.markdown(f"""
             <div style="background:{colors['olive-leaf']}; border: 2px solid {colors['sunlit-clay']}; border-radius: 20px; padding: 25px; text-align: center;">
-                <img src="{p1['PlayerImg']}" style="width: 140px; height: 140px; border-radius: 50%; border: 4px solid white; object-fit: cover; margin-bottom: 10px;">
+                <img src="{img(p1['PlayerImg'], 140)}" style="width: 140px; height: 140px; border-radius: 50%; border: 4px solid white; object-fit: cover; margin-bottom: 10px;">
                 <h2 style="margin:0; color:white;">{p1['Player']}</h2>
                 <p style="color:{colors['cornsilk']}; opacity:0.9;">{p1['Squad']} | {p1['Pos']} | {int(p1['Age'])} años</p>
             </div>
@@ -343,7 +378,7 @@ with tab3:
     with t_col2:
         st.markdown(f"""
             <div style="background:{colors['olive-leaf']}; border: 2px solid {colors['sunlit-clay']}; border-radius: 20px; padding: 25px; text-align: center;">
-                <img src="{p2['PlayerImg']}" style="width: 140px; height: 140px; border-radius: 50%; border: 4px solid white; object-fit: cover; margin-bottom: 10px;">
+                <img src="{img(p2['PlayerImg'], 140)}" style="width: 140px; height: 140px; border-radius: 50%; border: 4px solid white; object-fit: cover; margin-bottom: 10px;">
                 <h2 style="margin:0; color:white;">{p2['Player']}</h2>
                 <p style="color:{colors['cornsilk']}; opacity:0.9;">{p2['Squad']} | {p2['Pos']} | {int(p2['Age'])} años</p>
             </div>
@@ -362,9 +397,9 @@ with tab3:
         ("Solidez Duelos Ganados", "Won", "")
     ]
 
-    for col, (label, key, emoji) in zip([kpi1, kpi2, kpi3, kpi4], metrics_kpi):
-        val1, val2 = p1[key], p2[key]
-        diff = ((val1 - val2) / (val2 if val2 != 0 else 1)) * 100
+    for j, (col, (label, key, emoji)) in enumerate(zip([kpi1, kpi2, kpi3, kpi4], metrics_kpi)):
+        val1, val2 = duelo.kpi[0, j], duelo.kpi[1, j]
+        diff = duelo.diferencias[0, j]
         color_diff = "#2ecc71" if diff > 0 else "#e74c3c"
         
         col.markdown(f"""
@@ -383,37 +418,15 @@ with tab3:
 
     with col_viz:
         st.markdown("<p style='text-align:center; font-weight:bold; color:white;'>Huella Estadística (Percentiles Liga)</p>", unsafe_allow_html=True)
-        categories = ['SCA90', 'GCA90', 'PrgP', 'PrgC', 'Touches', 'Tkl+Int', 'Blocks', 'Won']
-        
-        fig_radar = go.Figure()
-        for player, name, color in [(p1, p1_name, colors['copperwood']), (p2, p2_name, colors['sunlit-clay'])]:
-            r_values = [(df[cat] < player[cat]).mean() * 100 for cat in categories]
-            fig_radar.add_trace(go.Scatterpolar(
-                r=r_values + [r_values[0]], theta=categories + [categories[0]], fill='toself',
-                name=name, line=dict(color=color, width=3),
-                fillcolor=f"rgba({int(color[1:3],16)}, {int(color[3:5],16)}, {int(color[5:7],16)}, 0.3)"
-            ))
-
-        fig_radar.update_layout(
-            polar=dict(
-                radialaxis=dict(visible=True, range=[0, 100], gridcolor="#444", tickfont=dict(color="grey", size=8)),
-                angularaxis=dict(gridcolor="#444", tickfont=dict(color="white", size=10)),
-                bgcolor="rgba(0,0,0,0)"
-            ),
-            paper_bgcolor="rgba(0,0,0,0)",
-            legend=dict(orientation="h", y=-0.2, x=0.5, xanchor="center"),
-            height=450, margin=dict(t=20, b=20)
-        )
+        fig_radar = duelo.radar(colores=[colors['copperwood'], colors['sunlit-clay']])
         st.plotly_chart(fig_radar, use_container_width=True)
 
     with col_data:
         st.markdown(f"<p style='color:{colors['sunlit-clay']}; font-weight:bold;'>Distribución de Posesión</p>", unsafe_allow_html=True)
-        tercios = ['Def 3rd_stats_possession', 'Mid 3rd_stats_possession', 'Att 3rd_stats_possession']
-        labels_tercios = ['Defensivo', 'Central', 'Atacante']
-        
-        fig_tercios = go.Figure()
-        fig_tercios.add_trace(go.Bar(y=labels_tercios, x=[p1[t] for t in tercios], name=p1_name, orientation='h', marker_color=colors['copperwood']))
-        fig_tercios.add_trace(go.Bar(y=labels_tercios, x=[p2[t] for t in tercios], name=p2_name, orientation='h', marker_color=colors['sunlit-clay']))
+        fig_tercios = go.Figure(data=[
+            go.Bar(y=ZONAS, x=x, name=name, orientation='h', marker_color=color)
+            for x, name, color in zip(duelo.tercios, [p1_name, p2_name], [colors['copperwood'], colors['sunlit-clay']])
+        ])
         
         fig_tercios.update_layout(
             barmode='group', height=280, 
@@ -425,23 +438,47 @@ with tab3:
         st.plotly_chart(fig_tercios, use_container_width=True)
 
         # --- INSIGHTS DE ESTILO (CONCLUSIÓN TÁCTICA) ---
-        max_idx_p1 = np.argmax([p1[t] for t in tercios])
-        max_idx_p2 = np.argmax([p2[t] for t in tercios])
-        
         st.markdown(f"""
             <div style="background:rgba(255,254,224,0.05); padding:15px; border-radius:10px; border-left:4px solid {colors['sunlit-clay']}; margin-top:10px;">
                 <p style="margin:0; font-size:0.9em; line-height:1.5; color:white;">
                     <b>Insights de Estilo:</b><br>
-                    <b>{p1_name}:</b> {p1['PlayerStyle']} con gran presencia en zona <b>{labels_tercios[max_idx_p1]}</b>.<br>
-                    <b>{p2_name}:</b> Perfil de {p2['PlayerStyle']} destacando en zona <b>{labels_tercios[max_idx_p2]}</b>.
+                    <b>{p1_name}:</b> {p1['PlayerStyle']} con gran presencia en zona <b>{duelo.zona[0]}</b>.<br>
+                    <b>{p2_name}:</b> Perfil de {p2['PlayerStyle']} destacando en zona <b>{duelo.zona[1]}</b>.
                 </p>
             </div>
         """, unsafe_allow_html=True)
 
+    st.divider()
+
+    # --- LISTA CORTA (N JUGADORES) ---
+    # Toda la lista se compara de una vez: un radar con una traza por jugador
+    # y una tabla ordenada por percentil medio de la huella
+    st.markdown("### Lista Corta")
+    l_sel, l_ref, l_amb = st.columns([3, 1.2, 1])
+    with l_sel:
+        lista = st.multiselect(f"Jugadores (hasta {MAX_JUGADORES})", sorted(df["Player"].unique()),
+                               default=[p1_name, p2_name] if p1_name != p2_name else [p1_name],
+                               max_selections=MAX_JUGADORES, key="vs_lista")
+    with l_ref:
+        referencia = st.selectbox("Referencia Δ%", lista or [None], key="vs_lista_ref")
+    with l_amb:
+        ambitos_lista = {"Toda la base": None, "Su competición": 'Comp', "Su posición": 'Pos'}
+        ambito_lista = ambitos_lista[st.selectbox("Percentiles frente a", list(ambitos_lista), key="vs_lista_ambito")]
+
+    if lista:
+        with tramo("app.tab3.lista", jugadores=len(lista)):
+            corta = Comparacion(df, lista, indice, percentiles, referencia=referencia, ambito=ambito_lista)
+            tabla_corta = corta.tabla()
+        st.plotly_chart(corta.radar(altura=550), use_container_width=True)
+        st.dataframe(tabla_corta, column_config={
+            "Player": "Jugador",
+            "Percentil medio": st.column_config.ProgressColumn("Percentil medio", min_value=0, max_value=100, format="%.1f")
+        }, hide_index=True, use_container_width=True)
+
 # -----------------
 # TAB 4: MARKET DISCOVERY (BUSCADOR)
 # -----------------
-with tab4:
+with tab4, tramo("app.tab4"):
     st.markdown(f"<h2 style='color:{colors['sunlit-clay']}'>Buscador de Talento Avanzado</h2>", unsafe_allow_html=True)
     
     with st.expander("Configurar Filtros de Scouting", expanded=True):
@@ -454,38 +491,50 @@ with tab4:
             min_ga = st.slider("Mín. Goles + Asistencias", 0.0, float(df['G+A'].max()), 0.0)
         with f_col3:
             age_range = st.slider("Rango de Edad", int(df['Age'].min()), int(df['Age'].max()), (18, 30))
-
-    # Lógica de filtrado
-    scout_df = df[
-        (df['Min'] >= min_minutos) & 
-        (df['Pos'].isin(pos_sel)) & 
-        (df['SCA90'] >= min_sca) & 
-        (df['G+A'] >= min_ga) &
-        (df['Age'].between(age_range[0], age_range[1]))
-    ].copy()
-
-    st.write(f"Jugadores que coinciden: **{len(scout_df)}**")
-    st.dataframe(
-        scout_df[['Player', 'Squad', 'Age', 'Pos', 'G+A', 'SCA90', 'PrgP', 'Won']].sort_values(by='SCA90', ascending=False),
-        use_container_width=True
-    )
+            extra_sel = st.multiselect("Métricas adicionales", sorted(filtros.numericas), key="scout_extra")
+        
+        # Un slider de rango por cada métrica adicional elegida
+        extra_rangos = {}
+        for m in extra_sel:
+            lo, hi = float(np.nanmin(filtros.numericas[m])), float(np.nanmax(filtros.numericas[m]))
+            if lo < hi:
+                extra_rangos[m] = st.slider(m, lo, hi, (lo, hi), key=f"scout_extra_{m}")
+
+    # Consulta sobre los índices del motor (resultado ya ordenado por SCA90)
+    condiciones = {
+        'Min': (min_minutos, None),
+        'Pos': pos_sel,
+        'SCA90': (min_sca, None),
+        'G+A': (min_ga, None),
+        'Age': age_range,
+        **extra_rangos
+    }
+    por_pagina = 50
+    with tramo("app.tab4.filtros"):
+        total = filtros.contar(condiciones)
+    paginas = max(1, -(-total // por_pagina))
+
+    st.write(f"Jugadores que coinciden: **{total}**")
+    pagina = st.number_input("Página", min_value=1, max_value=paginas, value=1, step=1, key="scout_pagina") if paginas > 1 else 1
+    _, filas = filtros.consultar(condiciones, pagina=pagina - 1, por_pagina=por_pagina)
+    columnas = ['Player', 'Squad', 'Age', 'Pos', 'G+A', 'SCA90', 'PrgP', 'Won']
+    columnas += [m for m in extra_sel if m not in columnas]
+    st.dataframe(df.iloc[filas][columnas], use_container_width=True)
 
 # -----------------
 # TAB 5: PERFORMANCE LABS (ANÁLISIS)
 # -----------------
-with tab5:
+with tab5, tramo("app.tab5"):
     st.markdown(f"<h2 style='color:{colors['sunlit-clay']}; text-align:center;'>Laboratorio de Rendimiento</h2>", unsafe_allow_html=True)
     
     # --- NUEVA SECCIÓN: LÍDERES DE ÉLITE (TOPS) ---
     st.markdown("<h3 style='text-align:center;'>Líderes de Élite del Momento</h3>", unsafe_allow_html=True)
     
-    # Cálculos de Tops
-    top_goleador = df.loc[df['Gls'].idxmax()]
-    top_asistidor = df.loc[df['Ast'].idxmax()]
-    df['DefScore'] = df['Tkl+Int'] + df['Clr']
-    top_defensa = df.loc[df['DefScore'].idxmax()]
-    df['MidScore'] = df['KP'] + df['1/3'] + df['PrgP']
-    top_medio = df.loc[df['MidScore'].idxmax()]
+    # Tops precalculados (DefScore / MidScore son puntuaciones de rankings.py)
+    top_goleador = df.iloc[clasificaciones.lider('Gls')]
+    top_asistidor = df.iloc[clasificaciones.lider('Ast')]
+    top_defensa = df.iloc[clasificaciones.lider('DefScore')]
+    top_medio = df.iloc[clasificaciones.lider('MidScore')]
 
     t_col1, t_col2, t_col3, t_col4 = st.columns(4)
     tops = [
@@ -500,7 +549,7 @@ with tab5:
             <div style="background:{colors['pitch-dark']}; padding:15px; border-radius:15px; 
             border: 1px solid {colors['sunlit-clay']}; text-align:center; height: 280px;">
                 <p style="color:{colors['sunlit-clay']}; font-size:0.8em; font-weight:bold; margin-bottom:10px;">{emoji} {label}</p>
-                <img src="{player['PlayerImg']}" style="width: 80px; height: 80px; border-radius: 50%; border: 2px solid white; object-fit: cover; margin-bottom:10px;">
+                <img src="{img(player['PlayerImg'], 80)}" style="width: 80px; height: 80px; border-radius: 50%; border: 2px solid white; object-fit: cover; margin-bottom:10px;">
                 <h4 style="margin:0; font-size:1em;">{player['Player']}</h4>
                 <p style="color:grey; font-size:0.7em; margin-bottom:5px;">{player['Squad']}</p>
                 <div style="background:{colors['copperwood']}; border-radius:20px; padding:2px 10px; display:inline-block;">
@@ -511,27 +560,51 @@ with tab5:
 
     st.divider()
     st.markdown("<h3 style='text-align:center;'>Rankings de Élite (Top 5)</h3>", unsafe_allow_html=True)
+    
+    # Ámbito del ranking: toda la base o una competición / posición / franja de edad
+    ambitos = {"Todas las ligas": (None, None)}
+    ambitos.update({f"Liga: {c}": ('Comp', c) for c in sorted(df['Comp'].astype(str).unique())})
+    ambitos.update({f"Posición: {p}": ('Pos', p) for p in sorted(df['Pos'].astype(str).unique())})
+    ambitos.update({f"Edad: {f[2]}": ('Edad', f[2]) for f in FRANJAS_EDAD})
+    por, grupo = ambitos[st.selectbox("Ámbito", list(ambitos), key="labs_ambito")]
 
     # --- TODO ESTE BLOQUE AHORA ESTÁ DENTRO DE TAB 5 ---
     col_g, col_a, col_d, col_m = st.columns(4)
 
     with col_g:
         st.markdown("<h4 style='text-align:center;'>Goleadores</h4>", unsafe_allow_html=True)
-        top_5_gls = df.nlargest(5, 'Gls')[['Player', 'Gls']]
-        st.dataframe(top_5_gls, column_config={"Player": "Jugador", "Gls": st.column_config.ProgressColumn("Goles", min_value=0, max_value=int(df['Gls'].max()))}, hide_index=True, use_container_width=True)
+        top_5_gls = clasificaciones.tabla(df, 'Gls', 5, por, grupo)
+        st.dataframe(top_5_gls, column_config={"Player": "Jugador", "Gls": st.column_config.ProgressColumn("Goles", min_value=0, max_value=int(clasificaciones.maximo('Gls') or 0))}, hide_index=True, use_container_width=True)
 
     with col_a:
         st.markdown("<h4 style='text-align:center;'>Asistentes</h4>", unsafe_allow_html=True)
-        top_5_ast = df.nlargest(5, 'Ast')[['Player', 'Ast']]
-        st.dataframe(top_5_ast, column_config={"Player": "Jugador", "Ast": st.column_config.ProgressColumn("Asist.", min_value=0, max_value=int(df['Ast'].max()))}, hide_index=True, use_container_width=True)
+        top_5_ast = clasificaciones.tabla(df, 'Ast', 5, por, grupo)
+        st.dataframe(top_5_ast, column_config={"Player": "Jugador", "Ast": st.column_config.ProgressColumn("Asist.", min_value=0, max_value=int(clasificaciones.maximo('Ast') or 0))}, hide_index=True, use_container_width=True)
 
     with col_d:
         st.markdown("<h4 style='text-align:center;'>Defensivo</h4>", unsafe_allow_html=True)
-        top_5_def = df.nlargest(5, 'Tkl+Int')[['Player', 'Tkl+Int']]
-        st.dataframe(top_5_def, column_config={"Player": "Jugador", "Tkl+Int": st.column_config.ProgressColumn("Tkl+Int", min_value=0, max_value=int(df['Tkl+Int'].max()))}, hide_index=True, use_container_width=True)
+        top_5_def = clasificaciones.tabla(df, 'Tkl+Int', 5, por, grupo)
+        st.dataframe(top_5_def, column_config={"Player": "Jugador", "Tkl+Int": st.column_config.ProgressColumn("Tkl+Int", min_value=0, max_value=int(clasificaciones.maximo('Tkl+Int') or 0))}, hide_index=True, use_container_width=True)
 
     with col_m:
         st.markdown("<h4 style='text-align:center;'>🪄 Arquitectos</h4>", unsafe_allow_html=True)
-        top_5_mid = df.nlargest(5, 'PrgP')[['Player', 'PrgP']]
-        st.dataframe(top_5_mid, column_config={"Player": "Jugador", "PrgP": st.column_config.ProgressColumn("Pases Prg", min_value=0, max_value=int(df['PrgP'].max()))}, hide_index=True, use_container_width=True)
-        
\ No newline at end of file
+        top_5_mid = clasificaciones.tabla(df, 'PrgP', 5, por, grupo)
+        st.dataframe(top_5_mid, column_config={"Player": "Jugador", "PrgP": st.column_config.ProgressColumn("Pases Prg", min_value=0, max_value=int(clasificaciones.maximo('PrgP') or 0))}, hide_index=True, use_container_width=True)
+        
+
+# -----------------
+# PANEL DE DEPURACIÓN (sólo con TRAZAS=1)
+# -----------------
+if instrumentacion.ACTIVA:
+    with st.sidebar.expander("Depuración: tiempos del rerun", expanded=False):
+        st.caption(f"Rerun #{instrumentacion.registro.ciclo}: {instrumentacion.registro.duracion_ciclo():.1f} ms")
+        tramos_rerun = instrumentacion.registro.tramos_ciclo()
+        st.dataframe(pd.DataFrame({
+            "Tramo": ["· " * t["nivel"] + t["nombre"] for t in tramos_rerun],
+            "ms": [round(t["ms"], 2) for t in tramos_rerun],
+        }), hide_index=True, use_container_width=True)
+        st.markdown("**Acumulado del proceso**")
+        st.dataframe(pd.DataFrame(instrumentacion.registro.resumen()), hide_index=True, use_container_width=True)
+        st.markdown("**Contadores**")
+        st.json(instrumentacion.registro.leer_contadores())
+        st.download_button("Exportar trazas (JSONL)", "\n".join(instrumentacion.registro.lineas()), file_name="trazas.jsonl", mime="application/x-ndjson")
@@ -0,0 +1,216 @@
+import os
+import sys
+import time
+import numpy as np
+
+CARPETA_COMPILADOS = "modelos_compilados"
+
+# Diferencia máxima aceptada entre el bosque compilado y el .pkl original
+TOLERANCIA_PARIDAD = 1e-9
+
+
+def _umbral_float32(umbral):
+    # sklearn compara X en float32 con umbrales float64 (x <= t). Para un x
+    # float32 equivale a x <= (mayor float32 <= t), así que el umbral se puede
+    # guardar en float32 sin cambiar ninguna decisión.
+    u32 = umbral.astype(np.float32)
+    altos = u32.astype(np.float64) > umbral
+    u32[altos] = np.nextafter(u32[altos], np.float32(-np.inf))
+    return u32
+
+
+# 🔹 BOSQUE COMPILADO
+# Todos los árboles de un RandomForestRegressor en arrays planos. Los nodos
+# internos guardan (hijo izq, hijo der, feature, umbral) y las hojas sólo su
+# valor; un hijo >= 0 es otro nodo interno y uno negativo es la hoja ~h.
+# El recorrido son 'profundidad' pasos vectorizados sobre todas las filas y
+# todos los árboles a la vez, sin objetos de sklearn por árbol.
+class BosqueCompilado:
+    def __init__(self, izq, der, feature, umbral, nan_izq, hojas, raices, profundidad, n_features):
+        self.izq = izq
+        self.der = der
+        self.feature = feature
+        self.umbral = umbral
+        self.nan_izq = nan_izq
+        self.valor_hojas = hojas
+        self.raices = raices
+        self.profundidad = int(profundidad)
+        self.n_features_in_ = int(n_features)
+
+    @classmethod
+    def desde_sklearn(cls, modelo):
+        arboles = [e.tree_ for e in getattr(modelo, 'estimators_', [modelo])]
+        if any(t.n_outputs != 1 for t in arboles):
+            raise ValueError("Sólo se compilan regresores de una salida")
+
+        izq, der, feature, umbral, nan_izq, hojas, raices = [], [], [], [], [], [], []
+        internos_previos = hojas_previas = 0
+        for t in arboles:
+            hoja = t.children_left == -1
+            internos = np.flatnonzero(~hoja)
+            # Nodo original -> índice compacto (interno) o ~índice de hoja
+            nuevo = np.empty(t.node_count, dtype=np.int64)
+            nuevo[internos] = internos_previos + np.arange(len(internos))
+            nuevo[hoja] = ~(hojas_previas + np.arange(int(hoja.sum())))
+            izq.append(nuevo[t.children_left[internos]])
+            der.append(nuevo[t.children_right[internos]])
+            feature.append(t.feature[internos])
+            umbral.append(t.threshold[internos])
+            nan_izq.append(getattr(t, 'missing_go_to_left', np.zeros(t.node_count, dtype=np.uint8))[internos].astype(bool))
+            hojas.append(t.value[hoja, 0, 0])
+            raices.append(nuevo[0])
+            internos_previos += len(internos)
+            hojas_previas += int(hoja.sum())
+
+        n_features = modelo.n_features_in_
+        puntero = np.promote_types(np.min_scalar_type(-hojas_previas - 1), np.min_scalar_type(internos_previos))
+        return cls(
+            izq=np.concatenate(izq).astype(puntero),
+            der=np.concatenate(der).astype(puntero),
+            feature=np.concatenate(feature).astype(np.min_scalar_type(max(n_features - 1, 0))),
+            umbral=_umbral_float32(np.concatenate(umbral)),
+            nan_izq=np.concatenate(nan_izq),
+            hojas=np.concatenate(hojas).astype(np.float64),
+            raices=np.array(raices, dtype=np.int64),
+            profundidad=max(t.max_depth for t in arboles),
+            n_features=n_features,
+        )
+
+    @property
+    def n_arboles(self):
+        return len(self.raices)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.izq, self.der, self.feature, self.umbral, self.nan_izq, self.valor_hojas, self.raices))
+
+    def hojas(self, X):
+        # (filas, árboles) -> índice de la hoja alcanzada en cada árbol
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        filas = np.arange(len(X))[:, None]
+        nodos = np.broadcast_to(self.raices, (len(X), self.n_arboles)).copy()
+        con_nan = np.isnan(X).any()
+        for _ in range(self.profundidad):
+            internos = nodos >= 0
+            i = np.where(internos, nodos, 0)
+            x = X[filas, self.feature[i]]
+            izquierda = x <= self.umbral[i]
+            if con_nan:
+                izquierda |= np.isnan(x) & self.nan_izq[i]
+            nodos = np.where(internos, np.where(izquierda, self.izq[i], self.der[i]), nodos)
+        return ~nodos
+
+    def predict(self, X):
+        # Media de las hojas sumando árbol a árbol, como sklearn (cumsum es
+        # secuencial, así que el redondeo coincide)
+        valores = self.valor_hojas[self.hojas(X)]
+        return np.cumsum(valores, axis=1)[:, -1] / self.n_arboles
+
+    # --- PERSISTENCIA ---
+    def guardar(self, ruta, firma=""):
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        tmp = ruta + ".tmp.npz"
+        np.savez(
+            tmp, izq=self.izq, der=self.der, feature=self.feature, umbral=self.umbral,
+            nan_izq=self.nan_izq, hojas=self.valor_hojas, raices=self.raices,
+            meta=np.array([self.profundidad, self.n_features_in_]), firma=np.array(firma),
+        )
+        os.replace(tmp, ruta)
+
+    @classmethod
+    def cargar(cls, ruta, firma=None):
+        # None si no existe o si se compiló a partir de otro .pkl
+        if not os.path.exists(ruta):
+            return None
+        with np.load(ruta) as z:
+            if firma is not None and str(z['firma']) != firma:
+                return None
+            profundidad, n_features = z['meta']
+            return cls(z['izq'], z['der'], z['feature'], z['umbral'], z['nan_izq'], z['hojas'], z['raices'], profundidad, n_features)
+
+
+# 🔹 PARIDAD CON EL .PKL
+def muestra_paridad(modelo, n=512, semilla=0):
+    # Entradas sintéticas que recorren los umbrales reales de cada feature:
+    # valores en los propios umbrales y entre ellos (caso límite x == t), y
+    # algún NaN (rama de valores ausentes). Los splits entrenados con NaN
+    # pueden tener umbral infinito: ésos no sirven como muestra.
+    rng = np.random.default_rng(semilla)
+    X = rng.normal(0, 2, (n, modelo.n_features_in_))
+    for f in range(modelo.n_features_in_):
+        umbrales = np.concatenate([e.tree_.threshold[e.tree_.feature == f] for e in getattr(modelo, 'estimators_', [modelo])])
+        umbrales = umbrales[np.isfinite(umbrales)]
+        if len(umbrales):
+            elegidos = rng.choice(umbrales, n)
+            exactos = rng.random(n) < 0.3
+            X[:, f] = np.where(exactos, elegidos.astype(np.float32), elegidos + rng.normal(0, 0.05, n))
+    X[rng.random(X.shape) < 0.02] = np.nan
+    return X
+
+
+def diferencia_maxima(modelo, compilado, X):
+    return float(np.max(np.abs(modelo.predict(X) - compilado.predict(X)))) if len(X) else 0.0
+
+
+def _ruta_compilado(nombre, carpeta=CARPETA_COMPILADOS):
+    return os.path.join(carpeta, f"{nombre}.npz")
+
+
+def compilar(nombre, modelo, firma, carpeta=CARPETA_COMPILADOS, X=None):
+    # Compila, comprueba la paridad y guarda. Lanza ValueError si no coincide.
+    compilado = BosqueCompilado.desde_sklearn(modelo)
+    X = muestra_paridad(modelo) if X is None else X
+    delta = diferencia_maxima(modelo, compilado, X)
+    if delta > TOLERANCIA_PARIDAD:
+        raise ValueError(f"{nombre}: el bosque compilado difiere del original ({delta:.3g})")
+    compilado.guardar(_ruta_compilado(nombre, carpeta), firma)
+    return compilado
+
+
+def cargar_o_compilar(nombre, ruta_pkl, cargar_pkl, firma, carpeta=CARPETA_COMPILADOS):
+    compilado = BosqueCompilado.cargar(_ruta_compilado(nombre, carpeta), firma)
+    if compilado is None:
+        compilado = compilar(nombre, cargar_pkl(ruta_pkl), firma, carpeta)
+    return compilado
+
+
+def bytes_sklearn(modelo):
+    # Arrays de nodos de los árboles de sklearn (sin contar los objetos Python)
+    return sum(
+        sum(a.nbytes for a in (t.children_left, t.children_right, t.feature, t.threshold, t.value,
+                               t.impurity, t.n_node_samples, t.weighted_n_node_samples))
+        for t in (e.tree_ for e in getattr(modelo, 'estimators_', [modelo]))
+    )
+
+
+if __name__ == "__main__":
+    # python arboles.py [rf_paradas ...] -> compila, comprueba paridad y compara
+    # latencia (1 fila) y memoria frente al .pkl
+    from modelos import RegistroModelos, firma_modelo
+
+    registro = RegistroModelos(compilados=set())
+    nombres = sys.argv[1:] or [n for n in registro.rutas if n.startswith("rf_")]
+    for nombre in nombres:
+        modelo = registro[nombre]
+        compilado = compilar(nombre, modelo, firma_modelo(registro.rutas[nombre]))
+        X = muestra_paridad(modelo, n=2000, semilla=1)
+        delta = diferencia_maxima(modelo, compilado, X)
+
+        fila = X[:1]
+        t = time.perf_counter()
+        for _ in range(20):
+            modelo.predict(fila)
+        ms_pkl = (time.perf_counter() - t) / 20 * 1000
+        t = time.perf_counter()
+        for _ in range(200):
+            compilado.predict(fila)
+        ms_comp = (time.perf_counter() - t) / 200 * 1000
+
+        print(f"{nombre}: {compilado.n_arboles} árboles, delta máx {delta:.2g} | "
+              f"1 fila {ms_pkl:.2f} ms -> {ms_comp:.3f} ms | "
+              f"nodos {bytes_sklearn(modelo) / 1024:.0f} KB -> {compilado.nbytes / 1024:.0f} KB | "
+              f"disco {os.path.getsize(registro.rutas[nombre]) / 1024:.0f} KB -> {os.path.getsize(_ruta_compilado(nombre)) / 1024:.0f} KB")
@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import time
+import argparse
+import functools
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+import matplotlib
+matplotlib.use("Agg")
+
+from datos import cargar_dataset, agregar_derivadas
+from indices import IndiceDatos
+from almacen import AlmacenJugadores
+from percentiles import MatrizPercentiles
+from similitud import IndiceSimilitud
+from equipos import construir_tabla_equipos
+from filtros import MotorFiltros
+from rankings import Clasificaciones
+import utils
+import campo
+
+RUTA_BASE = "benchmark_base.json"
+
+# Regresión = mediana (p50) o pico de memoria por encima de la base en más de
+# un TOLERANCIA relativo y de un mínimo absoluto. Entre ejecuciones idénticas
+# la mediana de una construcción de pocos ms varía hasta un ~40 %.
+# La mediana es la de RONDAS rondas de medida. Un caso marcado se vuelve a
+# medir CONFIRMACIONES veces antes de darlo por regresión.
+# El p95 de operaciones de menos de un milisegundo varía aún más: sólo se informa.
+TOLERANCIA = 0.5
+MINIMO_MS = 1.0
+MINIMO_MB = 1.0
+
+RONDAS = 3
+CONFIRMACIONES = 2
+# Construcciones cronometradas por ronda (cada una puede tardar segundos)
+REPETICIONES_CONSTRUCCION = 3
+
+# Métricas del radar del Tab 3
+CATEGORIAS_RADAR = ['SCA90', 'GCA90', 'PrgP', 'PrgC', 'Touches', 'Tkl+Int', 'Blocks', 'Won']
+
+
+# 🔹 DATASET SINTÉTICO
+# final.csv repetido hasta n filas. La copia 0 es el dataset real; las demás
+# llevan sufijo en jugador y equipo (equipos de tamaño realista) y un ruido
+# multiplicativo en las métricas. Determinista para una misma semilla.
+def generar_dataset(n, base=None, semilla=0, ruido=0.1):
+    if base is None:
+        base = cargar_dataset(imagenes=False)
+    rng = np.random.default_rng(semilla)
+    filas = np.arange(n) % len(base)
+    copia = np.arange(n) // len(base)
+
+    df = base.iloc[filas].reset_index(drop=True)
+    sufijo = np.where(copia > 0, " " + (copia + 1).astype(str), "")
+    df['Player'] = df['Player'].astype(str) + sufijo
+    df['Squad'] = (df['Squad'].astype(str) + sufijo).astype('category')
+
+    copias = copia > 0
+    for col in base.select_dtypes(include='number').columns:
+        valores = df[col].to_numpy(dtype=np.float64, copy=True)
+        factor = 1 + rng.normal(0, ruido, copias.sum())
+        valores[copias] = valores[copias] * factor
+        if col != 'FatigueIndex':
+            valores = np.where(np.isnan(valores), valores, np.maximum(valores, 0))
+        if pd.api.types.is_integer_dtype(base[col]):
+            valores = np.round(valores)
+        df[col] = valores.astype(base[col].dtype)
+    return agregar_derivadas(df)
+
+
+# 🔹 MEDICIÓN
+def _cronometrar(funcion, repeticiones):
+    tiempos = np.empty(repeticiones)
+    for i in range(repeticiones):
+        t = time.perf_counter()
+        funcion()
+        tiempos[i] = time.perf_counter() - t
+    return tiempos * 1000
+
+
+def _pico_mb(funcion):
+    # Memoria en una ejecución aparte (tracemalloc ralentiza la medida de tiempo)
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico / 1024 ** 2
+
+
+def medir(funcion, repeticiones, calentamiento=1, rondas=RONDAS):
+    # p50 / p95 de cada ronda y la mediana entre rondas: una ronda lenta
+    # (GC, otro proceso) no basta para marcar una regresión
+    for _ in range(calentamiento):
+        funcion()
+    rondas_ms = [_cronometrar(funcion, repeticiones) for _ in range(rondas)]
+    return {
+        'p50_ms': float(np.median([np.percentile(t, 50) for t in rondas_ms])),
+        'p95_ms': float(np.median([np.percentile(t, 95) for t in rondas_ms])),
+        'pico_mb': _pico_mb(funcion),
+    }
+
+
+class Ciclo:
+    # Devuelve los elementos de una lista por turnos (cada llamada una consulta distinta)
+    def __init__(self, valores):
+        self.valores = list(valores)
+        self.i = -1
+
+    def __call__(self):
+        self.i = (self.i + 1) % len(self.valores)
+        return self.valores[self.i]
+
+
+# 🔹 CASOS
+def ejecutar(df, repeticiones=50, semilla=0, motor=True, rondas=RONDAS):
+    # -> (resultados, notas, medidores): medidores[caso]() repite la medida
+    rng = np.random.default_rng(semilla)
+    medidores = {}
+    notas = []
+
+    estructuras = [
+        ('indice', lambda: IndiceDatos(df)),
+        ('almacen', lambda: AlmacenJugadores(df, indice=indice)),
+        ('tabla_equipos', lambda: construir_tabla_equipos(df)),
+        ('percentiles', lambda: MatrizPercentiles(df, CATEGORIAS_RADAR, indice=indice)),
+        ('similitud', lambda: IndiceSimilitud(df, indice=indice)),
+        ('filtros', lambda: MotorFiltros(df)),
+        ('clasificaciones', lambda: Clasificaciones(df)),
+    ]
+    construidas = {}
+    for nombre, construir in estructuras:
+        # La primera construcción es la que usan los casos (y el calentamiento)
+        construidas[nombre] = construir()
+        medidores[f'construir:{nombre}'] = functools.partial(medir, construir, REPETICIONES_CONSTRUCCION, 0, rondas)
+        if nombre == 'indice':
+            indice = construidas['indice']
+    almacen = construidas['almacen']
+    tabla = construidas['tabla_equipos']
+    pct = construidas['percentiles']
+    sim = construidas['similitud']
+    filtros = construidas['filtros']
+    clasif = construidas['clasificaciones']
+
+    jugadores = Ciclo(rng.choice(df['Player'].to_numpy(), 64))
+    equipos = Ciclo(rng.choice(tabla.index.to_numpy(), 64))
+    posiciones = list(df['Pos'].unique())
+
+    def filtro_aleatorio():
+        a = int(rng.integers(16, 30))
+        return {
+            'Min': (float(rng.integers(0, 2000)), None),
+            'Pos': posiciones,
+            'SCA90': (float(rng.uniform(0, 4)), None),
+            'G+A': (float(rng.uniform(0, 5)), None),
+            'Age': (a, a + int(rng.integers(2, 12))),
+        }
+
+    filtro_base = filtro_aleatorio()
+
+    casos = [
+        ('utils.compare_players', lambda: utils.compare_players(df, jugadores(), jugadores(), indice=indice), repeticiones),
+        ('utils.compare_players (almacen)', lambda: utils.compare_players(df, jugadores(), jugadores(), almacen=almacen), repeticiones),
+        ('utils.jugadores_similares', lambda: utils.jugadores_similares(df, jugadores(), indice=indice, similitud=sim), repeticiones),
+        ('utils.club_dna_vector', lambda: utils.club_dna_vector(df, equipos(), tabla=tabla), repeticiones),
+        ('utils.radar_data', lambda: utils.radar_data(df, equipos(), tabla=tabla), repeticiones),
+        ('utils.matchup_predictor', lambda: utils.matchup_predictor(df, equipos(), equipos(), tabla=tabla), repeticiones),
+        ('tab3.radar_percentiles', lambda: pct.percentiles_filas([indice.posicion(jugadores()), indice.posicion(jugadores())], CATEGORIAS_RADAR), repeticiones),
+        ('tab4.filtro (nuevo)', lambda: filtros.consultar(filtro_aleatorio()), repeticiones),
+        ('tab4.filtro (repetido)', lambda: filtros.consultar(filtro_base), repeticiones),
+        ('tab5.lideres', lambda: [clasif.lider(m) for m in ('Gls', 'Ast', 'DefScore', 'MidScore')], repeticiones),
+        ('tab5.top5', lambda: [clasif.tabla(df, m, 5) for m in ('Gls', 'Ast', 'Tkl+Int', 'PrgP')], repeticiones),
+        ('campo.draw_mplsoccer_pitch_from_csv', lambda: campo.figura_a_bytes(campo.draw_mplsoccer_pitch_from_csv(df, equipos(), equipos(), indice)), max(3, repeticiones // 10)),
+    ]
+
+    if motor:
+        try:
+            import ai_engine
+        except ImportError as e:
+            notas.append(f"ai_engine no disponible ({e}): se omiten predecir_jugador / predecir_partido")
+        else:
+            ai_engine.usar_dataset(df)
+            faltan = ai_engine.modelos.faltantes(ai_engine.MODELOS_PORTERO + ai_engine.MODELOS_CAMPO)
+            if faltan:
+                # predecir_familia salta los modelos ausentes y calcula el resto
+                omitidas = [f"{columna} ({tipo})" for tipo, familia in (('portero', ai_engine.PREDICCIONES_PORTERO), ('campo', ai_engine.PREDICCIONES_CAMPO))
+                            for columna, (scaler, bosque, _) in familia.items() if scaler in faltan or bosque in faltan]
+                notas.append(f"Modelos no disponibles ({', '.join(faltan)}): predecir_jugador no incluye en el tiempo {', '.join(omitidas)}")
+            porteros = Ciclo(rng.choice(df.loc[df['Pos'] == 'GK', 'Player'].to_numpy(), 32))
+            campo_jug = Ciclo(rng.choice(df.loc[df['Pos'] != 'GK', 'Player'].to_numpy(), 32))
+            casos += [
+                ('ai_engine.predecir_jugador (portero)', lambda: ai_engine.predecir_jugador(porteros()), repeticiones),
+                ('ai_engine.predecir_jugador (campo)', lambda: ai_engine.predecir_jugador(campo_jug()), repeticiones),
+                ('ai_engine.predecir_jugador (errata)', lambda: ai_engine.predecir_jugador(campo_jug()[:-1]), repeticiones),
+                ('ai_engine.predecir_partido', lambda: ai_engine.predecir_partido(equipos(), equipos()), repeticiones),
+            ]
+
+    for nombre, funcion, n in casos:
+        medidores[nombre] = functools.partial(medir, funcion, n, rondas=rondas)
+    resultados = {caso: medidor() for caso, medidor in medidores.items()}
+    return resultados, notas, medidores
+
+
+# 🔹 COMPARACIÓN CON LA BASE
+def comparar(resultados, base, tolerancia=TOLERANCIA):
+    # {caso: [motivos]} de los casos por encima de la base
+    regresiones = {}
+    for caso, actual in resultados.items():
+        previo = base.get(caso)
+        if previo is None:
+            continue
+        motivos = []
+        if actual['p50_ms'] > previo['p50_ms'] * (1 + tolerancia) and actual['p50_ms'] - previo['p50_ms'] > MINIMO_MS:
+            motivos.append(f"{caso}: p50 {previo['p50_ms']:.3f} -> {actual['p50_ms']:.3f} ms")
+        if actual['pico_mb'] > previo['pico_mb'] * (1 + tolerancia) and actual['pico_mb'] - previo['pico_mb'] > MINIMO_MB:
+            motivos.append(f"{caso}: memoria {previo['pico_mb']:.1f} -> {actual['pico_mb']:.1f} MB")
+        if motivos:
+            regresiones[caso] = motivos
+    return regresiones
+
+
+def confirmar(regresiones, base, medidores, tolerancia=TOLERANCIA, intentos=CONFIRMACIONES):
+    # Sólo sigue siendo regresión lo que vuelve a superar la base en cada nueva medida
+    for _ in range(intentos):
+        if not regresiones:
+            break
+        regresiones = comparar({caso: medidores[caso]() for caso in regresiones}, base, tolerancia)
+    return [motivo for motivos in regresiones.values() for motivo in motivos]
+
+
+def informe(n, resultados, base):
+    print(f"\n=== {n:,} filas ===")
+    print(f"{'caso':45s} {'p50 ms':>10s} {'p95 ms':>10s} {'pico MB':>9s} {'base p50':>10s}")
+    for caso, r in resultados.items():
+        previo = base.get(caso, {}).get('p50_ms')
+        previo = f"{previo:10.3f}" if previo is not None else f"{'-':>10s}"
+        print(f"{caso:45s} {r['p50_ms']:10.3f} {r['p95_ms']:10.3f} {r['pico_mb']:9.1f} {previo}")
+
+
+if __name__ == "__main__":
+    # python benchmark.py [--filas 10000,100000] [--guardar-base] -> sale con código 1 si hay regresiones
+    parser = argparse.ArgumentParser(description="Benchmark de los caminos críticos de app, motor y utils")
+    parser.add_argument("--filas", default="10000", help="Tamaños separados por comas (p. ej. 10000,100000,1000000)")
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--rondas", type=int, default=RONDAS, help="Rondas de medida por caso (se compara la mediana)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--base", default=RUTA_BASE)
+    parser.add_argument("--guardar-base", action="store_true", help="Guarda los resultados como nueva base")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    parser.add_argument("--sin-motor", action="store_true", help="No mide ai_engine")
+    args = parser.parse_args()
+
+    base = {}
+    if os.path.exists(args.base):
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+
+    real = cargar_dataset(imagenes=False)
+    todos, regresiones = {}, []
+    for n in [int(x) for x in args.filas.split(",")]:
+        df = generar_dataset(n, real, semilla=args.semilla)
+        resultados, notas, medidores = ejecutar(df, args.repeticiones, args.semilla, motor=not args.sin_motor, rondas=args.rondas)
+        todos[str(n)] = resultados
+        informe(n, resultados, base.get(str(n), {}))
+        for nota in notas:
+            print(f"Nota: {nota}")
+        marcadas = comparar(resultados, base.get(str(n), {}), args.tolerancia)
+        regresiones += [f"[{n}] {r}" for r in confirmar(marcadas, base.get(str(n), {}), medidores, args.tolerancia)]
+
+    if args.guardar_base:
+        base.update(todos)
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump(base, f, indent=2)
+        print(f"\nBase guardada en {args.base}")
+
+    if regresiones:
+        print("\nREGRESIONES:")
+        for r in regresiones:
+            print(f"  {r}")
+        sys.exit(1)
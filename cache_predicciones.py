@@ -0,0 +1,106 @@
+import glob
+import hashlib
+import os
+import pandas as pd
+from indices import normalizar
+
+CARPETA_CACHE = "predicciones_cache"
+RUTA_DATASET = "final.csv"
+
+
+# 🔹 HUELLA DEL DATASET + MODELOS
+# Cualquier cambio en final.csv o en un .pkl produce una huella distinta, así
+# que la caché anterior deja de usarse automáticamente.
+def archivos_huella(ruta_dataset=RUTA_DATASET):
+    return [ruta_dataset] + sorted(glob.glob("*.pkl"))
+
+
+def firma_rapida(rutas):
+    # (tamaño, mtime) de cada archivo: barato de comprobar en cada consulta
+    firma = []
+    for ruta in rutas:
+        if os.path.exists(ruta):
+            st = os.stat(ruta)
+            firma.append((ruta, st.st_size, st.st_mtime_ns))
+    return tuple(firma)
+
+
+def huella(rutas):
+    h = hashlib.sha1()
+    for ruta in rutas:
+        if not os.path.exists(ruta):
+            continue
+        h.update(os.path.basename(ruta).encode())
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloque)
+    return h.hexdigest()
+
+
+def _ruta_cache(clave, carpeta):
+    return os.path.join(carpeta, f"predicciones_{clave[:16]}")
+
+
+def _leer(ruta):
+    if os.path.exists(ruta + ".parquet"):
+        try:
+            return pd.read_parquet(ruta + ".parquet")
+        except ImportError:
+            pass
+    if os.path.exists(ruta + ".pkl"):
+        return pd.read_pickle(ruta + ".pkl")
+    return None
+
+
+def _escribir(tabla, ruta):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    try:
+        tabla.to_parquet(ruta + ".parquet", index=False)
+    except ImportError:
+        # Sin pyarrow/fastparquet se guarda en pickle
+        tabla.to_pickle(ruta + ".pkl")
+
+
+# 🔹 ALMACÉN DE PREDICCIONES
+class AlmacenPredicciones:
+    def __init__(self, tabla, clave, firma):
+        self.tabla = tabla
+        self.clave = clave
+        self.firma = firma
+
+        # Nombre normalizado -> respuesta ya formateada (primera aparición)
+        self.respuestas = {}
+        for r in tabla.itertuples(index=False):
+            nombre = normalizar(r.Player)
+            if nombre in self.respuestas:
+                continue
+            if r.Tipo == 'Portero':
+                respuesta = {'Tipo': 'Portero', 'Valor_M': r.Valor_M, 'Paradas': r.Paradas, 'FatigueIndex': r.FatigueIndex}
+            else:
+                respuesta = {'Tipo': 'Campo', 'Valor_M': r.Valor_M, 'Goles': r.Goles, 'Asistencias': r.Asistencias, 'FatigueIndex': r.FatigueIndex}
+            # Columnas vacías (modelo no disponible al generar la caché) se omiten
+            self.respuestas[nombre] = {k: (int(v) if k == 'Paradas' else v) for k, v in respuesta.items() if not pd.isna(v)}
+
+    @classmethod
+    def cargar(cls, ruta_dataset=RUTA_DATASET, carpeta=CARPETA_CACHE):
+        # Sólo lectura: devuelve None si no hay caché para la huella actual
+        rutas = archivos_huella(ruta_dataset)
+        clave = huella(rutas)
+        tabla = _leer(_ruta_cache(clave, carpeta))
+        if tabla is None:
+            return None
+        return cls(tabla, clave, firma_rapida(rutas))
+
+    @classmethod
+    def cargar_o_construir(cls, construir, ruta_dataset=RUTA_DATASET, carpeta=CARPETA_CACHE):
+        rutas = archivos_huella(ruta_dataset)
+        clave = huella(rutas)
+        ruta = _ruta_cache(clave, carpeta)
+        tabla = _leer(ruta)
+        if tabla is None:
+            tabla = construir()
+            _escribir(tabla, ruta)
+        return cls(tabla, clave, firma_rapida(rutas))
+
+    def buscar(self, nombre):
+        return self.respuestas.get(normalizar(nombre))
@@ -0,0 +1,209 @@
+import io
+import os
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import matplotlib.pyplot as plt
+from mplsoccer import Pitch
+from indices import obtener_indice
+from instrumentacion import tramo, contar
+
+CARPETA_MITADES = "campo_cache"
+FIGSIZE = (14, 9)
+DPI = 100
+FONDO = "#1a1a1a"
+
+# --- POSICIÓN X (NO CRUZA MITAD) ---
+X_MAP = {
+    "left": {"GK": 6, "DF": 20, "MF": 38, "FW": 54},
+    "right": {"GK": 114, "DF": 100, "MF": 82, "FW": 66}
+}
+X_DEFECTO = {"left": 38, "right": 82}
+
+
+# 🔹 ALINEACIÓN (11 con más minutos) Y COORDENADAS
+def alineacion(df, team, side, indice=None):
+    indice = obtener_indice(df, indice)
+    lineup = indice.filas_equipo(df, team).nlargest(11, "Min").copy()
+
+    lineup["Line"] = lineup["Pos"].astype(str).str[:2]
+    # Posición dentro de la línea y tamaño de la línea, en el orden del once
+    idx = lineup.groupby("Line", sort=False).cumcount().to_numpy()
+    total = lineup.groupby("Line", sort=False)["Line"].transform("size").to_numpy()
+
+    lineup["x"] = lineup["Line"].map(X_MAP[side]).fillna(X_DEFECTO[side]).to_numpy()
+    lineup["y"] = np.where(total == 1, 40, 10 + idx * 60 / np.maximum(total - 1, 1))
+    lineup["Rating"] = lineup["Rating"] if "Rating" in lineup.columns else 6.5
+    return lineup
+
+
+def _pitch(transparente=False):
+    if transparente:
+        return Pitch(pitch_type="statsbomb", pitch_color="none", line_color="none")
+    return Pitch(pitch_type="statsbomb", pitch_color=FONDO, line_color="#444444")
+
+
+# --- DIBUJO DE JUGADORES ---
+def _dibujar_equipo(pitch, ax, lineup):
+    # Un único scatter por equipo; los textos van jugador a jugador
+    pitch.scatter(
+        lineup["x"].to_numpy(), lineup["y"].to_numpy(),
+        s=700,
+        color="white",
+        edgecolors="#333",
+        ax=ax,
+        zorder=3
+    )
+
+    for x, y, rating, nombre in zip(lineup["x"], lineup["y"], lineup["Rating"], lineup["Player"]):
+        color = "#2ecc71" if rating >= 7 else "#f1c40f"
+        ax.text(
+            x, y + 3.5,
+            f"{rating:.2f}",
+            ha="center", va="center",
+            color="white",
+            fontsize=9,
+            fontweight="bold",
+            bbox=dict(facecolor=color, edgecolor="none", boxstyle="round,pad=0.25")
+        )
+        ax.text(
+            x, y - 6,
+            nombre.split()[-1],
+            ha="center", va="center",
+            color="white",
+            fontsize=10,
+            fontweight="bold"
+        )
+
+
+def draw_mplsoccer_pitch_from_csv(df, team_left, team_right, indice=None):
+    pitch = _pitch()
+    fig, ax = pitch.draw(figsize=FIGSIZE)
+    fig.set_facecolor(FONDO)
+
+    for team, side in [(team_left, "left"), (team_right, "right")]:
+        _dibujar_equipo(pitch, ax, alineacion(df, team, side, indice))
+
+    return fig
+
+
+def figura_a_bytes(fig, formato="png", transparente=False):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=formato, dpi=DPI, transparent=transparente,
+                facecolor="none" if transparente else fig.get_facecolor())
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+# 🔹 CACHÉ LRU DE FIGURAS (limitada por bytes)
+# Compartida por todas las sesiones de Streamlit (un hilo por sesión): el
+# OrderedDict y el contador de bytes sólo se tocan con el cerrojo tomado
+class CacheFiguras:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entradas = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self._cerrojo = threading.Lock()
+
+    def get(self, clave):
+        with self._cerrojo:
+            valor = self.entradas.get(clave)
+            if valor is None:
+                self.fallos += 1
+                return None
+            self.entradas.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def put(self, clave, valor):
+        with self._cerrojo:
+            if clave in self.entradas:
+                self.bytes -= len(self.entradas.pop(clave))
+            self.entradas[clave] = valor
+            self.bytes += len(valor)
+            while self.bytes > self.max_bytes and len(self.entradas) > 1:
+                _, viejo = self.entradas.popitem(last=False)
+                self.bytes -= len(viejo)
+
+
+cache_figuras = CacheFiguras()
+
+
+def campo_png(df, team_left, team_right, version, indice=None, cache=None):
+    cache = cache_figuras if cache is None else cache
+    clave = (team_left, team_right, version)
+    png = cache.get(clave)
+    if png is not None:
+        contar("campo.cache_aciertos")
+        return png
+    contar("campo.cache_fallos")
+    with tramo("campo.componer_mitades"):
+        png = componer_mitades(team_left, team_right, version)
+    if png is None:
+        with tramo("campo.render"):
+            png = figura_a_bytes(draw_mplsoccer_pitch_from_csv(df, team_left, team_right, indice))
+    cache.put(clave, png)
+    return png
+
+
+# 🔹 PRE-RENDER DE MEDIAS PARTES
+# Cada equipo se dibuja una vez por lado sobre fondo transparente, con la misma
+# figura y ejes que el campo completo; un par se compone pegando capas.
+def _ruta_mitad(carpeta, version, team, side, formato="png"):
+    nombre = "".join(c if c.isalnum() else "_" for c in str(team))
+    return os.path.join(carpeta, str(version), f"{nombre}_{side}.{formato}")
+
+
+def prerenderizar_mitades(df, version, carpeta=CARPETA_MITADES, formatos=("png",), indice=None):
+    indice = obtener_indice(df, indice)
+    os.makedirs(os.path.join(carpeta, str(version)), exist_ok=True)
+
+    for formato in formatos:
+        fig, _ = _pitch().draw(figsize=FIGSIZE)
+        fig.set_facecolor(FONDO)
+        with open(os.path.join(carpeta, str(version), f"base.{formato}"), "wb") as f:
+            f.write(figura_a_bytes(fig, formato))
+
+    for team in indice.equipos:
+        for side in ("left", "right"):
+            pitch = _pitch(transparente=True)
+            fig, ax = pitch.draw(figsize=FIGSIZE)
+            _dibujar_equipo(pitch, ax, alineacion(df, team, side, indice))
+            for formato in formatos:
+                buffer = io.BytesIO()
+                fig.savefig(buffer, format=formato, dpi=DPI, transparent=True)
+                with open(_ruta_mitad(carpeta, version, team, side, formato), "wb") as f:
+                    f.write(buffer.getvalue())
+            plt.close(fig)
+
+
+def componer_mitades(team_left, team_right, version, carpeta=CARPETA_MITADES):
+    rutas = [os.path.join(carpeta, str(version), "base.png"),
+             _ruta_mitad(carpeta, version, team_left, "left"),
+             _ruta_mitad(carpeta, version, team_right, "right")]
+    if not all(os.path.exists(r) for r in rutas):
+        return None
+
+    from PIL import Image
+    base = Image.open(rutas[0]).convert("RGBA")
+    for ruta in rutas[1:]:
+        base.alpha_composite(Image.open(ruta).convert("RGBA"))
+    buffer = io.BytesIO()
+    base.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+if __name__ == "__main__":
+    # python campo.py [png|svg ...] -> pre-render de todas las mitades
+    import matplotlib
+    matplotlib.use("Agg")
+    from datos import cargar_dataset, RUTA_CSV
+    from cache_predicciones import huella
+
+    formatos = tuple(sys.argv[1:]) or ("png",)
+    version = huella([RUTA_CSV])[:12]
+    prerenderizar_mitades(cargar_dataset(imagenes=False), version, formatos=formatos)
+    print(f"Mitades pre-renderizadas en {CARPETA_MITADES}/{version}")
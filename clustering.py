@@ -0,0 +1,223 @@
+import os
+import sys
+import joblib
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+RUTA_MODELO = "clusters_modelo.joblib"
+
+# --- clustering.ipynb ---
+CLUSTER_VARS = [
+    'PrgDist','Carries','PrgP','PrgR',
+    'Att_stats_possession','Succ',
+    'xG','xAG',
+    'Tkl+Int','Blocks',
+    'Crs','KP','PrgC','Touches','Sh'
+]
+N_CLUSTERS = 6
+
+# A partir de este nº de jugadores se ajusta con MiniBatchKMeans
+UMBRAL_MINI_LOTE = 50_000
+TAMANO_LOTE = 4096
+
+# Jugadores usados para la silueta (O(n²) sobre la muestra)
+MUESTRA_SILUETA = 5000
+
+
+def matriz(df):
+    return df[CLUSTER_VARS].fillna(0).to_numpy(dtype=np.float64)
+
+
+def params_escalado(X):
+    # Igual que StandardScaler (desviación poblacional, escala 1 si es constante)
+    escala = X.std(axis=0)
+    return {'media': X.mean(axis=0), 'escala': np.where(escala == 0, 1, escala)}
+
+
+def escalar(X, params):
+    return (X - params['media']) / params['escala']
+
+
+def centroide_mas_cercano(Xs, centroides):
+    # |x - c|² = |x|² - 2 x·c + |c|² (sin el array filas x clusters x features)
+    distancias = (Xs ** 2).sum(axis=1)[:, None] - 2 * Xs @ centroides.T + (centroides ** 2).sum(axis=1)[None, :]
+    return distancias.argmin(axis=1)
+
+
+# 🔹 ESTILOS (reglas de clustering.ipynb, vectorizadas)
+# Mismo resultado que asignar_estilo_jugador (clustering.ipynb) fila a fila.
+def lineas(pos):
+    pos = pd.Series(pos).astype(str)
+    return np.select(
+        [pos.str.startswith('DF'), pos.str.startswith('MF'), pos.str.startswith('FW')],
+        ['Defensa', 'Mediocampo', 'Ataque'], 'Mediocampo'
+    )
+
+
+def estilos(df, percentiles):
+    v = {c: df[c].to_numpy(dtype=np.float64) for c in ['xG', 'Sh', 'Succ', 'Carries', 'xAG', 'KP', 'PrgP', 'PrgC', 'Tkl+Int']}
+    p6, p5 = percentiles.loc[0.6], percentiles.loc[0.5]
+    linea = lineas(df['Pos'])
+
+    ataque = np.select(
+        [(v['xG'] > p6['xG']) & (v['Sh'] > p6['Sh']),
+         (v['Succ'] > p6['Succ']) & (v['Carries'] > p6['Carries']),
+         (v['xAG'] > p6['xAG']) | (v['KP'] > p6['KP'])],
+        ['9 Goleador de Área', 'Extremo Desequilibrante', 'Segundo Delantero / Asistidor'],
+        'Atacante Asociativo'
+    )
+    medio = np.select(
+        [(v['PrgP'] > p6['PrgP']) & (v['KP'] > p5['KP']),
+         v['PrgC'] > p6['PrgC'],
+         v['Tkl+Int'] > p6['Tkl+Int']],
+        ['Organizador / Regista', 'Interior Conductor', 'Pivote Defensivo'],
+        'Interior Mixto'
+    )
+    defensa = np.select(
+        [v['PrgP'] > p6['PrgP'], v['Tkl+Int'] > p6['Tkl+Int']],
+        ['Central Constructor', 'Defensa Contundente'],
+        'Defensa Posicional'
+    )
+    return np.select([linea == 'Ataque', linea == 'Mediocampo'], [ataque, medio], defensa).astype(object)
+
+
+# 🔹 AJUSTE DE UN K (se ejecuta en los procesos del pool)
+_X_PROCESO = None
+
+
+def _iniciar_proceso(Xs):
+    # El dataset escalado se envía una vez por proceso, no una vez por k
+    global _X_PROCESO
+    _X_PROCESO = Xs
+    try:
+        # Un hilo de BLAS/OpenMP por proceso: los procesos ya ocupan los núcleos
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def _estimador(k, mini_lote, semilla, init='k-means++', n_init='auto'):
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    if mini_lote:
+        return MiniBatchKMeans(n_clusters=k, init=init, n_init=n_init, batch_size=TAMANO_LOTE, random_state=semilla)
+    return KMeans(n_clusters=k, init=init, n_init=n_init, random_state=semilla)
+
+
+def _ajustar_k(k, mini_lote, semilla, Xs=None):
+    from sklearn.metrics import silhouette_score
+    Xs = _X_PROCESO if Xs is None else Xs
+    modelo = _estimador(k, mini_lote, semilla).fit(Xs)
+    etiquetas = modelo.labels_ if hasattr(modelo, 'labels_') else modelo.predict(Xs)
+    silueta = silhouette_score(Xs, etiquetas, sample_size=min(MUESTRA_SILUETA, len(Xs)), random_state=semilla)
+    return {'k': k, 'centroides': modelo.cluster_centers_, 'inercia': float(modelo.inertia_), 'silueta': float(silueta)}
+
+
+def ajustar_rango(Xs, ks, procesos=1, mini_lote=None, semilla=42):
+    # {k: {'centroides', 'inercia', 'silueta'}} para cada k, en paralelo
+    mini_lote = len(Xs) >= UMBRAL_MINI_LOTE if mini_lote is None else mini_lote
+    ks = list(ks)
+    if procesos > 1 and len(ks) > 1:
+        with ProcessPoolExecutor(max_workers=min(procesos, len(ks)), initializer=_iniciar_proceso, initargs=(Xs,)) as pool:
+            resultados = list(pool.map(_ajustar_k, ks, [mini_lote] * len(ks), [semilla] * len(ks)))
+    else:
+        resultados = [_ajustar_k(k, mini_lote, semilla, Xs) for k in ks]
+    return {r['k']: r for r in resultados}
+
+
+# 🔹 MODELO DE CLUSTERS
+# Scaler + centroides + percentiles de las reglas de estilo. Un jugador nuevo
+# recibe cluster y estilo con una búsqueda del centroide más cercano; al
+# añadir datos se reajusta partiendo de los centroides anteriores (mismos ids).
+class ModeloClusters:
+    def __init__(self, escalado, centroides, percentiles, metricas=None, ids=None):
+        self.escalado = escalado
+        self.centroides = np.asarray(centroides, dtype=np.float64)
+        self.percentiles = percentiles
+        self.metricas = metricas or {}  # k -> inercia / silueta del último ajuste
+        # Id publicado de cada centroide (None = 0..k-1)
+        self.ids = None if ids is None else np.asarray(ids, dtype=np.int64)
+
+    @property
+    def k(self):
+        return len(self.centroides)
+
+    @classmethod
+    def ajustar(cls, df, ks=(N_CLUSTERS,), procesos=1, mini_lote=None, semilla=42):
+        # Con varios k se queda el de mayor silueta
+        X = matriz(df)
+        escalado = params_escalado(X)
+        rango = ajustar_rango(escalar(X, escalado), ks, procesos, mini_lote, semilla)
+        mejor = max(rango.values(), key=lambda r: r['silueta'])
+        metricas = {k: {'inercia': r['inercia'], 'silueta': r['silueta']} for k, r in rango.items()}
+        return cls(escalado, mejor['centroides'], df[CLUSTER_VARS].quantile([0.4, 0.5, 0.6]), metricas)
+
+    @classmethod
+    def desde_etiquetas(cls, df, etiquetas):
+        # Congela clusters ya publicados: centroide = media de cada etiqueta.
+        # Sólo las etiquetas presentes (un id sin jugadores daría un centroide
+        # NaN); si faltan ids se conserva la numeración publicada
+        X = matriz(df)
+        escalado = params_escalado(X)
+        Xs = escalar(X, escalado)
+        etiquetas = np.asarray(etiquetas, dtype=np.int64)
+        ids = np.unique(etiquetas)
+        centroides = np.vstack([Xs[etiquetas == k].mean(axis=0) for k in ids])
+        consecutivos = np.array_equal(ids, np.arange(len(ids)))
+        return cls(escalado, centroides, df[CLUSTER_VARS].quantile([0.4, 0.5, 0.6]),
+                   ids=None if consecutivos else ids)
+
+    def actualizar(self, df, mini_lote=None, semilla=42):
+        # Reajuste con datos añadidos: nuevo scaler, centroides anteriores
+        # trasladados a la nueva escala como punto de partida (n_init=1)
+        X = matriz(df)
+        escalado = params_escalado(X)
+        inicio = (self.centroides * self.escalado['escala'] + self.escalado['media'] - escalado['media']) / escalado['escala']
+        mini_lote = len(X) >= UMBRAL_MINI_LOTE if mini_lote is None else mini_lote
+        modelo = _estimador(self.k, mini_lote, semilla, init=inicio, n_init=1).fit(escalar(X, escalado))
+        self.escalado = escalado
+        self.centroides = modelo.cluster_centers_
+        self.percentiles = df[CLUSTER_VARS].quantile([0.4, 0.5, 0.6])
+        self.metricas = {self.k: {'inercia': float(modelo.inertia_)}}
+        return self
+
+    # --- ASIGNACIÓN ---
+    def clusters(self, df):
+        cercano = centroide_mas_cercano(escalar(matriz(df), self.escalado), self.centroides)
+        return cercano if self.ids is None else self.ids[cercano]
+
+    def asignar(self, df):
+        return pd.DataFrame({
+            'PlayerCluster': self.clusters(df),
+            'PlayerStyle': estilos(df, self.percentiles)
+        }, index=df.index)
+
+    # --- PERSISTENCIA ---
+    def guardar(self, ruta=RUTA_MODELO):
+        tmp = ruta + ".tmp"
+        joblib.dump({'escalado': self.escalado, 'centroides': self.centroides,
+                     'percentiles': self.percentiles, 'metricas': self.metricas, 'ids': self.ids}, tmp)
+        os.replace(tmp, ruta)
+
+    @classmethod
+    def cargar(cls, ruta=RUTA_MODELO):
+        if not os.path.exists(ruta):
+            return None
+        return cls(**joblib.load(ruta))
+
+
+if __name__ == "__main__":
+    # python clustering.py [3-10] [procesos] -> ajusta cada k en paralelo,
+    # muestra inercia / silueta y guarda el modelo del mejor k
+    from datos import cargar_dataset
+
+    desde, _, hasta = (sys.argv[1] if len(sys.argv) > 1 else f"{N_CLUSTERS}").partition("-")
+    ks = range(int(desde), int(hasta or desde) + 1)
+    procesos = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+
+    modelo = ModeloClusters.ajustar(cargar_dataset(imagenes=False), ks, procesos=procesos)
+    for k, m in sorted(modelo.metricas.items()):
+        print(f"k={k}: inercia {m['inercia']:.0f}, silueta {m['silueta']:.3f}" + ("  <-" if k == modelo.k else ""))
+    modelo.guardar()
+    print(f"Modelo guardado en {RUTA_MODELO}")
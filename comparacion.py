@@ -0,0 +1,108 @@
+import numpy as np
+import plotly.graph_objects as go
+from indices import obtener_indice
+from percentiles import obtener_percentiles
+
+# KPIs de la cabecera del Tab 3 y métricas de la huella estadística (radar)
+METRICAS_KPI = ['G+A', 'SCA90', 'PrgDist', 'Won']
+CATEGORIAS_RADAR = ['SCA90', 'GCA90', 'PrgP', 'PrgC', 'Touches', 'Tkl+Int', 'Blocks', 'Won']
+
+TERCIOS = ['Def 3rd_stats_possession', 'Mid 3rd_stats_possession', 'Att 3rd_stats_possession']
+ZONAS = ['Defensivo', 'Central', 'Atacante']
+
+MAX_JUGADORES = 50
+
+# Colores de la app primero; después una paleta cualitativa para listas largas
+PALETA = ['#bc6c25', '#dda15e', '#fefae0', '#606c38', '#e76f51', '#2a9d8f', '#e9c46a', '#8ab17d',
+          '#f4a261', '#264653', '#b5838d', '#6d597a', '#90be6d', '#577590', '#f94144', '#43aa8b']
+
+
+def _rgba(color, alfa):
+    return f"rgba({int(color[1:3], 16)}, {int(color[3:5], 16)}, {int(color[5:7], 16)}, {alfa})"
+
+
+# 🔹 COMPARACIÓN DE N JUGADORES
+# Una fila por jugador en cada matriz (KPIs, diferencias con la referencia,
+# percentiles, reparto por tercios): todo se calcula con operaciones sobre
+# matrices, sin recorrer jugadores ni métricas.
+class Comparacion:
+    def __init__(self, df, jugadores, indice=None, percentiles=None, referencia=None, ambito=None):
+        indice = obtener_indice(df, indice)
+        percentiles = obtener_percentiles(df, indice) if percentiles is None else percentiles
+
+        posiciones = [indice.posicion(j) for j in jugadores]
+        self.no_encontrados = [j for j, p in zip(jugadores, posiciones) if p is None]
+        self.filas = np.array([p for p in posiciones if p is not None], dtype=np.intp)
+        sub = df.iloc[self.filas]
+        self.nombres = sub['Player'].astype(str).tolist()
+        self.datos = sub[['Player', 'Squad', 'Pos', 'Age']].reset_index(drop=True)
+
+        # KPIs y diferencia (%) con la referencia (primer jugador por defecto)
+        self.kpi = sub[METRICAS_KPI].to_numpy(dtype=np.float64)
+        self.referencia = 0
+        if referencia is not None and referencia in self.nombres:
+            self.referencia = self.nombres.index(referencia)
+        ref = self.kpi[self.referencia] if len(self.filas) else np.zeros(len(METRICAS_KPI))
+        self.diferencias = (self.kpi - ref) / np.where(ref != 0, ref, 1) * 100
+
+        # Percentiles de la huella (toda la base o por competición / posición)
+        self.percentiles = (percentiles.percentiles_filas(self.filas, CATEGORIAS_RADAR, ambito)
+                            if len(self.filas) else np.empty((0, len(CATEGORIAS_RADAR))))
+        self.puntuacion = self.percentiles.mean(axis=1)
+
+        # Toques por tercio, su reparto (%) y la zona dominante
+        self.tercios = sub[TERCIOS].to_numpy(dtype=np.float64)
+        total = self.tercios.sum(axis=1, keepdims=True)
+        self.reparto = self.tercios / np.where(total > 0, total, 1) * 100
+        self.zona = (np.array(ZONAS, dtype=object)[self.tercios.argmax(axis=1)]
+                     if len(self.filas) else np.empty(0, dtype=object))
+
+    def __len__(self):
+        return len(self.filas)
+
+    # --- SALIDAS ---
+    def tabla(self):
+        # Ranking por percentil medio de la huella (mayor primero)
+        tabla = self.datos.copy()
+        tabla['Percentil medio'] = self.puntuacion.round(1)
+        for j, m in enumerate(METRICAS_KPI):
+            tabla[m] = self.kpi[:, j]
+            tabla[f'Δ% {m}'] = self.diferencias[:, j].round(1)
+        for j, z in enumerate(ZONAS):
+            tabla[f'% {z}'] = self.reparto[:, j].round(1)
+        tabla['Zona dominante'] = self.zona
+        orden = np.argsort(-self.puntuacion, kind='stable')
+        tabla = tabla.iloc[orden].reset_index(drop=True)
+        tabla.insert(0, 'Rank', np.arange(1, len(tabla) + 1))
+        return tabla
+
+    def radar(self, colores=PALETA, altura=450, relleno=None):
+        # Un único gráfico con una traza por jugador; con muchas trazas el
+        # relleno se hace más transparente
+        relleno = (0.3 if len(self) <= 3 else 0.08) if relleno is None else relleno
+        theta = CATEGORIAS_RADAR + CATEGORIAS_RADAR[:1]
+        r = np.hstack([self.percentiles, self.percentiles[:, :1]])
+        trazas = [
+            go.Scatterpolar(
+                r=r[i], theta=theta, fill='toself', name=self.nombres[i],
+                line=dict(color=colores[i % len(colores)], width=3 if len(self) <= 3 else 1.5),
+                fillcolor=_rgba(colores[i % len(colores)], relleno)
+            )
+            for i in range(len(self))
+        ]
+        fig = go.Figure(data=trazas)
+        fig.update_layout(
+            polar=dict(
+                radialaxis=dict(visible=True, range=[0, 100], gridcolor="#444", tickfont=dict(color="grey", size=8)),
+                angularaxis=dict(gridcolor="#444", tickfont=dict(color="white", size=10)),
+                bgcolor="rgba(0,0,0,0)"
+            ),
+            paper_bgcolor="rgba(0,0,0,0)",
+            legend=dict(orientation="h", y=-0.2, x=0.5, xanchor="center"),
+            height=altura, margin=dict(t=20, b=20)
+        )
+        return fig
+
+
+def comparar_jugadores(df, jugadores, indice=None, percentiles=None, referencia=None, ambito=None):
+    return Comparacion(df, jugadores[:MAX_JUGADORES], indice, percentiles, referencia, ambito)
@@ -0,0 +1,94 @@
+import os
+import numpy as np
+import pandas as pd
+
+RUTA_CSV = "final.csv"
+RUTA_COLUMNAR = "final.parquet"
+RUTA_IMAGENES = "final_imagenes.parquet"
+
+COLUMNAS_CATEGORICAS = ['Nation', 'Pos', 'Squad', 'Comp', 'StyleInsight', 'PlayerStyle']
+COLUMNAS_IMAGEN = ['PlayerImg', 'TeamImg']
+
+
+# 🔹 TIPOS COMPACTOS
+# Texto repetido -> category; enteros int64 -> int32 (sin riesgo de overflow en
+# las sumas de la app). Los float se mantienen en float64 para que los modelos
+# reciban exactamente los mismos valores que con el CSV.
+def optimizar_tipos(df):
+    df = df.copy()
+    for col in COLUMNAS_CATEGORICAS + COLUMNAS_IMAGEN:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in df.select_dtypes(include='integer').columns:
+        df[col] = df[col].astype(np.int32)
+    return df
+
+
+def _columnar_vigente(ruta_csv, ruta_columnar):
+    if not os.path.exists(ruta_columnar):
+        return False
+    if not os.path.exists(ruta_csv):
+        return True
+    return os.path.getmtime(ruta_columnar) >= os.path.getmtime(ruta_csv)
+
+
+def _escribir_atomico(tabla, ruta):
+    temporal = ruta + ".tmp"
+    tabla.to_parquet(temporal, index=False)
+    os.replace(temporal, ruta)
+
+
+# 🔹 COLUMNAS DERIVADAS
+# Las mismas fórmulas que usaba ai_engine.py; se calculan sobre el frame recibido.
+def agregar_derivadas(df):
+    df['Potencial'] = (df['SCA'] + df['Gls'] + df['Ast']) / df['Age']
+    df['Eficiencia'] = df['Gls'] / (df['SoT'] + 1)
+    df['DefImpact'] = df['Tkl'] + df['Int']
+
+    df['Score_Ataque'] = df['xG']*2 + df['Gls'] + df['Ast'] + df['KP'] + df['PPA'] + df['CrsPA']
+    df['Score_Defensa'] = df['Tkl'] + df['Int'] + df['Blocks'] + df['Clr'] + df['Def 3rd_stats_possession']
+    df['Score_Posesion'] = df[['Live_stats_possession','Touches','PrgDist']].mean(axis=1)
+    return df
+
+
+# 🔹 CONVERSIÓN CSV -> PARQUET
+# Las URLs de imagen van a una tabla aparte (misma posición de fila) para que
+# los procesos que no las necesitan no las carguen.
+def convertir_dataset(ruta_csv=RUTA_CSV, ruta_columnar=RUTA_COLUMNAR, ruta_imagenes=RUTA_IMAGENES, df=None):
+    if df is None:
+        df = optimizar_tipos(pd.read_csv(ruta_csv))
+    columnas_img = [c for c in COLUMNAS_IMAGEN if c in df.columns]
+    _escribir_atomico(df[columnas_img], ruta_imagenes)
+    _escribir_atomico(df.drop(columns=columnas_img), ruta_columnar)
+    return df
+
+
+# 🔹 CARGA
+# Lee el Parquet si está al día; si falta, está desfasado o no hay pyarrow,
+# vuelve al CSV (y, si puede, regenera el Parquet para el siguiente arranque).
+def cargar_dataset(imagenes=True, ruta_csv=RUTA_CSV, ruta_columnar=RUTA_COLUMNAR, ruta_imagenes=RUTA_IMAGENES, convertir=True):
+    if _columnar_vigente(ruta_csv, ruta_columnar):
+        try:
+            df = pd.read_parquet(ruta_columnar)
+            if imagenes and os.path.exists(ruta_imagenes):
+                img = pd.read_parquet(ruta_imagenes)
+                for col in img.columns:
+                    df[col] = img[col].values
+            return df
+        except (ImportError, OSError, ValueError):
+            pass
+
+    df = optimizar_tipos(pd.read_csv(ruta_csv))
+    if convertir:
+        try:
+            convertir_dataset(ruta_csv, ruta_columnar, ruta_imagenes, df=df)
+        except (ImportError, OSError):
+            pass
+    if not imagenes:
+        df = df.drop(columns=[c for c in COLUMNAS_IMAGEN if c in df.columns])
+    return df
+
+
+if __name__ == "__main__":
+    convertir_dataset()
+    print(f"{RUTA_COLUMNAR} y {RUTA_IMAGENES} generados a partir de {RUTA_CSV}")
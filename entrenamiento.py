@@ -0,0 +1,268 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import warnings
+import itertools
+import platform
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from concurrent.futures import ProcessPoolExecutor
+from almacen import FEATURES_VALOR, FEATURES_GK_PARADAS
+from cache_predicciones import huella, RUTA_DATASET
+
+CARPETA_SALIDA = "modelos_entrenados"
+CARPETA_CACHE = "entrenamiento_cache"
+RUTA_PUBLICADA = "modelos_version.json"
+
+N_FOLDS = 5
+SEMILLA = 42
+
+# Rejilla de la búsqueda (RandomForestRegressor); --rapido usa sólo la primera combinación
+REJILLA = {
+    'n_estimators': [200],
+    'max_depth': [None, 12],
+    'min_samples_leaf': [1, 3],
+    'max_features': [1.0, 0.5],
+}
+
+# 🔹 MODELOS QUE USA ai_engine.py
+# Los objetivos de goles / asistencias / paradas se deducen de los .pkl
+# publicados (sus predicciones coinciden con Gls / Ast / Rec, r > 0.999).
+# El del valor no quedó registrado: se usa la columna MarketValue si existe
+# y si no la fórmula de IA_MODELO.ipynb. Los modelos que comparten escalador
+# (mismas features y jugadores) comparten también los folds escalados.
+# La fórmula NO es lo que predicen los rf_valor_* publicados (el de porteros
+# da ~70 a todos, la fórmula 0-14): publicar() no los sustituye salvo que se
+# pida expresamente (--publicar-formula).
+OBJETIVO_FORMULA = 'formula IA_MODELO.ipynb'
+ESPECIFICACIONES = [
+    {'modelo': 'rf_valor_jugadores', 'escalador': 'scaler_valor_jugadores', 'features': FEATURES_VALOR, 'grupo': 'campo', 'objetivo': 'valor'},
+    {'modelo': 'rf_goles', 'escalador': 'scaler_valor_jugadores', 'features': FEATURES_VALOR, 'grupo': 'campo', 'objetivo': 'Gls'},
+    {'modelo': 'rf_asistencias', 'escalador': 'scaler_valor_jugadores', 'features': FEATURES_VALOR, 'grupo': 'campo', 'objetivo': 'Ast'},
+    {'modelo': 'rf_valor_porteros', 'escalador': 'scaler_valor_porteros', 'features': FEATURES_VALOR, 'grupo': 'porteros', 'objetivo': 'valor'},
+    {'modelo': 'rf_paradas', 'escalador': 'scaler_paradas', 'features': FEATURES_GK_PARADAS, 'grupo': 'porteros', 'objetivo': 'Rec'},
+]
+
+GRUPOS = {
+    'campo': lambda df: (df['Pos'] != 'GK').to_numpy(),
+    'porteros': lambda df: (df['Pos'] == 'GK').to_numpy(),
+}
+
+
+def valor_mercado(df):
+    if 'MarketValue' in df.columns:
+        return df['MarketValue']
+    # IA_MODELO.ipynb
+    return df['Gls'] * 8 + df['Ast'] * 6 + df['xG'] * 10 + df['xAG'] * 8 + df['KP'] * 4 + df['SCA'] * 2
+
+
+def objetivo(df, nombre):
+    return (valor_mercado(df) if nombre == 'valor' else df[nombre]).to_numpy(dtype=np.float64)
+
+
+def combinaciones(rejilla):
+    claves = sorted(rejilla)
+    return [dict(zip(claves, valores)) for valores in itertools.product(*(rejilla[c] for c in claves))]
+
+
+# 🔹 FOLDS ESCALADOS (caché en disco)
+# joblib.Memory guarda el resultado por contenido de X: mientras no cambien
+# los datos, las particiones y las matrices escaladas se leen de disco.
+memoria = joblib.Memory(CARPETA_CACHE, verbose=0)
+
+
+@memoria.cache
+def preparar_folds(X, n_folds=N_FOLDS, semilla=SEMILLA):
+    # [(train, test, X_train escalada, X_test escalada)]; el scaler se ajusta
+    # sólo con el train de cada fold
+    from sklearn.model_selection import KFold
+    from sklearn.preprocessing import StandardScaler
+    folds = []
+    for train, test in KFold(n_folds, shuffle=True, random_state=semilla).split(X):
+        escalador = StandardScaler().fit(X[train])
+        folds.append((train, test, escalador.transform(X[train]), escalador.transform(X[test])))
+    return folds
+
+
+# 🔹 EVALUACIÓN DE UNA COMBINACIÓN EN UN FOLD (procesos del pool)
+_FOLDS_PROCESO = None
+
+
+def _iniciar_proceso(folds):
+    # Las matrices se envían una vez por proceso, no una vez por tarea
+    global _FOLDS_PROCESO
+    _FOLDS_PROCESO = folds
+
+
+def _evaluar(escalador, fold, y, params, semilla, folds=None):
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+    train, test, X_train, X_test = (_FOLDS_PROCESO if folds is None else folds)[escalador][fold]
+    modelo = RandomForestRegressor(random_state=semilla, n_jobs=1, **params).fit(X_train, y[train])
+    pred = modelo.predict(X_test)
+    return {
+        'mae': mean_absolute_error(y[test], pred),
+        'rmse': float(np.sqrt(mean_squared_error(y[test], pred))),
+        'r2': r2_score(y[test], pred),
+    }
+
+
+# 🔹 BÚSQUEDA + ENTRENAMIENTO FINAL
+def entrenar(df, especificaciones=ESPECIFICACIONES, rejilla=REJILLA, n_folds=N_FOLDS, procesos=1, semilla=SEMILLA):
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.preprocessing import StandardScaler
+
+    # Datos por escalador (los folds se comparten entre modelos)
+    datos, folds = {}, {}
+    for esp in especificaciones:
+        if esp['escalador'] not in datos:
+            filas = GRUPOS[esp['grupo']](df)
+            datos[esp['escalador']] = (filas, df.loc[filas, esp['features']].to_numpy(dtype=np.float64))
+            folds[esp['escalador']] = preparar_folds(datos[esp['escalador']][1], n_folds, semilla)
+
+    objetivos = {e['modelo']: objetivo(df.loc[datos[e['escalador']][0]], e['objetivo']) for e in especificaciones}
+    con_formula = [e['modelo'] for e in especificaciones if e['objetivo'] == 'valor' and 'MarketValue' not in df.columns]
+    if con_formula:
+        print(f"Aviso: el dataset no tiene MarketValue; {', '.join(con_formula)} se entrenan con la {OBJETIVO_FORMULA}, "
+              "distinta del objetivo de los modelos publicados", file=sys.stderr)
+    candidatos = combinaciones(rejilla)
+    tareas = [(e['modelo'], e['escalador'], f, i) for e in especificaciones for i in range(len(candidatos)) for f in range(n_folds)]
+    args = [(esc, f, objetivos[m], candidatos[i], semilla) for m, esc, f, i in tareas]
+
+    inicio = time.perf_counter()
+    if procesos > 1:
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso, initargs=(folds,)) as pool:
+            resultados = list(pool.map(_evaluar, *zip(*args), chunksize=max(1, len(args) // (4 * procesos))))
+    else:
+        resultados = [_evaluar(*a, folds=folds) for a in args]
+    t_busqueda = time.perf_counter() - inicio
+
+    # Mejor combinación por modelo (menor MAE medio)
+    por_modelo = {}
+    for (m, _, _, i), r in zip(tareas, resultados):
+        por_modelo.setdefault(m, {}).setdefault(i, []).append(r)
+
+    artefactos, metadatos = {}, {}
+    for esp in especificaciones:
+        nombre, escalador = esp['modelo'], esp['escalador']
+        cv = {i: {k: (float(np.mean([r[k] for r in rs])), float(np.std([r[k] for r in rs]))) for k in ('mae', 'rmse', 'r2')}
+              for i, rs in por_modelo[nombre].items()}
+        mejor = min(cv, key=lambda i: cv[i]['mae'][0])
+
+        filas, X = datos[escalador]
+        if escalador not in artefactos:
+            artefactos[escalador] = StandardScaler().fit(X)
+        t = time.perf_counter()
+        modelo = RandomForestRegressor(random_state=semilla, n_jobs=procesos, **candidatos[mejor])
+        modelo.fit(artefactos[escalador].transform(X), objetivos[nombre])
+        modelo.n_jobs = None
+        artefactos[nombre] = modelo
+
+        metadatos[nombre] = {
+            'escalador': escalador,
+            'features': list(esp['features']),
+            'grupo': esp['grupo'],
+            'objetivo': 'MarketValue' if esp['objetivo'] == 'valor' and 'MarketValue' in df.columns
+                        else (OBJETIVO_FORMULA if esp['objetivo'] == 'valor' else esp['objetivo']),
+            'filas': int(filas.sum()),
+            'parametros': candidatos[mejor],
+            'cv': {k: {'media': v[0], 'std': v[1]} for k, v in cv[mejor].items()},
+            'candidatos': [{'parametros': candidatos[i], 'mae': cv[i]['mae'][0]} for i in sorted(cv)],
+            'segundos_final': round(time.perf_counter() - t, 2),
+        }
+    return artefactos, metadatos, t_busqueda
+
+
+# 🔹 ARTEFACTOS VERSIONADOS
+def guardar_version(artefactos, metadatos, ruta_dataset, filas, n_folds, t_busqueda, carpeta=CARPETA_SALIDA):
+    h = huella([ruta_dataset])
+    version = time.strftime("%Y%m%d_%H%M%S") + "_" + h[:8]
+    destino = os.path.join(carpeta, version)
+    os.makedirs(destino, exist_ok=True)
+    for nombre, objeto in artefactos.items():
+        joblib.dump(objeto, os.path.join(destino, f"{nombre}.pkl"))
+    info = {
+        'version': version,
+        'dataset': {'ruta': ruta_dataset, 'huella': h, 'filas': filas},
+        'n_folds': n_folds,
+        'segundos_busqueda': round(t_busqueda, 2),
+        'entorno': {'python': platform.python_version(), 'sklearn': sklearn.__version__, 'numpy': np.__version__},
+        'modelos': metadatos,
+    }
+    with open(os.path.join(destino, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2, ensure_ascii=False)
+    return destino
+
+
+def publicar(carpeta_version, destino=".", formula=False):
+    # Copia los .pkl de una versión a donde los busca RegistroModelos. Los
+    # modelos entrenados con la fórmula (y su escalador, si ningún otro
+    # modelo publicado lo usa) se omiten salvo con formula=True.
+    # Devuelve los nombres omitidos.
+    with open(os.path.join(carpeta_version, "metadata.json"), encoding="utf-8") as f:
+        info = json.load(f)
+    modelos = info['modelos']
+    omitidos = [] if formula else [n for n, m in modelos.items() if m['objetivo'] == OBJETIVO_FORMULA]
+    usados = {m['escalador'] for n, m in modelos.items() if n not in omitidos}
+    omitidos += sorted({m['escalador'] for n, m in modelos.items() if n in omitidos} - usados)
+
+    os.makedirs(destino, exist_ok=True)
+    for archivo in sorted(os.listdir(carpeta_version)):
+        if archivo.endswith(".pkl") and archivo[:-4] not in omitidos:
+            tmp = os.path.join(destino, archivo + ".tmp")
+            shutil.copyfile(os.path.join(carpeta_version, archivo), tmp)
+            os.replace(tmp, os.path.join(destino, archivo))
+    info['modelos'] = {n: m for n, m in modelos.items() if n not in omitidos}
+    info['omitidos'] = omitidos
+    with open(os.path.join(destino, RUTA_PUBLICADA), "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2, ensure_ascii=False)
+    return omitidos
+
+
+if __name__ == "__main__":
+    # python entrenamiento.py [--procesos N] [--modelos rf_goles,...] [--rapido] [--publicar [--publicar-formula]]
+    from datos import cargar_dataset, agregar_derivadas
+
+    parser = argparse.ArgumentParser(description="Búsqueda con validación cruzada y reentrenamiento de los rf_*")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--folds", type=int, default=N_FOLDS)
+    parser.add_argument("--modelos", default="", help="Subconjunto separado por comas (por defecto todos)")
+    parser.add_argument("--rapido", action="store_true", help="Sin búsqueda: sólo la primera combinación de la rejilla")
+    parser.add_argument("--publicar", action="store_true", help="Copia los .pkl entrenados a la carpeta del motor")
+    parser.add_argument("--publicar-formula", action="store_true",
+                        help="Con --publicar, publica también los rf_valor_* entrenados con la fórmula de IA_MODELO.ipynb")
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    args = parser.parse_args()
+
+    especificaciones = ESPECIFICACIONES
+    if args.modelos:
+        pedidos = set(args.modelos.split(","))
+        especificaciones = [e for e in ESPECIFICACIONES if e['modelo'] in pedidos]
+        if not especificaciones:
+            sys.exit(f"Modelos desconocidos: {args.modelos}")
+    rejilla = {k: v[:1] for k, v in REJILLA.items()} if args.rapido else REJILLA
+
+    # Columnas sin ningún dato en un grupo (G/SoT en porteros): el scaler las
+    # deja igual, como en los modelos originales, pero numpy avisa en cada fold
+    warnings.filterwarnings("ignore", category=RuntimeWarning)
+
+    df = agregar_derivadas(cargar_dataset(imagenes=False))
+    inicio = time.perf_counter()
+    artefactos, metadatos, t_busqueda = entrenar(df, especificaciones, rejilla, args.folds, args.procesos, args.semilla)
+    destino = guardar_version(artefactos, metadatos, RUTA_DATASET, len(df), args.folds, t_busqueda)
+
+    for nombre, m in metadatos.items():
+        cv = m['cv']
+        print(f"{nombre}: MAE {cv['mae']['media']:.3f} ± {cv['mae']['std']:.3f}, R2 {cv['r2']['media']:.3f} | {m['parametros']}")
+    print(f"Búsqueda {t_busqueda:.1f} s, total {time.perf_counter() - inicio:.1f} s -> {destino}")
+
+    if args.publicar:
+        omitidos = publicar(destino, formula=args.publicar_formula)
+        print(f"Modelos publicados ({RUTA_PUBLICADA})")
+        if omitidos:
+            print(f"No publicados (objetivo {OBJETIVO_FORMULA}; usa --publicar-formula): {', '.join(omitidos)}", file=sys.stderr)
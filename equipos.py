@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+from indices import cache_por_frame, normalizar
+
+# Métricas del radar / matchup de utils.py
+METRICAS_DNA = ['xG','xAG','PrgP','PrgDist','Carries','Tkl+Int']
+
+# Métricas de team_profiles (comparacionequipos.ipynb)
+METRICAS_EQUIPO = [
+    'PrgDist', 'PrgP', 'Carries', 'Att_stats_possession',
+    'xG', 'xAG', 'Gls', 'Tkl+Int', 'Blocks', 'FatigueIndex'
+]
+
+# Pesos del modelo de predecir_partido
+PESO_ATAQUE = 0.6
+PESO_POSESION = 0.4
+
+
+def _scores(df):
+    # Score_* tal y como los define datos.agregar_derivadas, sin tocar df
+    if 'Score_Ataque' in df.columns:
+        return df['Score_Ataque'], df['Score_Defensa'], df['Score_Posesion']
+    ataque = df['xG']*2 + df['Gls'] + df['Ast'] + df['KP'] + df['PPA'] + df['CrsPA']
+    defensa = df['Tkl'] + df['Int'] + df['Blocks'] + df['Clr'] + df['Def 3rd_stats_possession']
+    posesion = df[['Live_stats_possession','Touches','PrgDist']].mean(axis=1)
+    return ataque, defensa, posesion
+
+
+# 🔹 TABLA DE AGREGADOS POR EQUIPO
+# Un único groupby sobre el dataset: sumas de ataque/defensa, medias de
+# posesión y de las métricas de perfil, z-scores y minutos del once titular.
+def construir_tabla_equipos(df):
+    ataque, defensa, posesion = _scores(df)
+    metricas = list(dict.fromkeys(METRICAS_DNA + METRICAS_EQUIPO))
+    base = df[['Squad', 'Comp', 'Min'] + metricas].copy()
+    base['_ataque'] = ataque.to_numpy()
+    base['_defensa'] = defensa.to_numpy()
+    base['_posesion'] = posesion.to_numpy()
+
+    spec = {
+        'Comp': ('Comp', 'first'),
+        'Jugadores': ('Min', 'size'),
+        'Minutos': ('Min', 'sum'),
+        'Ataque': ('_ataque', 'sum'),
+        'Defensa': ('_defensa', 'sum'),
+        'Posesion': ('_posesion', 'mean'),
+    }
+    for m in metricas:
+        spec[m] = (m, 'mean')
+    tabla = base.groupby('Squad', observed=True, sort=True).agg(**spec)
+
+    # Minutos del once (los 11 jugadores con más minutos de cada equipo)
+    once = base.sort_values('Min', ascending=False, kind='stable').groupby('Squad', observed=True).head(11)
+    tabla['Minutos_Once'] = once.groupby('Squad', observed=True)['Min'].sum()
+
+    # Volumen de juego usado por utils.matchup_predictor
+    tabla['DNA_Total'] = tabla[METRICAS_DNA].sum(axis=1)
+
+    # Perfiles normalizados (como team_profiles_norm del notebook)
+    z = (tabla[METRICAS_EQUIPO] - tabla[METRICAS_EQUIPO].mean()) / tabla[METRICAS_EQUIPO].std()
+    for m in METRICAS_EQUIPO:
+        tabla['z_' + m] = z[m]
+
+    tabla.index = tabla.index.astype(object)
+    tabla.index.name = 'Squad'
+    return tabla
+
+
+def obtener_tabla_equipos(df, tabla=None):
+    if tabla is not None:
+        return tabla
+    return cache_por_frame(df, 'tabla_equipos', construir_tabla_equipos)
+
+
+def resolver_equipo(tabla, nombre):
+    # Nombre de equipo sin distinguir mayúsculas -> nombre original
+    nombres = cache_por_frame(tabla, 'nombres', lambda t: {normalizar(e): e for e in t.index})
+    return nombres.get(normalizar(nombre))
+
+
+# 🔹 PROBABILIDAD DE VICTORIA (mismo modelo que predecir_partido)
+def probabilidad(ataqueA, defensaA, posesionA, ataqueB, defensaB, posesionB):
+    scoreA = (ataqueA / (defensaB + 1)) * PESO_ATAQUE + posesionA * PESO_POSESION
+    scoreB = (ataqueB / (defensaA + 1)) * PESO_ATAQUE + posesionB * PESO_POSESION
+    return scoreA / (scoreA + scoreB)
+
+
+# 🔹 MATRIZ DE ENFRENTAMIENTOS
+# Probabilidad (%) de que el equipo de la fila supere al de la columna, para
+# todos los pares a la vez.
+def matriz_enfrentamientos(tabla, equipos=None):
+    if equipos is not None:
+        tabla = tabla.loc[list(equipos)]
+    a = tabla['Ataque'].to_numpy(dtype=np.float64)
+    d = tabla['Defensa'].to_numpy(dtype=np.float64)
+    p = tabla['Posesion'].to_numpy(dtype=np.float64)
+    prob = probabilidad(a[:, None], d[:, None], p[:, None], a[None, :], d[None, :], p[None, :])
+    return pd.DataFrame(prob * 100, index=tabla.index, columns=tabla.index)
@@ -0,0 +1,118 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from instrumentacion import contar
+
+COLUMNAS_CATEGORIA = ['Pos', 'Comp', 'Squad', 'Nation', 'PlayerStyle']
+
+
+# 🔹 MOTOR DE FILTROS (Market Discovery)
+# - Columnas numéricas: índice ordenado (argsort + valores ordenados); un
+#   rango es un par de searchsorted.
+# - Columnas de categoría: un bitmap (máscara booleana) por valor.
+# - Orden de salida precalculado (SCA90 descendente): el resultado se obtiene
+#   ya ordenado recorriendo ese orden, sin volver a ordenar.
+# Las máscaras de cada condición y de cada combinación se guardan en una LRU.
+class MotorFiltros:
+    def __init__(self, df, orden='SCA90', ascendente=False, max_cache=256):
+        self.n = len(df)
+        self.numericas = {c: df[c].to_numpy(dtype=np.float64) for c in df.select_dtypes(include='number').columns}
+        self.categorias = {c: pd.factorize(df[c]) for c in COLUMNAS_CATEGORIA if c in df.columns}
+        self._indices = {}
+        self._bitmaps = {}
+        self.cache = OrderedDict()
+        self.max_cache = max_cache
+        self.aciertos = 0
+        self.orden = self.ordenar_por(orden, ascendente)
+
+    def ordenar_por(self, columna, ascendente=False):
+        # Posiciones de fila ordenadas por la columna (NaN al final)
+        valores = self.numericas[columna]
+        return np.argsort(valores if ascendente else -valores, kind='stable')
+
+    # --- ÍNDICES (bajo demanda) ---
+    def _indice(self, columna):
+        if columna not in self._indices:
+            valores = self.numericas[columna]
+            orden = np.argsort(valores, kind='stable')
+            ordenados = valores[orden]
+            validos = int(np.count_nonzero(~np.isnan(ordenados)))
+            self._indices[columna] = (orden, ordenados[:validos])
+        return self._indices[columna]
+
+    def _bitmap(self, columna, valor):
+        clave = (columna, valor)
+        if clave not in self._bitmaps:
+            codigos, valores = self.categorias[columna]
+            pos = np.flatnonzero(valores == valor)
+            self._bitmaps[clave] = codigos == pos[0] if len(pos) else np.zeros(self.n, dtype=bool)
+        return self._bitmaps[clave]
+
+    # --- CONDICIONES ---
+    def rango(self, columna, minimo=None, maximo=None):
+        # minimo <= valor <= maximo (extremos opcionales, NaN nunca cumple)
+        orden, ordenados = self._indice(columna)
+        desde = 0 if minimo is None else np.searchsorted(ordenados, minimo, side='left')
+        hasta = len(ordenados) if maximo is None else np.searchsorted(ordenados, maximo, side='right')
+        mascara = np.zeros(self.n, dtype=bool)
+        mascara[orden[desde:hasta]] = True
+        return mascara
+
+    def categoria(self, columna, valores):
+        mascara = np.zeros(self.n, dtype=bool)
+        for valor in valores:
+            mascara |= self._bitmap(columna, valor)
+        return mascara
+
+    @staticmethod
+    def _termino(columna, condicion):
+        # Forma canónica (hashable) de una condición
+        if isinstance(condicion, tuple):
+            minimo, maximo = condicion
+            return (columna, 'rango', None if minimo is None else float(minimo), None if maximo is None else float(maximo))
+        return (columna, 'en', frozenset(condicion))
+
+    def _mascara_termino(self, termino):
+        if termino[1] == 'rango':
+            return self.rango(termino[0], termino[2], termino[3])
+        return self.categoria(termino[0], termino[2])
+
+    def _cacheado(self, clave, construir):
+        mascara = self.cache.get(clave)
+        if mascara is not None:
+            self.cache.move_to_end(clave)
+            self.aciertos += 1
+            contar("filtros.cache_aciertos")
+            return mascara
+        contar("filtros.cache_fallos")
+        mascara = construir()
+        self.cache[clave] = mascara
+        if len(self.cache) > self.max_cache:
+            self.cache.popitem(last=False)
+        return mascara
+
+    def mascara(self, filtros):
+        # filtros: {'Min': (500, None), 'Age': (18, 30), 'Pos': ['DF', 'MF'], ...}
+        # Tupla -> rango numérico; lista/conjunto -> valores de categoría.
+        terminos = tuple(sorted((self._termino(c, v) for c, v in filtros.items()), key=repr))
+
+        def intersectar():
+            mascara = np.ones(self.n, dtype=bool)
+            for termino in terminos:
+                mascara &= self._cacheado(termino, lambda t=termino: self._mascara_termino(t))
+            return mascara
+
+        return self._cacheado(terminos, intersectar)
+
+    # --- CONSULTA ---
+    def contar(self, filtros):
+        return int(np.count_nonzero(self.mascara(filtros)))
+
+    def consultar(self, filtros, pagina=0, por_pagina=50, orden=None):
+        # Devuelve (total, posiciones de fila de la página) ya ordenadas
+        mascara = self.mascara(filtros)
+        orden = self.orden if orden is None else orden
+        filas = orden[mascara[orden]]
+        contar("filtros.filas_recorridas", len(orden))
+        inicio = pagina * por_pagina
+        return len(filas), filas[inicio:inicio + por_pagina]
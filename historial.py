@@ -0,0 +1,95 @@
+import os
+import json
+import time
+from array import array
+from collections import deque
+
+CARPETA_HISTORIAL = "historial_chat"
+
+# Mensajes que se mantienen en memoria (y pintados en la vista)
+VENTANA = int(os.environ.get("CHAT_VENTANA", 100))
+
+
+class Mensaje:
+    __slots__ = ("id", "rol", "texto", "hora")
+
+    def __init__(self, id, rol, texto, hora):
+        self.id = id
+        self.rol = rol
+        self.texto = texto
+        self.hora = hora
+
+
+# 🔹 HISTORIAL DEL CHAT
+# Ventana fija en memoria; lo que sale de ella se escribe en un JSONL de la
+# sesión (una línea por mensaje) y se guarda su desplazamiento en el fichero,
+# de modo que los mensajes antiguos se pueden releer por id con un seek. Un
+# mensaje que cambia después de volcado se reescribe al final del log y su id
+# pasa a apuntar a esa línea.
+class HistorialChat:
+    def __init__(self, ventana=VENTANA, ruta=None):
+        self.ventana = ventana
+        if ruta is None:
+            ruta = os.path.join(CARPETA_HISTORIAL, time.strftime("chat_%Y%m%d_%H%M%S.jsonl"))
+        self.ruta = ruta
+        self.mensajes = deque()
+        self.offsets = array("q")  # offsets[id] = posición del mensaje en el log
+        self.siguiente = 0
+
+    def __len__(self):
+        return self.siguiente
+
+    @property
+    def en_disco(self):
+        # Ids 0 .. en_disco-1 ya sólo están en el log
+        return len(self.offsets)
+
+    def agregar(self, rol, texto):
+        mensaje = Mensaje(self.siguiente, rol, texto, time.time())
+        self.siguiente += 1
+        self.mensajes.append(mensaje)
+        if len(self.mensajes) > self.ventana:
+            self._volcar(len(self.mensajes) - self.ventana)
+        return mensaje
+
+    def actualizar(self, mensaje, texto):
+        # Respuesta que sustituye a la burbuja de "pensando". Si la consulta
+        # esperaba en cola, la burbuja puede haber salido ya de la ventana
+        mensaje.texto = texto
+        if mensaje.id < self.en_disco:
+            with open(self.ruta, "ab") as f:
+                self.offsets[mensaje.id] = self._escribir(f, mensaje)
+
+    @staticmethod
+    def _escribir(f, mensaje):
+        posicion = f.tell()
+        linea = {"r": mensaje.rol, "t": mensaje.texto, "h": round(mensaje.hora, 3)}
+        f.write(json.dumps(linea, ensure_ascii=False).encode("utf-8") + b"\n")
+        return posicion
+
+    def _volcar(self, n):
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        with open(self.ruta, "ab") as f:
+            for _ in range(n):
+                self.offsets.append(self._escribir(f, self.mensajes.popleft()))
+
+    def volcar_todo(self):
+        if self.mensajes:
+            self._volcar(len(self.mensajes))
+
+    def leer(self, desde, hasta):
+        # Mensajes [desde, hasta) que ya están en disco
+        desde, hasta = max(0, desde), min(hasta, self.en_disco)
+        if desde >= hasta:
+            return []
+        salida = []
+        with open(self.ruta, "rb") as f:
+            for id in range(desde, hasta):
+                # Consecutivas salvo los mensajes reescritos
+                if f.tell() != self.offsets[id]:
+                    f.seek(self.offsets[id])
+                linea = json.loads(f.readline())
+                salida.append(Mensaje(id, linea["r"], linea["t"], linea["h"]))
+        return salida
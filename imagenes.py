@@ -0,0 +1,263 @@
+import os
+import io
+import sys
+import json
+import base64
+import hashlib
+import argparse
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+CARPETA_IMAGENES = "imagenes_cache"
+
+# Anchos de las miniaturas (px): tarjetas pequeñas, tarjetas del Tab 3 y perfil
+TAMANOS = (70, 140, 250)
+FORMATO = "webp"
+CALIDAD = 82
+
+# IMAGENES_PROXY=http://host:8502 -> las tarjetas apuntan al servidor de
+# miniaturas (python imagenes.py --servir) en lugar de llevar data URIs
+PROXY = os.environ.get("IMAGENES_PROXY", "").rstrip("/")
+
+TIMEOUT_DESCARGA = 10
+HILOS_DESCARGA = 8
+# Wikimedia rechaza peticiones sin User-Agent identificable
+CABECERAS = {"User-Agent": "FootballIntelPro/1.0 (caché local de miniaturas)"}
+
+# Cache-Control de las miniaturas servidas: el nombre es el hash del
+# contenido, así que nunca cambian
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+# 🔹 CACHÉ DIRECCIONADA POR CONTENIDO
+# originales/ab/<sha256>   imagen original tal como se descargó o importó
+# miniaturas/<sha256>_<ancho>.webp
+# urls.json                URL -> sha256 (varias URLs pueden compartir imagen)
+class CacheImagenes:
+    def __init__(self, carpeta=CARPETA_IMAGENES, tamanos=TAMANOS):
+        self.carpeta = carpeta
+        self.tamanos = tuple(sorted(tamanos))
+        self.ruta_indice = os.path.join(carpeta, "urls.json")
+        self.urls = {}
+        self.mtime_indice = None
+        self._leer_indice()
+        self.fallidas = set()
+        self._cerrojo = threading.Lock()
+        self._pendientes = set()
+        self._cola = None
+
+    # --- RUTAS ---
+    def _ruta_original(self, sha):
+        return os.path.join(self.carpeta, "originales", sha[:2], sha)
+
+    def ruta_miniatura(self, sha, ancho):
+        return os.path.join(self.carpeta, "miniaturas", f"{sha}_{ancho}.{FORMATO}")
+
+    def ancho_miniatura(self, ancho):
+        # La menor miniatura que cubre el ancho pedido
+        return next((t for t in self.tamanos if t >= ancho), self.tamanos[-1])
+
+    def _leer_indice(self):
+        # Otro proceso (python imagenes.py) puede haber añadido imágenes
+        try:
+            mtime = os.stat(self.ruta_indice).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self.mtime_indice:
+            with open(self.ruta_indice, encoding="utf-8") as f:
+                urls = json.load(f)
+            self.urls = {**self.urls, **urls}
+            self.mtime_indice = mtime
+
+    def _guardar_indice(self):
+        self._leer_indice()
+        os.makedirs(self.carpeta, exist_ok=True)
+        tmp = self.ruta_indice + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.urls, f, ensure_ascii=False)
+        os.replace(tmp, self.ruta_indice)
+        self.mtime_indice = os.stat(self.ruta_indice).st_mtime_ns
+
+    # --- ALTA DE IMÁGENES ---
+    def _almacenar(self, url, contenido, guardar=True):
+        sha = hashlib.sha256(contenido).hexdigest()
+        original = self._ruta_original(sha)
+        if not os.path.exists(original):
+            os.makedirs(os.path.dirname(original), exist_ok=True)
+            with open(original + ".tmp", "wb") as f:
+                f.write(contenido)
+            os.replace(original + ".tmp", original)
+        self._miniaturas(sha, contenido)
+        with self._cerrojo:
+            self.urls[url] = sha
+            self.fallidas.discard(url)
+            if guardar:
+                self._guardar_indice()
+        return sha
+
+    def _miniaturas(self, sha, contenido):
+        from PIL import Image
+
+        faltan = [t for t in self.tamanos if not os.path.exists(self.ruta_miniatura(sha, t))]
+        if not faltan:
+            return
+        os.makedirs(os.path.join(self.carpeta, "miniaturas"), exist_ok=True)
+        with Image.open(io.BytesIO(contenido)) as imagen:
+            imagen = imagen.convert("RGBA" if "A" in imagen.getbands() or imagen.mode == "P" else "RGB")
+            for ancho in faltan:
+                copia = imagen.copy()
+                if copia.width > ancho:
+                    copia = copia.resize((ancho, max(1, round(copia.height * ancho / copia.width))), Image.LANCZOS)
+                ruta = self.ruta_miniatura(sha, ancho)
+                copia.save(ruta + ".tmp", format=FORMATO, quality=CALIDAD, method=4)
+                os.replace(ruta + ".tmp", ruta)
+
+    def importar(self, url, ruta):
+        # Imagen local (sin red) registrada para una URL del dataset
+        with open(ruta, "rb") as f:
+            return self._almacenar(url, f.read())
+
+    def descargar(self, url, sesion=None, guardar=True):
+        import requests
+
+        if url in self.urls:
+            return self.urls[url]
+        try:
+            respuesta = (sesion or requests).get(url, headers=CABECERAS, timeout=TIMEOUT_DESCARGA)
+            respuesta.raise_for_status()
+            return self._almacenar(url, respuesta.content, guardar)
+        except Exception:
+            # Red caída, 404, imagen corrupta...: la tarjeta sigue usando la URL remota
+            with self._cerrojo:
+                self.fallidas.add(url)
+            return None
+
+    def precargar(self, urls, hilos=HILOS_DESCARGA):
+        # Descarga en paralelo las URLs que aún no están en caché
+        import requests
+
+        faltan = sorted({u for u in urls if isinstance(u, str) and u.startswith("http") and u not in self.urls})
+        if not faltan:
+            return 0, 0
+        with requests.Session() as sesion, ThreadPoolExecutor(max_workers=hilos) as pool:
+            resultados = list(pool.map(lambda u: self.descargar(u, sesion, guardar=False), faltan))
+        with self._cerrojo:
+            self._guardar_indice()
+        nuevas = sum(r is not None for r in resultados)
+        return nuevas, len(faltan) - nuevas
+
+    def encolar(self, url):
+        # Descarga en segundo plano (un solo hilo) de una URL vista en la interfaz
+        with self._cerrojo:
+            if url in self.urls or url in self.fallidas or url in self._pendientes:
+                return
+            self._pendientes.add(url)
+            if self._cola is None:
+                self._cola = ThreadPoolExecutor(max_workers=1, thread_name_prefix="imagenes")
+        self._cola.submit(self._descargar_pendiente, url)
+
+    def _descargar_pendiente(self, url):
+        try:
+            self.descargar(url)
+        finally:
+            with self._cerrojo:
+                self._pendientes.discard(url)
+
+    # --- CONSULTA ---
+    def miniatura(self, url, ancho):
+        # Ruta de la miniatura en disco, o None si la URL aún no está en caché
+        sha = self.urls.get(url)
+        if sha is None:
+            self._leer_indice()
+            sha = self.urls.get(url)
+        if sha is None:
+            return None
+        ruta = self.ruta_miniatura(sha, self.ancho_miniatura(ancho))
+        return ruta if os.path.exists(ruta) else None
+
+    def src(self, url, ancho):
+        # Valor para <img src="...">: data URI (o URL del proxy) de la miniatura;
+        # si aún no está en caché, la URL original y se descarga para la próxima vez
+        if not isinstance(url, str) or not url:
+            return ""
+        ruta = self.miniatura(url, ancho)
+        if ruta is None:
+            if url.startswith("http"):
+                self.encolar(url)
+            return url
+        if PROXY:
+            return f"{PROXY}/m/{os.path.basename(ruta)}"
+        return _data_uri(ruta)
+
+
+@functools.lru_cache(maxsize=4096)
+def _data_uri(ruta):
+    # Las miniaturas no cambian (nombre = hash), así que se leen una vez
+    with open(ruta, "rb") as f:
+        return f"data:image/{FORMATO};base64," + base64.b64encode(f.read()).decode("ascii")
+
+
+# 🔹 SERVIDOR DE MINIATURAS
+# GET /m/<sha256>_<ancho>.webp con caché de un año en el navegador
+def servir(cache, puerto=8502, host="0.0.0.0"):
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            nombre = self.path.split("?")[0].removeprefix("/m/")
+            ruta = os.path.join(cache.carpeta, "miniaturas", os.path.basename(nombre))
+            if not self.path.startswith("/m/") or not os.path.isfile(ruta):
+                self.send_error(404)
+                return
+            etag = '"' + os.path.splitext(os.path.basename(ruta))[0] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            with open(ruta, "rb") as f:
+                contenido = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", f"image/{FORMATO}")
+            self.send_header("Content-Length", str(len(contenido)))
+            self.send_header("Cache-Control", CACHE_CONTROL)
+            self.send_header("ETag", etag)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(contenido)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((host, puerto), Manejador)
+    print(f"Miniaturas en http://{host}:{puerto}/m/ (IMAGENES_PROXY=http://<host>:{puerto})")
+    servidor.serve_forever()
+
+
+if __name__ == "__main__":
+    # python imagenes.py                    -> descarga y miniaturiza todas las imágenes del dataset
+    # python imagenes.py --importar map.csv -> registra archivos locales (columnas url, ruta)
+    # python imagenes.py --servir [8502]    -> sirve las miniaturas con caché larga
+    parser = argparse.ArgumentParser(description="Caché local de imágenes de jugadores y equipos")
+    parser.add_argument("--hilos", type=int, default=HILOS_DESCARGA)
+    parser.add_argument("--importar", metavar="CSV")
+    parser.add_argument("--servir", nargs="?", const=8502, type=int, metavar="PUERTO")
+    args = parser.parse_args()
+
+    cache = CacheImagenes()
+    if args.servir:
+        servir(cache, args.servir)
+        sys.exit(0)
+    if args.importar:
+        import pandas as pd
+        tabla = pd.read_csv(args.importar)
+        for url, ruta in zip(tabla["url"], tabla["ruta"]):
+            cache.importar(url, ruta)
+        print(f"{len(tabla)} imágenes importadas en {CARPETA_IMAGENES}")
+    else:
+        from datos import cargar_dataset
+        df = cargar_dataset()
+        urls = set(df["PlayerImg"].dropna().astype(str)) | set(df["TeamImg"].dropna().astype(str))
+        nuevas, fallidas = cache.precargar(urls, args.hilos)
+        print(f"{len(urls)} URLs: {nuevas} descargadas, {fallidas} fallidas, {len(cache.urls)} en caché")
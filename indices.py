@@ -0,0 +1,91 @@
+import weakref
+import numpy as np
+import pandas as pd
+
+# 🔹 NORMALIZACIÓN DE NOMBRES
+def normalizar(texto):
+    return str(texto).strip().lower()
+
+
+# 🔹 ÍNDICE DE JUGADORES / EQUIPOS
+# Se construye una sola vez por DataFrame y guarda posiciones de fila (iloc),
+# de modo que cualquier consulta individual es un acceso a diccionario.
+class IndiceDatos:
+    def __init__(self, df):
+        self.n_filas = len(df)
+
+        # Nombre normalizado -> primera posición (igual que el antiguo .iloc[0])
+        self.jugadores = {}
+        for pos, nombre in enumerate(df['Player'].values):
+            self.jugadores.setdefault(normalizar(nombre), pos)
+
+        # Agrupaciones -> array de posiciones (un solo pase por columna)
+        self.equipos = self._agrupar(df, 'Squad')
+        self.posiciones = self._agrupar(df, 'Pos')
+        self.competiciones = self._agrupar(df, 'Comp')
+
+        # Nombre normalizado de equipo -> nombre original
+        self.nombres_equipo = {normalizar(e): e for e in self.equipos}
+
+    @staticmethod
+    def _agrupar(df, columna):
+        if columna not in df.columns:
+            return {}
+        codigos, valores = pd.factorize(df[columna], sort=False)
+        orden = np.argsort(codigos, kind='stable')
+        cortes = np.searchsorted(codigos[orden], np.arange(len(valores) + 1))
+        return {valores[i]: orden[cortes[i]:cortes[i + 1]] for i in range(len(valores))}
+
+    # --- JUGADORES ---
+    def posicion(self, nombre):
+        return self.jugadores.get(normalizar(nombre))
+
+    def contiene(self, nombre):
+        return normalizar(nombre) in self.jugadores
+
+    def fila(self, df, nombre):
+        pos = self.posicion(nombre)
+        if pos is None:
+            return None
+        return df.iloc[pos]
+
+    # --- EQUIPOS ---
+    def equipo(self, nombre):
+        return self.nombres_equipo.get(normalizar(nombre))
+
+    def filas_equipo(self, df, equipo):
+        return df.iloc[self.equipos.get(equipo, np.empty(0, dtype=np.intp))]
+
+    def filas_equipos(self, df, equipos):
+        vacio = np.empty(0, dtype=np.intp)
+        posiciones = [self.equipos.get(e, vacio) for e in set(equipos)]
+        return df.iloc[np.sort(np.concatenate(posiciones or [vacio]))]
+
+    def filas_posicion(self, df, pos):
+        return df.iloc[self.posiciones.get(pos, np.empty(0, dtype=np.intp))]
+
+    def filas_competicion(self, df, comp):
+        return df.iloc[self.competiciones.get(comp, np.empty(0, dtype=np.intp))]
+
+
+# 🔹 CACHÉ POR DATAFRAME
+# Las estructuras derivadas se guardan por identidad del DataFrame y se liberan
+# automáticamente cuando el DataFrame deja de existir.
+_cache = {}
+
+def cache_por_frame(df, clave, construir):
+    entrada = _cache.get((id(df), clave))
+    if entrada is not None and entrada[0]() is df:
+        return entrada[1]
+
+    valor = construir(df)
+    llave = (id(df), clave)
+    ref = weakref.ref(df, lambda _r, llave=llave: _cache.pop(llave, None))
+    _cache[llave] = (ref, valor)
+    return valor
+
+
+def obtener_indice(df, indice=None):
+    if indice is not None:
+        return indice
+    return cache_por_frame(df, 'indice', IndiceDatos)
@@ -0,0 +1,432 @@
+import os
+import io
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from datos import cargar_dataset, agregar_derivadas, convertir_dataset, RUTA_CSV
+
+CARPETA_INGESTA = "ingesta"
+CARPETA_ENTRADA = os.path.join(CARPETA_INGESTA, "entrada")
+CARPETA_PROCESADOS = os.path.join(CARPETA_INGESTA, "procesados")
+RUTA_DELTA = os.path.join(CARPETA_INGESTA, "delta.jsonl")
+RUTA_RECHAZADAS = os.path.join(CARPETA_INGESTA, "rechazadas.jsonl")
+
+# Segundos entre revisiones de la carpeta de entrada (--vigilar) y tamaño /
+# espera máxima de un lote leído de stdin
+INTERVALO_VIGILANCIA = 2.0
+LOTE_STDIN = 200
+ESPERA_STDIN = 1.0
+
+# 🔹 ESQUEMA (columnas de final.csv, en su orden)
+ESQUEMA = [
+    'Player', 'Nation', 'Age', 'Pos', 'Squad', 'Comp', 'MP', 'Starts', 'Min', '90s',
+    'Touches', 'Carries', 'PrgDist', 'PrgC', 'PrgP', 'PrgR', 'Att_stats_possession', 'Succ', 'Succ%',
+    'Gls', 'Ast', 'G+A', 'xG', 'npxG', 'xAG', 'xG+xAG', 'Crs', 'Tkl', 'Int', 'Tkl+Int', 'Blocks',
+    'Sh', 'SoT', 'SoT%', 'Sh/90', 'SoT/90', 'G/Sh', 'G/SoT', 'G-xG', 'np:G-xG', 'KP', 'PPA', '1/3',
+    'CrsPA', 'SCA', 'SCA90', 'GCA', 'GCA90', 'Att Pen', 'Def 3rd_stats_possession',
+    'Mid 3rd_stats_possession', 'Att 3rd_stats_possession', 'Live_stats_possession', 'Rec', 'Won',
+    'Lost', 'Cmp', 'Clr', 'FatigueIndex', 'StyleInsight', 'PlayerCluster', 'PlayerStyle', 'PlayerImg', 'TeamImg'
+]
+COLUMNAS_TEXTO = ['Player', 'Nation', 'Pos', 'Squad', 'Comp']
+# Salidas de pipeline.py: si la fila no las trae, se calculan al ingerir
+COLUMNAS_PIPELINE = ['FatigueIndex', 'StyleInsight', 'PlayerCluster', 'PlayerStyle', 'PlayerImg', 'TeamImg']
+# Ratios que el dataset deja vacíos cuando el denominador es 0
+COLUMNAS_OPCIONALES = ['Succ%', 'SoT%', 'G/Sh', 'G/SoT']
+COLUMNAS_NUMERICAS = [c for c in ESQUEMA if c not in COLUMNAS_TEXTO + COLUMNAS_PIPELINE]
+
+
+def claves(df):
+    # Jugador + equipo: una fila que ya existe se sustituye (primera aparición)
+    return (df['Player'].astype(str) + '|' + df['Squad'].astype(str)).to_numpy()
+
+
+# 🔹 VALIDACIÓN
+# Devuelve (filas válidas con los tipos del dataset, filas rechazadas con su
+# motivo). Se comprueba columna a columna sobre todo el lote a la vez.
+def validar(lote, tipos):
+    lote = lote.reset_index(drop=True)
+    motivo = pd.Series('', index=lote.index, dtype=object)
+
+    def anotar(mascara, texto):
+        nuevas = mascara & (motivo == '')
+        motivo[nuevas] = texto
+
+    desconocidas = [c for c in lote.columns if c not in ESQUEMA]
+    if desconocidas:
+        anotar(pd.Series(True, index=lote.index), f"columnas desconocidas: {', '.join(desconocidas)}")
+
+    for c in COLUMNAS_TEXTO:
+        valores = lote[c].astype(str).str.strip() if c in lote.columns else pd.Series('', index=lote.index)
+        anotar(lote[c].isna() | (valores == '') if c in lote.columns else pd.Series(True, index=lote.index), f"falta {c}")
+
+    salida = pd.DataFrame(index=lote.index)
+    for c in COLUMNAS_NUMERICAS:
+        if c not in lote.columns:
+            if c not in COLUMNAS_OPCIONALES:
+                anotar(pd.Series(True, index=lote.index), f"falta {c}")
+            salida[c] = np.nan
+            continue
+        original = lote[c]
+        valores = pd.to_numeric(original, errors='coerce').astype(np.float64)
+        anotar(original.notna() & valores.isna(), f"{c} no es numérico")
+        if c not in COLUMNAS_OPCIONALES:
+            anotar(original.isna(), f"falta {c}")
+        if c in tipos and tipos[c].kind in 'iu':
+            anotar(valores.notna() & (valores != np.round(valores)), f"{c} debe ser entero")
+        salida[c] = valores
+    anotar(salida['Age'] <= 0, "Age debe ser positiva")
+    anotar(salida['Min'] < 0, "Min no puede ser negativo")
+
+    for c in COLUMNAS_TEXTO:
+        salida[c] = lote[c].astype(str).str.strip() if c in lote.columns else None
+    for c in COLUMNAS_PIPELINE:
+        salida[c] = lote[c] if c in lote.columns else np.nan
+
+    validas = motivo == ''
+    rechazadas = lote[~validas].assign(motivo=motivo[~validas])
+    return salida.loc[validas, ESQUEMA].reset_index(drop=True), rechazadas
+
+
+# 🔹 COLUMNAS DEL PIPELINE (sólo para las filas del lote)
+# Parámetros congelados de pipeline.py: mismo scaler de fatiga, mismos
+# centroides y reglas de estilo. El perfil de liga se toma de la competición
+# ya publicada; sólo una competición nueva se evalúa con sus propias filas.
+def parametros_pipeline(df):
+    from pipeline import ETAPAS, cargar_estado, modelo_estilos
+    from clustering import ModeloClusters
+
+    estado = cargar_estado()
+    params = {}
+    for etapa in ETAPAS:
+        nombre = etapa['nombre']
+        if nombre == 'estilos':
+            modelo = ModeloClusters.cargar()
+            if modelo is not None:
+                params[nombre] = modelo
+                continue
+        params[nombre] = estado['params'][nombre] if nombre in estado['params'] else etapa['ajustar'](df)
+        if nombre == 'estilos':
+            params[nombre] = modelo_estilos(params[nombre])
+    return params
+
+
+def completar_pipeline(lote, df, params):
+    from pipeline import aplicar_fatiga, aplicar_ligas, aplicar_imagenes
+
+    lote = lote.copy()
+
+    def rellenar(columna, valores):
+        vacias = lote[columna].isna()
+        if vacias.any():
+            lote[columna] = lote[columna].astype(object)
+            lote.loc[vacias, columna] = np.asarray(valores, dtype=object)[vacias.to_numpy()]
+
+    rellenar('FatigueIndex', aplicar_fatiga(lote, params['fatiga'])['FatigueIndex'])
+    estilos = params['estilos'].asignar(lote)
+    rellenar('PlayerCluster', estilos['PlayerCluster'])
+    rellenar('PlayerStyle', estilos['PlayerStyle'])
+
+    perfil = df.drop_duplicates('Comp').set_index('Comp')['StyleInsight'].astype(object)
+    insight = lote['Comp'].map(perfil)
+    nuevas = insight.isna()
+    if nuevas.any() and params['ligas'] is not None:
+        insight[nuevas] = aplicar_ligas(lote[nuevas], params['ligas'])['StyleInsight']
+    rellenar('StyleInsight', insight)
+
+    # Imágenes: las de la fila sustituida o, si el jugador es nuevo, editar.csv
+    posiciones = _primeras(df).reindex(claves(lote)).to_numpy()
+    existe = ~np.isnan(posiciones)
+    for c in ['PlayerImg', 'TeamImg']:
+        if c not in df.columns:
+            continue
+        valores = np.full(len(lote), None, dtype=object)
+        valores[existe] = df[c].astype(object).to_numpy()[posiciones[existe].astype(np.intp)]
+        if params['imagenes'] is not None and (~existe).any():
+            valores[~existe] = aplicar_imagenes(lote[~existe], params['imagenes'])[c].to_numpy()
+        rellenar(c, valores)
+
+    lote['FatigueIndex'] = lote['FatigueIndex'].astype(np.float64)
+    lote['PlayerCluster'] = lote['PlayerCluster'].astype(np.int64)
+    return lote
+
+
+def _primeras(df):
+    # clave -> primera posición de fila
+    serie = pd.Series(np.arange(len(df)), index=claves(df))
+    return serie[~serie.index.duplicated()]
+
+
+# 🔹 APLICAR UN LOTE AL DATASET EN MEMORIA
+# Devuelve un DataFrame nuevo (el anterior sigue siendo válido para quien lo
+# esté leyendo) y las posiciones de las filas tocadas. Las columnas derivadas
+# de datos.agregar_derivadas se recalculan sólo en esas filas.
+def aplicar_lote(df, lote, primeras=None, derivadas=False):
+    primeras = _primeras(df) if primeras is None else primeras
+    lote = lote.loc[~pd.Index(claves(lote)).duplicated(keep='last')].reset_index(drop=True)
+    posiciones = primeras.reindex(claves(lote)).to_numpy()
+    existe = ~np.isnan(posiciones)
+    columnas = [c for c in ESQUEMA if c in df.columns]
+    lote = _tipos_dataset(lote[columnas], df)
+
+    nuevo = df.copy()
+    for c in columnas:
+        if isinstance(nuevo[c].dtype, pd.CategoricalDtype):
+            faltan = pd.Index(lote[c].dropna().unique()).difference(nuevo[c].cat.categories)
+            if len(faltan):
+                nuevo[c] = nuevo[c].cat.add_categories(faltan)
+
+    actualizadas = posiciones[existe].astype(np.intp)
+    if len(actualizadas):
+        for c in columnas:
+            nuevo.iloc[actualizadas, nuevo.columns.get_loc(c)] = lote.loc[existe, c].to_numpy()
+    if (~existe).any():
+        anadidas = lote.loc[~existe].reindex(columns=nuevo.columns)
+        for c in nuevo.columns:
+            if isinstance(nuevo[c].dtype, pd.CategoricalDtype):
+                anadidas[c] = pd.Categorical(anadidas[c], categories=nuevo[c].cat.categories)
+        nuevo = pd.concat([nuevo, anadidas], ignore_index=True)
+
+    filas = np.concatenate([actualizadas, np.arange(len(df), len(nuevo))])
+    if derivadas and len(filas):
+        calculadas = agregar_derivadas(nuevo.iloc[filas].copy())
+        for c in calculadas.columns.difference(columnas):
+            nuevo.iloc[filas, nuevo.columns.get_loc(c)] = calculadas[c].to_numpy()
+    return nuevo, filas
+
+
+def _tipos_dataset(lote, df):
+    lote = lote.copy()
+    for c in lote.columns:
+        tipo = df[c].dtype
+        if tipo.kind in 'iuf':
+            lote[c] = pd.to_numeric(lote[c]).astype(tipo)
+    return lote
+
+
+# 🔹 LECTOR DEL DELTA (procesos que sirven datos: app.py, ai_engine.py)
+# delta.jsonl sólo crece: cada lector recuerda hasta qué byte ha leído y en
+# cada sincronizar() aplica únicamente las líneas nuevas. Si el delta se ha
+# consolidado en final.csv (archivo nuevo o más corto), vuelve a cargar la base.
+class LectorDelta:
+    def __init__(self, cargar, ruta=RUTA_DELTA, derivadas=False):
+        self.cargar = cargar
+        self.ruta = ruta
+        self.derivadas = derivadas
+        self.recargas = 0
+        self.modificados = set()  # jugadores cuyas filas vienen del delta
+        self._cerrojo = threading.Lock()
+        self._base(cargar())
+
+    def _base(self, df):
+        self.df = df
+        self.primeras = _primeras(df)
+        self.posicion = 0
+        self.inodo = None
+        self.modificados = set()
+        self.lotes = []  # (byte del delta tras el lote, filas cambiadas)
+
+    @property
+    def version(self):
+        # Clave de las cachés: cambia con cada lote aplicado y con cada recarga
+        return (self.recargas, self.posicion)
+
+    def _leer(self):
+        try:
+            st = os.stat(self.ruta)
+        except FileNotFoundError:
+            st = None
+        if st is None or (self.inodo is not None and st.st_ino != self.inodo) or (st is not None and st.st_size < self.posicion):
+            if self.posicion:
+                self.recargas += 1
+                self._base(self.cargar())
+            if st is None:
+                return None
+        self.inodo = st.st_ino
+        if st.st_size == self.posicion:
+            return None
+        with open(self.ruta, "rb") as f:
+            f.seek(self.posicion)
+            bloque = f.read(st.st_size - self.posicion)
+        completo = bloque.rfind(b"\n") + 1  # una línea a medio escribir se lee la próxima vez
+        if completo == 0:
+            return None
+        self.posicion += completo
+        return pd.read_json(io.StringIO(bloque[:completo].decode("utf-8")), lines=True, dtype=False)
+
+    def sincronizar(self):
+        # True si el dataset ha cambiado desde la última llamada
+        with self._cerrojo:
+            version = self.version
+            lote = self._leer()
+            if lote is not None and len(lote):
+                anteriores = len(self.df)
+                self.df, filas = aplicar_lote(self.df, lote, self.primeras, self.derivadas)
+                if len(self.df) > anteriores:
+                    self.primeras = pd.concat([self.primeras, _primeras(self.df.iloc[anteriores:]) + anteriores])
+                self.modificados.update(self.df['Player'].iloc[filas].astype(str))
+                self.lotes.append((self.posicion, filas))
+            return self.version != version
+
+    def cambios(self, recargas, desde):
+        # Para estructuras que se actualizan en su sitio (Clasificaciones):
+        # (df, recargas, posición, filas cambiadas desde el byte 'desde').
+        # filas es None si la base se ha recargado desde entonces
+        with self._cerrojo:
+            if recargas != self.recargas:
+                return self.df, self.recargas, self.posicion, None
+            filas = [f for posicion, f in self.lotes if posicion > desde]
+            filas = np.unique(np.concatenate(filas)) if filas else np.empty(0, dtype=np.intp)
+            return self.df, self.recargas, self.posicion, filas
+
+
+# 🔹 ESCRITURA DEL DELTA
+class Ingesta:
+    def __init__(self, ruta=RUTA_DELTA, ruta_rechazadas=RUTA_RECHAZADAS):
+        self.lector = LectorDelta(cargar_dataset, ruta)
+        self.ruta = ruta
+        self.ruta_rechazadas = ruta_rechazadas
+        self.params = parametros_pipeline(self.lector.df)
+
+    def ingerir(self, lote):
+        # DataFrame de filas nuevas -> (aceptadas, rechazadas)
+        self.lector.sincronizar()
+        validas, rechazadas = validar(lote, self.lector.df.dtypes)
+        if len(validas):
+            validas = completar_pipeline(validas, self.lector.df, self.params)
+            self._anadir(self.ruta, validas.to_json(orient='records', lines=True, force_ascii=False))
+            self.lector.sincronizar()
+        if len(rechazadas):
+            self._anadir(self.ruta_rechazadas, rechazadas.to_json(orient='records', lines=True, force_ascii=False, default_handler=str))
+        return len(validas), len(rechazadas)
+
+    @staticmethod
+    def _anadir(ruta, texto):
+        # Un único write por lote: los lectores nunca ven media línea como completa
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        if not texto.endswith("\n"):
+            texto += "\n"
+        with open(ruta, "a", encoding="utf-8") as f:
+            f.write(texto)
+            f.flush()
+            os.fsync(f.fileno())
+
+    # --- FUENTES ---
+    def ingerir_archivo(self, ruta):
+        if ruta.endswith(".jsonl") or ruta.endswith(".json"):
+            lote = pd.read_json(ruta, lines=ruta.endswith(".jsonl"), dtype=False)
+        else:
+            lote = pd.read_csv(ruta)
+        return self.ingerir(lote)
+
+    def ingerir_carpeta(self, carpeta=CARPETA_ENTRADA, procesados=CARPETA_PROCESADOS):
+        # Archivos soltados en la carpeta, del más antiguo al más nuevo; una vez
+        # ingeridos se mueven a procesados/ (los .tmp se ignoran: aún se escriben)
+        os.makedirs(carpeta, exist_ok=True)
+        archivos = [os.path.join(carpeta, a) for a in os.listdir(carpeta) if a.endswith((".csv", ".jsonl", ".json"))]
+        resultados = []
+        for ruta in sorted(archivos, key=os.path.getmtime):
+            aceptadas, rechazadas = self.ingerir_archivo(ruta)
+            os.makedirs(procesados, exist_ok=True)
+            os.replace(ruta, os.path.join(procesados, time.strftime("%Y%m%d_%H%M%S_") + os.path.basename(ruta)))
+            resultados.append((ruta, aceptadas, rechazadas))
+        return resultados
+
+    def ingerir_flujo(self, entrada=sys.stdin):
+        # JSON lines por stdin: se agrupan hasta LOTE_STDIN filas o ESPERA_STDIN
+        # segundos sin datos nuevos, lo que ocurra antes
+        lineas = queue.Queue()
+
+        def leer():
+            for linea in entrada:
+                if linea.strip():
+                    lineas.put(linea)
+            lineas.put(None)
+
+        threading.Thread(target=leer, daemon=True).start()
+        pendientes, fin = [], False
+        while not fin:
+            try:
+                linea = lineas.get(timeout=ESPERA_STDIN if pendientes else None)
+                if linea is None:
+                    fin = True
+                else:
+                    pendientes.append(linea)
+            except queue.Empty:
+                pass
+            if pendientes and (fin or len(pendientes) >= LOTE_STDIN or lineas.empty()):
+                yield self._ingerir_lineas(pendientes)
+                pendientes = []
+
+    def _ingerir_lineas(self, lineas):
+        filas, malformadas = [], []
+        for linea in lineas:
+            try:
+                filas.append(json.loads(linea))
+            except json.JSONDecodeError:
+                malformadas.append({'linea': linea.strip(), 'motivo': 'JSON no válido'})
+        if malformadas:
+            self._anadir(self.ruta_rechazadas, "\n".join(json.dumps(m, ensure_ascii=False) for m in malformadas))
+        aceptadas, rechazadas = self.ingerir(pd.DataFrame(filas)) if filas else (0, 0)
+        return aceptadas, rechazadas + len(malformadas)
+
+    # --- CONSOLIDACIÓN ---
+    def consolidar(self, ruta_csv=RUTA_CSV, actualizar_clusters=False):
+        # final.csv = base + delta; el delta aplicado pasa a procesados/. Con
+        # actualizar_clusters los centroides se reajustan con las filas nuevas
+        # (arranque en caliente) y se reasigna el cluster de todos los jugadores
+        self.lector.sincronizar()
+        if not os.path.exists(self.ruta):
+            return 0
+        df = self.lector.df
+        if actualizar_clusters:
+            from pipeline import ejecutar, guardar_estado, modelo_estilos
+
+            df, estado, _ = ejecutar(df, actualizar=('estilos',))
+            guardar_estado(estado)
+            modelo_estilos(estado['params']['estilos']).guardar()
+        tmp = ruta_csv + ".tmp"
+        df.to_csv(tmp, index=False)
+        os.replace(tmp, ruta_csv)
+        convertir_dataset(ruta_csv)
+        os.makedirs(CARPETA_PROCESADOS, exist_ok=True)
+        os.replace(self.ruta, os.path.join(CARPETA_PROCESADOS, time.strftime("delta_%Y%m%d_%H%M%S.jsonl")))
+        return len(df)
+
+
+if __name__ == "__main__":
+    # python ingesta.py              -> ingiere los archivos de ingesta/entrada/
+    # python ingesta.py --vigilar    -> ... y sigue revisando la carpeta
+    # cat filas.jsonl | python ingesta.py -
+    # python ingesta.py --consolidar -> vuelca el delta en final.csv / Parquet
+    # python ingesta.py --consolidar --actualizar-clusters -> ... y reajusta los clusters
+    parser = argparse.ArgumentParser(description="Ingesta incremental de filas de jugador")
+    parser.add_argument("origen", nargs="?", help="'-' para leer JSON lines de stdin, o un archivo .csv/.jsonl")
+    parser.add_argument("--vigilar", action="store_true")
+    parser.add_argument("--consolidar", action="store_true")
+    parser.add_argument("--actualizar-clusters", action="store_true",
+                        help="con --consolidar, reajusta los clusters partiendo de los centroides actuales")
+    args = parser.parse_args()
+
+    ingesta = Ingesta()
+    if args.consolidar:
+        print(f"{RUTA_CSV} actualizado: {ingesta.consolidar(actualizar_clusters=args.actualizar_clusters)} filas")
+    elif args.origen == "-":
+        for aceptadas, rechazadas in ingesta.ingerir_flujo():
+            print(f"stdin: {aceptadas} filas aceptadas, {rechazadas} rechazadas", flush=True)
+    elif args.origen:
+        aceptadas, rechazadas = ingesta.ingerir_archivo(args.origen)
+        print(f"{args.origen}: {aceptadas} filas aceptadas, {rechazadas} rechazadas")
+    else:
+        while True:
+            for ruta, aceptadas, rechazadas in ingesta.ingerir_carpeta():
+                print(f"{ruta}: {aceptadas} filas aceptadas, {rechazadas} rechazadas", flush=True)
+            if not args.vigilar:
+                break
+            time.sleep(INTERVALO_VIGILANCIA)
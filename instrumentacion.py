@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import threading
+import functools
+from collections import deque
+
+# 🔹 ACTIVACIÓN
+# TRAZAS=1 activa la instrumentación (se lee al importar). Desactivada,
+# los decoradores devuelven la función original y tramo()/contar() no hacen
+# nada, así que el coste es una comprobación de un booleano.
+ACTIVA = os.environ.get("TRAZAS", "0") not in ("", "0")
+
+# Tramos que se conservan en memoria (los más antiguos se descartan)
+MAX_TRAMOS = int(os.environ.get("TRAZAS_MAX", 10000))
+
+CARPETA_TRAZAS = "trazas"
+
+
+class _TramoNulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULO = _TramoNulo()
+
+
+# 🔹 REGISTRO
+# Tramos (nombre, inicio, duración, padre, hilo, ciclo), totales por nombre y
+# contadores. Un "ciclo" es una unidad de trabajo de la interfaz (un rerun de
+# Streamlit, una consulta del chat); se guarda por hilo porque cada sesión de
+# Streamlit y cada consulta del chat se ejecutan en su propio hilo.
+class Registro:
+    def __init__(self, max_tramos=MAX_TRAMOS):
+        self.tramos = deque(maxlen=max_tramos)
+        self.totales = {}  # nombre -> [llamadas, total ms, máximo ms]
+        self.contadores = {}
+        self.ciclos = 0
+        self.origen = time.time() - time.perf_counter()
+        self._cerrojo = threading.Lock()
+        self._local = threading.local()
+
+    def _pila(self):
+        pila = getattr(self._local, "pila", None)
+        if pila is None:
+            pila = self._local.pila = []
+        return pila
+
+    def nuevo_ciclo(self):
+        with self._cerrojo:
+            self.ciclos += 1
+            self._local.ciclo = self.ciclos
+        self._local.inicio_ciclo = time.perf_counter()
+        return self.ciclos
+
+    @property
+    def ciclo(self):
+        return getattr(self._local, "ciclo", 0)
+
+    def duracion_ciclo(self):
+        inicio = getattr(self._local, "inicio_ciclo", None)
+        return None if inicio is None else (time.perf_counter() - inicio) * 1000
+
+    def registrar(self, nombre, inicio, ms, padre, datos=None):
+        tramo = {
+            "nombre": nombre, "inicio": inicio, "ms": ms, "padre": padre,
+            "nivel": len(self._pila()), "hilo": threading.get_ident(), "ciclo": self.ciclo,
+        }
+        if datos:
+            tramo["datos"] = datos
+        with self._cerrojo:
+            self.tramos.append(tramo)
+            total = self.totales.get(nombre)
+            if total is None:
+                self.totales[nombre] = [1, ms, ms]
+            else:
+                total[0] += 1
+                total[1] += ms
+                total[2] = max(total[2], ms)
+
+    def sumar(self, nombre, n=1):
+        with self._cerrojo:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    # --- CONSULTAS ---
+    def leer_contadores(self):
+        with self._cerrojo:
+            return dict(self.contadores)
+
+    def tramos_ciclo(self, ciclo=None):
+        # Tramos de un ciclo en orden de inicio (se registran al terminar)
+        ciclo = self.ciclo if ciclo is None else ciclo
+        with self._cerrojo:
+            tramos = [t for t in self.tramos if t["ciclo"] == ciclo]
+        return sorted(tramos, key=lambda t: t["inicio"])
+
+    def resumen(self):
+        # [{nombre, llamadas, total_ms, medio_ms, max_ms}] de mayor a menor tiempo total
+        with self._cerrojo:
+            filas = [
+                {"nombre": n, "llamadas": c, "total_ms": round(t, 3), "medio_ms": round(t / c, 3), "max_ms": round(m, 3)}
+                for n, (c, t, m) in self.totales.items()
+            ]
+        return sorted(filas, key=lambda f: -f["total_ms"])
+
+    def reiniciar(self):
+        with self._cerrojo:
+            self.tramos.clear()
+            self.totales.clear()
+            self.contadores.clear()
+
+    # --- EXPORTACIÓN (JSON lines) ---
+    def lineas(self):
+        with self._cerrojo:
+            tramos = list(self.tramos)
+        contadores = self.leer_contadores()
+        for t in tramos:
+            linea = {"tipo": "tramo", **t, "ts": round(self.origen + t["inicio"], 6), "ms": round(t["ms"], 4)}
+            del linea["inicio"]
+            yield json.dumps(linea, ensure_ascii=False, default=str)
+        for nombre, valor in contadores.items():
+            yield json.dumps({"tipo": "contador", "nombre": nombre, "valor": valor}, ensure_ascii=False)
+
+    def exportar(self, ruta=None):
+        if ruta is None:
+            ruta = os.path.join(CARPETA_TRAZAS, time.strftime("trazas_%Y%m%d_%H%M%S.jsonl"))
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        with open(ruta, "w", encoding="utf-8") as f:
+            for linea in self.lineas():
+                f.write(linea + "\n")
+        return ruta
+
+
+class Tramo:
+    __slots__ = ("registro", "nombre", "datos", "inicio", "padre")
+
+    def __init__(self, registro, nombre, datos=None):
+        self.registro = registro
+        self.nombre = nombre
+        self.datos = datos
+
+    def __enter__(self):
+        pila = self.registro._pila()
+        self.padre = pila[-1] if pila else None
+        pila.append(self.nombre)
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ms = (time.perf_counter() - self.inicio) * 1000
+        self.registro._pila().pop()
+        self.registro.registrar(self.nombre, self.inicio, ms, self.padre, self.datos)
+        return False
+
+
+registro = Registro()
+
+
+# 🔹 API
+def tramo(nombre, **datos):
+    # with tramo("app.tab2.campo"): ...
+    if not ACTIVA:
+        return _NULO
+    return Tramo(registro, nombre, datos)
+
+
+def contar(nombre, n=1):
+    # Contadores: aciertos de caché, filas recorridas...
+    if ACTIVA:
+        registro.sumar(nombre, n)
+
+
+def instrumentar(nombre=None):
+    # @instrumentar() -> tramo "modulo.funcion" en cada llamada
+    def decorador(funcion):
+        if not ACTIVA:
+            return funcion
+        etiqueta = nombre or f"{funcion.__module__}.{funcion.__qualname__}"
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with Tramo(registro, etiqueta):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def nuevo_ciclo():
+    return registro.nuevo_ciclo() if ACTIVA else 0
@@ -0,0 +1,97 @@
+import glob
+import os
+import threading
+import time
+import joblib
+import arboles
+
+
+class ModeloNoDisponible(LookupError):
+    pass
+
+
+def firma_modelo(ruta):
+    # Tamaño + mtime del .pkl: invalida el bosque compilado si cambia
+    st = os.stat(ruta)
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+def _compilados_entorno():
+    # MODELOS_COMPILADOS=rf_paradas,rf_goles | todos
+    valor = os.environ.get("MODELOS_COMPILADOS", "").strip()
+    if valor.lower() in ("todos", "all", "1"):
+        return "todos"
+    return {n.strip() for n in valor.split(",") if n.strip()}
+
+
+# 🔹 REGISTRO DE MODELOS
+# Descubre los rf_*.pkl / scaler_*.pkl disponibles y carga cada uno la primera
+# vez que se usa. Con mmap_mode='r' los arrays de numpy se mapean desde disco,
+# de modo que varios procesos comparten las mismas páginas.
+# Los bosques indicados en 'compilados' (o "todos") se sirven como
+# arboles.BosqueCompilado: misma predict(), sin sklearn en la inferencia.
+# Si la comprobación de paridad falla se usa el .pkl original.
+class RegistroModelos:
+    def __init__(self, carpeta=".", mmap_mode=None, patrones=("rf_*.pkl", "scaler_*.pkl"), compilados=None):
+        self.carpeta = carpeta
+        self.mmap_mode = mmap_mode
+        self.compilados = _compilados_entorno() if compilados is None else compilados
+        self.carpeta_compilados = os.path.join(carpeta, arboles.CARPETA_COMPILADOS)
+        self.rutas = {}
+        for patron in patrones:
+            for ruta in sorted(glob.glob(os.path.join(carpeta, patron))):
+                self.rutas[os.path.splitext(os.path.basename(ruta))[0]] = ruta
+
+        self.modelos = {}
+        self.tiempos = {}
+        self.errores = {}
+        self._lock = threading.Lock()
+
+    def disponible(self, nombre):
+        return nombre in self.rutas
+
+    def faltantes(self, nombres):
+        return [n for n in nombres if n not in self.rutas]
+
+    def se_compila(self, nombre):
+        return nombre.startswith("rf_") and (self.compilados == "todos" or nombre in self.compilados)
+
+    def _leer(self, nombre):
+        ruta = self.rutas[nombre]
+        if self.se_compila(nombre):
+            try:
+                return arboles.cargar_o_compilar(
+                    nombre, ruta, lambda r: joblib.load(r, mmap_mode=self.mmap_mode),
+                    firma_modelo(ruta), self.carpeta_compilados
+                )
+            except ValueError as e:
+                self.errores[nombre] = str(e)
+        return joblib.load(ruta, mmap_mode=self.mmap_mode)
+
+    def cargar(self, nombre):
+        modelo = self.modelos.get(nombre)
+        if modelo is not None:
+            return modelo
+        if nombre not in self.rutas:
+            raise ModeloNoDisponible(f"Modelo no disponible: {nombre}.pkl")
+
+        with self._lock:
+            if nombre not in self.modelos:
+                inicio = time.perf_counter()
+                self.modelos[nombre] = self._leer(nombre)
+                self.tiempos[nombre] = time.perf_counter() - inicio
+        return self.modelos[nombre]
+
+    def __getitem__(self, nombre):
+        return self.cargar(nombre)
+
+    def resumen(self):
+        filas = []
+        for nombre in sorted(self.rutas):
+            estado = "cargado" if nombre in self.modelos else "pendiente"
+            if isinstance(self.modelos.get(nombre), arboles.BosqueCompilado):
+                estado = "compilado"
+            elif nombre in self.errores:
+                estado += f" (sin compilar: {self.errores[nombre]})"
+            filas.append((nombre, estado, self.tiempos.get(nombre)))
+        return filas
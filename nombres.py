@@ -0,0 +1,237 @@
+import bisect
+import re
+import unicodedata
+import numpy as np
+
+# 🔹 NORMALIZACIÓN SIN ACENTOS
+# Letras que NFKD no descompone (ø, ł, ß...) se traducen a mano.
+_ESPECIALES = str.maketrans({
+    'ø': 'o', 'ł': 'l', 'đ': 'd', 'ð': 'd', 'þ': 'th',
+    'ß': 'ss', 'æ': 'ae', 'œ': 'oe', 'ı': 'i'
+})
+
+
+def plegar(texto):
+    texto = unicodedata.normalize('NFKD', str(texto).lower().translate(_ESPECIALES))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', texto).split())
+
+
+def trigramas(clave):
+    relleno = f'  {clave} '
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+# 🔹 DISTANCIA DE EDICIÓN ACOTADA
+# Levenshtein limitado a una banda de ancho 'limite': si se supera, corta y
+# devuelve limite + 1.
+def distancia(a, b, limite):
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    fuera = limite + 1
+    previa = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        desde = max(1, i - limite)
+        hasta = min(len(b), i + limite)
+        actual = [fuera] * (len(b) + 1)
+        actual[0] = i if i <= limite else fuera
+        ca = a[i - 1]
+        minimo = actual[0]
+        for j in range(desde, hasta + 1):
+            d = min(previa[j] + 1, actual[j - 1] + 1, previa[j - 1] + (ca != b[j - 1]))
+            actual[j] = d
+            if d < minimo:
+                minimo = d
+        if minimo > limite:
+            return fuera
+        previa = actual
+    return min(previa[len(b)], fuera)
+
+
+# 🔹 ALIAS DE EQUIPOS
+# Nombres habituales que no se parecen al del dataset (FBref).
+ALIAS_EQUIPOS = {
+    'Athletic Club': ['athletic bilbao', 'bilbao'],
+    'Atlético Madrid': ['atletico de madrid', 'atleti'],
+    'Barcelona': ['barca', 'fc barcelona'],
+    'Bayern Munich': ['bayern', 'bayern munchen'],
+    'Betis': ['real betis'],
+    'Celta Vigo': ['celta'],
+    'Dortmund': ['borussia dortmund', 'bvb'],
+    'Eint Frankfurt': ['eintracht frankfurt', 'frankfurt'],
+    'Gladbach': ['borussia monchengladbach', 'monchengladbach'],
+    'Hamburger SV': ['hamburgo', 'hsv'],
+    'Hellas Verona': ['verona'],
+    'Inter': ['inter milan', 'internazionale', 'inter de milan'],
+    'Juventus': ['juve'],
+    'Köln': ['colonia', 'cologne'],
+    'Leeds United': ['leeds'],
+    'Leverkusen': ['bayer leverkusen'],
+    'Manchester City': ['man city'],
+    'Manchester Utd': ['manchester united', 'man utd', 'man united'],
+    'Marseille': ['olympique marsella', 'marsella', 'om'],
+    'Lyon': ['olympique lyonnais', 'olympique lyon'],
+    'Mainz 05': ['mainz'],
+    'Newcastle Utd': ['newcastle', 'newcastle united'],
+    "Nott'ham Forest": ['nottingham forest', 'forest'],
+    'Paris S-G': ['psg', 'paris saint germain'],
+    'Rayo Vallecano': ['rayo'],
+    'Real Sociedad': ['la real'],
+    'RB Leipzig': ['leipzig'],
+    'Tottenham': ['spurs', 'tottenham hotspur'],
+    'West Ham': ['west ham united'],
+    'Wolves': ['wolverhampton'],
+    'Werder Bremen': ['bremen'],
+}
+
+# Siglas de club que se ignoran al comparar ("Real Madrid CF" == "Real Madrid")
+PALABRAS_CLUB = ('fc', 'cf', 'ac', 'as', 'ssc', 'sc', 'afc', 'cd', 'ud', 'rc', 'club')
+
+
+# 🔹 ÍNDICE DE NOMBRES
+# Se construye una vez: clave plegada -> nombre original, índice invertido de
+# trigramas (candidatos) y lista ordenada de palabras (prefijos). Las
+# consultas ordenan unos pocos candidatos por distancia de edición; a igual
+# distancia gana la mayor 'prioridad' (p. ej. minutos jugados). resolver() sólo
+# devuelve un nombre si no hay empate en la mejor distancia.
+class IndiceNombres:
+    def __init__(self, nombres, alias=None, ignorar=(), candidatos=12, prioridad=None):
+        self.ignorar = set(ignorar)
+        self.candidatos = candidatos
+
+        self.exactos = {}
+        peso = {}
+        prioridad = [0] * len(nombres) if prioridad is None else list(prioridad)
+        for nombre, p in zip(nombres, prioridad):
+            self.exactos.setdefault(self.clave(nombre), nombre)
+            peso.setdefault(nombre, p)
+        for nombre, extras in (alias or {}).items():
+            if self.clave(nombre) in self.exactos:
+                for extra in extras:
+                    self.exactos.setdefault(self.clave(extra), nombre)
+        self.exactos.pop('', None)
+
+        self.claves = list(self.exactos)
+        self.originales = [self.exactos[c] for c in self.claves]
+        self.palabras_clave = [c.split() for c in self.claves]
+        self.prioridad = [peso.get(o, 0) for o in self.originales]
+
+        postings = {}
+        self.n_trigramas = np.empty(len(self.claves), dtype=np.int32)
+        for i, clave in enumerate(self.claves):
+            tri = trigramas(clave)
+            self.n_trigramas[i] = len(tri)
+            for t in tri:
+                postings.setdefault(t, []).append(i)
+        self.postings = {t: np.array(ids, dtype=np.int32) for t, ids in postings.items()}
+
+        # Palabras ordenadas para búsqueda por prefijo ("courto" -> Courtois)
+        pares = sorted((p, i) for i, palabras in enumerate(self.palabras_clave) for p in palabras)
+        self.palabras = [p for p, _ in pares]
+        self.ids_palabra = [i for _, i in pares]
+
+    def clave(self, texto):
+        palabras = plegar(texto).split()
+        if self.ignorar:
+            palabras = [p for p in palabras if p not in self.ignorar] or palabras
+        return ' '.join(palabras)
+
+    # Letras mínimas para resolver sólo por prefijo ("courto" -> Courtois)
+    MIN_PREFIJO = 4
+
+    @staticmethod
+    def limite(clave):
+        # Errores tolerados por palabra: ninguno hasta 4 letras ("ter", "real"),
+        # 1 hasta 7 y luego ~1 cada 4; el total es la suma
+        return sum(0 if len(p) <= 4 else max(1, len(p) // 4) for p in clave.split())
+
+    def _distancia(self, consulta, i, limite):
+        # Contra el nombre completo o contra el mismo número de palabras seguidas
+        # ("curtois" frente a "thibaut courtois")
+        mejor = distancia(consulta, self.claves[i], limite)
+        palabras = self.palabras_clave[i]
+        n = len(consulta.split())
+        for k in range(len(palabras) - n + 1):
+            if mejor == 0:
+                break
+            mejor = min(mejor, distancia(consulta, ' '.join(palabras[k:k + n]), min(limite, mejor)))
+        return mejor
+
+    def _dice(self, q):
+        # Coeficiente de Dice entre los trigramas de la consulta y de cada clave
+        tri = trigramas(q)
+        listas = [self.postings[t] for t in tri if t in self.postings]
+        if not listas:
+            return np.zeros(len(self.claves))
+        comunes = np.bincount(np.concatenate(listas), minlength=len(self.claves))
+        return 2 * comunes / (len(tri) + self.n_trigramas)
+
+    def _prefijo(self, palabra, maximo):
+        ids = []
+        k = bisect.bisect_left(self.palabras, palabra)
+        while k < len(self.palabras) and self.palabras[k].startswith(palabra) and len(ids) < maximo:
+            ids.append(self.ids_palabra[k])
+            k += 1
+        return ids
+
+    # --- CONSULTAS ---
+    def buscar(self, consulta, k=5):
+        # Lista [(nombre original, distancia)] de mejor a peor; un prefijo cuenta
+        # las letras que le faltan. Sólo candidatos dentro del límite de errores.
+        q = self.clave(consulta)
+        if not q:
+            return []
+        if q in self.exactos:
+            return [(self.exactos[q], 0)]
+
+        dice = self._dice(q)
+        resultado = {}
+
+        # Una sola palabra que empieza igual que alguna del índice: el prefijo
+        # cuenta como tantas ediciones como letras faltan y vale si entra en el
+        # límite de esa palabra ("courto" -> courtois sí, "messi" -> messias no);
+        # si no, distancia de edición sobre los candidatos con más trigramas en común
+        if len(q) >= self.MIN_PREFIJO and ' ' not in q:
+            for i in self._prefijo(q, self.candidatos):
+                for p in self.palabras_clave[i]:
+                    faltan = len(p) - len(q)
+                    if p.startswith(q) and faltan <= self.limite(p):
+                        resultado[i] = min(faltan, resultado.get(i, faltan))
+
+        if not resultado:
+            m = min(self.candidatos, len(dice))
+            ids = np.argpartition(-dice, m - 1)[:m] if m else []
+            mejor = dice[ids].max() if len(ids) else 0
+            limite = self.limite(q)
+            for i in ids:
+                if dice[i] > 0 and dice[i] >= 0.5 * mejor:
+                    d = self._distancia(q, int(i), limite)
+                    if d <= limite:
+                        resultado[int(i)] = d
+
+        orden = sorted(resultado, key=lambda i: (resultado[i], q not in self.palabras_clave[i], -self.prioridad[i], -dice[i]))
+        vistos, salida = set(), []
+        for i in orden:
+            if self.originales[i] not in vistos:
+                vistos.add(self.originales[i])
+                salida.append((self.originales[i], resultado[i]))
+        return salida[:k]
+
+    def resolver(self, consulta):
+        # None si no hay candidato o si varios empatan en la mejor distancia
+        # ("mbape" -> Kylian / Ethan Mbappé): se usan entonces las sugerencias
+        encontrados = self.buscar(consulta, k=2)
+        if not encontrados or (len(encontrados) > 1 and encontrados[1][1] == encontrados[0][1]):
+            return None
+        return encontrados[0][0]
+
+    def sugerencias(self, consulta, k=3):
+        # Nombres más parecidos por trigramas, sin límite de errores
+        dice = self._dice(self.clave(consulta))
+        salida = []
+        for i in np.argsort(-dice, kind='stable'):
+            if dice[i] < 0.3 or len(salida) == k:
+                break
+            if self.originales[i] not in salida:
+                salida.append(self.originales[i])
+        return salida
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from indices import obtener_indice, cache_por_frame
+
+# 🔹 MOTOR DE PERCENTILES
+# Para cada métrica se guarda la columna ordenada; el percentil de un valor es
+# la proporción de jugadores con un valor estrictamente menor, igual que
+# (df[cat] < valor).mean() pero resuelto con searchsorted.
+class MatrizPercentiles:
+    def __init__(self, df, metricas=None, indice=None):
+        if metricas is None:
+            metricas = df.select_dtypes(include='number').columns.tolist()
+        self.metricas = list(metricas)
+        self.columna = {m: i for i, m in enumerate(self.metricas)}
+        self.indice = obtener_indice(df, indice)
+
+        # Valores de cada jugador (filas) y columnas ordenadas (NaN al final)
+        self.valores = df[self.metricas].to_numpy(dtype=np.float64)
+        self.ordenada = np.sort(self.valores, axis=0)
+
+        # Ámbitos opcionales (por competición / por posición) construidos bajo demanda
+        self._ambitos = {}
+        self._df_columnas = {c: df[c].to_numpy() for c in ('Comp', 'Pos') if c in df.columns}
+
+    def _ambito(self, ambito):
+        if ambito not in self._ambitos:
+            grupos = {}
+            claves = self._df_columnas[ambito]
+            for clave in pd.unique(claves):
+                filas = np.flatnonzero(claves == clave)
+                grupos[clave] = np.sort(self.valores[filas], axis=0)
+            self._ambitos[ambito] = grupos
+        return self._ambitos[ambito]
+
+    @staticmethod
+    def _rango(ordenada, valores):
+        # ordenada: (N, M), valores: (P, M) -> percentiles (P, M)
+        n = ordenada.shape[0]
+        salida = np.zeros(valores.shape, dtype=np.float64)
+        if n == 0:
+            return salida
+        for j in range(ordenada.shape[1]):
+            salida[:, j] = np.searchsorted(ordenada[:, j], valores[:, j], side='left')
+        salida[np.isnan(valores)] = 0
+        return salida * (100.0 / n)
+
+    def posiciones(self, jugadores):
+        return np.array([self.indice.posicion(j) for j in jugadores], dtype=object)
+
+    def percentiles_filas(self, filas, metricas=None, ambito=None):
+        metricas = self.metricas if metricas is None else list(metricas)
+        cols = [self.columna[m] for m in metricas]
+        filas = np.asarray(filas, dtype=np.intp)
+        valores = self.valores[np.ix_(filas, cols)]
+
+        if ambito is None:
+            return self._rango(self.ordenada[:, cols], valores)
+
+        # Cada jugador se compara sólo contra su competición / posición
+        grupos = self._ambito(ambito)
+        claves = self._df_columnas[ambito][filas]
+        salida = np.zeros(valores.shape, dtype=np.float64)
+        for clave in pd.unique(claves):
+            sel = claves == clave
+            salida[sel] = self._rango(grupos[clave][:, cols], valores[sel])
+        return salida
+
+    def percentiles(self, jugadores, metricas=None, ambito=None):
+        metricas = self.metricas if metricas is None else list(metricas)
+        pos = self.posiciones(jugadores)
+        encontrados = [p is not None for p in pos]
+        nombres = [j for j, ok in zip(jugadores, encontrados) if ok]
+        filas = [p for p in pos if p is not None]
+
+        valores = self.percentiles_filas(filas, metricas, ambito) if filas else np.empty((0, len(metricas)))
+        return pd.DataFrame(valores, index=nombres, columns=metricas)
+
+
+def obtener_percentiles(df, indice=None):
+    return cache_por_frame(df, 'percentiles', lambda d: MatrizPercentiles(d, indice=indice))
+
+
+def percentiles_jugadores(df, jugadores, metricas=None, ambito=None, indice=None):
+    return obtener_percentiles(df, indice).percentiles(jugadores, metricas, ambito)
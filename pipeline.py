@@ -0,0 +1,216 @@
+import os
+import sys
+import joblib
+import numpy as np
+import pandas as pd
+from clustering import ModeloClusters, CLUSTER_VARS
+
+RUTA_ESTADO = "pipeline_estado.joblib"
+RUTA_IMAGENES_FUENTE = "editar.csv"
+
+# --- fatiga.ipynb ---
+FATIGUE_VARS = ['Min', '90s', 'Carries', 'PrgDist', 'Tkl+Int']
+FATIGUE_PESOS = np.array([0.25, 0.15, 0.20, 0.25, 0.15])
+
+# --- tacticas_ligas.ipynb ---
+LIGA_VARS = ['PrgDist', 'PrgP', 'Carries', 'xG', 'Gls', 'Tkl+Int', 'FatigueIndex']
+
+
+def _escalar(X, params):
+    return (X - params['media']) / params['escala']
+
+
+def _params_escalado(X):
+    # Igual que StandardScaler (desviación poblacional, escala 1 si es constante)
+    escala = X.std(axis=0)
+    return {'media': X.mean(axis=0), 'escala': np.where(escala == 0, 1, escala)}
+
+
+# 🔹 ETAPA 1: ÍNDICE DE FATIGA
+def ajustar_fatiga(df):
+    return _params_escalado(df[FATIGUE_VARS].to_numpy(dtype=np.float64))
+
+def aplicar_fatiga(df, params):
+    X = _escalar(df[FATIGUE_VARS].to_numpy(dtype=np.float64), params)
+    return pd.DataFrame({'FatigueIndex': X @ FATIGUE_PESOS}, index=df.index)
+
+
+# 🔹 ETAPA 2: CLUSTERS Y ESTILOS
+# Scaler, centroides y reglas de estilo en clustering.py (ModeloClusters)
+def ajustar_estilos(df):
+    if 'PlayerCluster' in df.columns and df['PlayerCluster'].notna().all():
+        # Se congelan los clusters ya publicados
+        return ModeloClusters.desde_etiquetas(df, df['PlayerCluster'])
+    return ModeloClusters.ajustar(df)
+
+
+def actualizar_estilos(df, params):
+    # Reajuste tras añadir filas partiendo de los centroides actuales (mismos ids)
+    return modelo_estilos(params).actualizar(df)
+
+
+def modelo_estilos(params):
+    # Estados guardados antes de ModeloClusters: dict con las mismas claves
+    return params if isinstance(params, ModeloClusters) else ModeloClusters(**params)
+
+
+def aplicar_estilos(df, params):
+    return modelo_estilos(params).asignar(df)
+
+
+# 🔹 ETAPA 3: PERFIL DE LIGA (por competición)
+def league_insight(row):
+    if row['xG'] > 1:
+        return 'Liga ofensiva y vertical'
+    if row['PrgP'] > 1:
+        return 'Liga táctica y de posesión'
+    if row['Tkl+Int'] > 1:
+        return 'Liga física y defensiva'
+    return 'Liga equilibrada'
+
+
+def ajustar_ligas(df):
+    league_metrics = df.groupby('Comp', observed=True)[LIGA_VARS].mean()
+    return {'media': league_metrics.mean(), 'std': league_metrics.std()}
+
+
+def aplicar_ligas(df, params):
+    league_metrics = df.groupby('Comp', observed=True)[LIGA_VARS].mean()
+    league_norm = (league_metrics - params['media']) / params['std']
+    insight = league_norm.apply(league_insight, axis=1)
+    return pd.DataFrame({'StyleInsight': df['Comp'].map(insight).astype(object)}, index=df.index)
+
+
+# 🔹 ETAPA 4: IMÁGENES (datasetfinal.ipynb)
+def ajustar_imagenes(df):
+    if not os.path.exists(RUTA_IMAGENES_FUENTE):
+        return None
+    imgs = pd.read_csv(RUTA_IMAGENES_FUENTE)[['Player', 'PlayerImg', 'TeamImg']]
+    return imgs.drop_duplicates('Player').set_index('Player')
+
+def aplicar_imagenes(df, params):
+    return pd.DataFrame({
+        'PlayerImg': df['Player'].map(params['PlayerImg']).astype(object),
+        'TeamImg': df['Player'].map(params['TeamImg']).astype(object)
+    }, index=df.index)
+
+
+# 🔹 DEFINICIÓN DEL PIPELINE
+# Orden = orden de dependencias. 'grupo' indica que la etapa se calcula por
+# grupos completos (si cambia una fila, se recalcula toda su competición).
+ETAPAS = [
+    {'nombre': 'fatiga', 'entradas': FATIGUE_VARS, 'salidas': ['FatigueIndex'],
+     'ajustar': ajustar_fatiga, 'aplicar': aplicar_fatiga, 'grupo': None},
+    {'nombre': 'estilos', 'entradas': ['Pos'] + CLUSTER_VARS, 'salidas': ['PlayerCluster', 'PlayerStyle'],
+     'ajustar': ajustar_estilos, 'aplicar': aplicar_estilos, 'actualizar': actualizar_estilos, 'grupo': None},
+    {'nombre': 'ligas', 'entradas': ['Comp'] + LIGA_VARS, 'salidas': ['StyleInsight'],
+     'ajustar': ajustar_ligas, 'aplicar': aplicar_ligas, 'grupo': 'Comp'},
+    {'nombre': 'imagenes', 'entradas': ['Player'], 'salidas': ['PlayerImg', 'TeamImg'],
+     'ajustar': ajustar_imagenes, 'aplicar': aplicar_imagenes, 'grupo': None},
+]
+
+
+def claves_filas(df):
+    # Jugador + equipo + nº de aparición (hay filas repetidas en el dataset)
+    aparicion = df.groupby(['Player', 'Squad'], observed=True, sort=False).cumcount()
+    return df['Player'].astype(str) + '|' + df['Squad'].astype(str) + '|' + aparicion.astype(str)
+
+
+def _hash_entradas(df, columnas):
+    return pd.util.hash_pandas_object(df[columnas], index=False).to_numpy()
+
+
+def cargar_estado(ruta=RUTA_ESTADO):
+    if os.path.exists(ruta):
+        return joblib.load(ruta)
+    return {'params': {}, 'hashes': {}}
+
+
+def guardar_estado(estado, ruta=RUTA_ESTADO):
+    joblib.dump(estado, ruta)
+
+
+# 🔹 EJECUCIÓN INCREMENTAL
+# Para cada etapa se comparan los hashes de sus columnas de entrada con los de
+# la última ejecución; sólo se recalculan las filas nuevas o modificadas (o sus
+# grupos). Los parámetros (scaler, centroides, percentiles...) quedan
+# congelados salvo que se pida reajustar (desde cero) o actualizar (partiendo
+# de los parámetros anteriores, en las etapas que lo admiten).
+def ejecutar(df, estado=None, reajustar=(), actualizar=()):
+    if estado is None:
+        estado = cargar_estado()
+    df = df.copy()
+    claves = claves_filas(df).to_numpy()
+    informe = {}
+
+    for etapa in ETAPAS:
+        nombre = etapa['nombre']
+        forzar = reajustar == 'todo' or nombre in reajustar
+        # Primera ejecución sobre un CSV que ya trae la columna: se adoptan los
+        # valores publicados y sólo se calculan las filas vacías
+        adoptar = (not forzar and nombre not in estado['params']
+                   and all(col in df.columns for col in etapa['salidas']))
+        if forzar or nombre not in estado['params']:
+            estado['params'][nombre] = etapa['ajustar'](df)
+            estado['hashes'].pop(nombre, None)
+        if not forzar and nombre in actualizar and 'actualizar' in etapa:
+            estado['params'][nombre] = etapa['actualizar'](df, estado['params'][nombre])
+            estado['hashes'].pop(nombre, None)
+            adoptar = False
+        params = estado['params'][nombre]
+        if params is None:
+            informe[nombre] = 0
+            continue
+
+        hashes = _hash_entradas(df, etapa['entradas'])
+        if adoptar:
+            sucias = np.zeros(len(df), dtype=bool)
+        else:
+            previos = estado['hashes'].get(nombre, {})
+            sucias = np.array([previos.get(k) != h for k, h in zip(claves, hashes)], dtype=bool)
+        for col in etapa['salidas']:
+            if col not in df.columns:
+                sucias[:] = True
+            else:
+                sucias |= df[col].isna().to_numpy()
+
+        if etapa['grupo'] is not None and sucias.any():
+            grupos = df.loc[sucias, etapa['grupo']].unique()
+            sucias = df[etapa['grupo']].isin(grupos).to_numpy()
+
+        if sucias.any():
+            resultado = etapa['aplicar'](df[sucias], params)
+            for col in etapa['salidas']:
+                if col not in df.columns:
+                    df[col] = None
+                elif isinstance(df[col].dtype, pd.CategoricalDtype):
+                    df[col] = df[col].astype(object)
+                df.loc[sucias, col] = resultado[col].to_numpy()
+                df[col] = df[col].infer_objects()
+                if resultado[col].dtype.kind in 'iu' and df[col].notna().all():
+                    df[col] = df[col].astype(np.int64)
+
+        estado['hashes'][nombre] = dict(zip(claves, hashes))
+        informe[nombre] = int(sucias.sum())
+
+    return df, estado, informe
+
+
+if __name__ == "__main__":
+    # python pipeline.py [entrada.csv] [--reajustar] -> actualiza final.csv
+    # --actualizar-clusters: reajusta los clusters partiendo de los centroides
+    # guardados (tras añadir filas) en lugar de congelarlos
+    from datos import RUTA_CSV, convertir_dataset
+
+    entrada = next((a for a in sys.argv[1:] if not a.startswith('--')), RUTA_CSV)
+    reajustar = 'todo' if '--reajustar' in sys.argv else ()
+    actualizar = ('estilos',) if '--actualizar-clusters' in sys.argv else ()
+
+    df, estado, informe = ejecutar(pd.read_csv(entrada), reajustar=reajustar, actualizar=actualizar)
+    df.to_csv(RUTA_CSV, index=False)
+    convertir_dataset()
+    guardar_estado(estado)
+    # Scaler + centroides para asignar cluster y estilo a jugadores nuevos
+    modelo_estilos(estado['params']['estilos']).guardar()
+    for etapa, n in informe.items():
+        print(f"{etapa}: {n} filas recalculadas")
@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+
+# Métricas con ranking precalculado (Performance Labs)
+METRICAS_RANKING = ['Gls', 'Ast', 'Tkl+Int', 'PrgP', 'xG', 'xAG', 'SCA90', 'KP']
+
+# Puntuaciones compuestas: suma ponderada de columnas (no se añaden al DataFrame)
+PUNTUACIONES = {
+    'DefScore': {'Tkl+Int': 1, 'Clr': 1},
+    'MidScore': {'KP': 1, '1/3': 1, 'PrgP': 1},
+}
+
+# Franjas de edad: [desde, hasta)
+FRANJAS_EDAD = [(0, 21, 'Sub-21'), (21, 25, '21-24'), (25, 29, '25-28'), (29, 100, '29+')]
+
+AGRUPACIONES = (None, 'Comp', 'Pos', 'Edad')
+
+
+def franja_edad(edades):
+    edades = np.asarray(edades, dtype=np.float64)
+    etiquetas = np.array([f[2] for f in FRANJAS_EDAD] + [None], dtype=object)
+    cortes = [f[0] for f in FRANJAS_EDAD[1:]]
+    franja = np.digitize(edades, cortes)
+    franja[np.isnan(edades)] = len(FRANJAS_EDAD)
+    return etiquetas[franja]
+
+
+def _top(valores, filas, k):
+    # Mayores k valores; a igualdad, la fila anterior (como nlargest / idxmax).
+    # Los NaN no entran.
+    filas = filas[~np.isnan(valores[filas])]
+    orden = np.lexsort((filas, -valores[filas]))
+    return filas[orden[:k]]
+
+
+# 🔹 CLASIFICACIONES (TOP-K)
+# Al cargar se calcula el top-k de cada métrica en toda la base y en cada
+# competición / posición / franja de edad. Las consultas leen esas listas;
+# al añadir filas sólo se comparan las nuevas con el top-k guardado y al
+# reemplazar filas sólo se recalculan los grupos a los que pertenecían o pasan
+# a pertenecer (y el top de toda la base).
+class Clasificaciones:
+    def __init__(self, df, metricas=METRICAS_RANKING, puntuaciones=PUNTUACIONES, k=10, agrupaciones=AGRUPACIONES):
+        self.k = k
+        self.agrupaciones = tuple(agrupaciones)
+        self.puntuaciones = dict(puntuaciones)
+        self.metricas = list(metricas) + [p for p in self.puntuaciones if p not in metricas]
+        self.columnas = sorted({c for c in metricas} | {c for pesos in self.puntuaciones.values() for c in pesos})
+
+        # Copias propias: reemplazar() las modifica en su sitio
+        self.datos = {c: df[c].to_numpy(dtype=np.float64, copy=True) for c in self.columnas}
+        self.valores = {m: self._calcular(m, self.datos) for m in self.metricas}
+        self.grupos = self._grupos(df)
+        self.n = len(df)
+
+        self.tops = {}
+        todas = np.arange(self.n)
+        for metrica in self.metricas:
+            for agrupacion in self.agrupaciones:
+                if agrupacion is None:
+                    self.tops[(metrica, None, None)] = (k, _top(self.valores[metrica], todas, k))
+                    continue
+                for grupo in pd.unique(self.grupos[agrupacion]):
+                    if grupo is not None:
+                        self._calcular_top(metrica, agrupacion, grupo, k)
+
+    def _calcular(self, metrica, datos):
+        if metrica in self.puntuaciones:
+            return sum(peso * datos[c] for c, peso in self.puntuaciones[metrica].items())
+        return datos[metrica]
+
+    def _calcular_top(self, metrica, por, grupo, k):
+        # Lista (k pedido, posiciones) de una combinación métrica / grupo
+        filas = np.arange(self.n) if por is None else np.flatnonzero(self.grupos[por] == grupo)
+        self.tops[(metrica, por, grupo)] = (k, _top(self.valores[metrica], filas, k))
+        return self.tops[(metrica, por, grupo)][1]
+
+    def _grupos(self, df):
+        grupos = {}
+        for agrupacion in self.agrupaciones:
+            if agrupacion == 'Edad':
+                grupos['Edad'] = franja_edad(df['Age'])
+            elif agrupacion is not None:
+                grupos[agrupacion] = df[agrupacion].astype(object).to_numpy(copy=True)
+        return grupos
+
+    def agregar_puntuacion(self, nombre, pesos):
+        # Nueva puntuación compuesta; su top-k se calcula la primera vez que se pide
+        faltan = [c for c in pesos if c not in self.datos]
+        if faltan:
+            raise KeyError(f"Columnas no cargadas en las clasificaciones: {', '.join(faltan)}")
+        self.puntuaciones[nombre] = dict(pesos)
+        self.valores[nombre] = self._calcular(nombre, self.datos)
+        self.metricas.append(nombre)
+
+    # --- CONSULTAS ---
+    def top(self, metrica, k=5, por=None, grupo=None):
+        # Posiciones de fila (iloc) de los k primeros
+        guardado = self.tops.get((metrica, por, grupo))
+        if guardado is None or k > guardado[0]:
+            return self._calcular_top(metrica, por, grupo, max(k, self.k))[:k]
+        return guardado[1][:k]
+
+    def lider(self, metrica, por=None, grupo=None):
+        lista = self.top(metrica, 1, por, grupo)
+        return int(lista[0]) if len(lista) else None
+
+    def maximo(self, metrica, por=None, grupo=None):
+        fila = self.lider(metrica, por, grupo)
+        return None if fila is None else self.valores[metrica][fila]
+
+    def valor(self, metrica, filas):
+        return self.valores[metrica][filas]
+
+    def tabla(self, df, metrica, k=5, por=None, grupo=None):
+        # DataFrame [Player, metrica] listo para st.dataframe
+        filas = self.top(metrica, k, por, grupo)
+        valores = df[metrica].iloc[filas].to_numpy() if metrica in df.columns else self.valores[metrica][filas]
+        return pd.DataFrame({'Player': df['Player'].iloc[filas].to_numpy(), metrica: valores})
+
+    # --- FILAS NUEVAS O REEMPLAZADAS ---
+    def actualizar(self, df, filas):
+        # filas: posiciones cambiadas por un lote del delta; las anteriores a n
+        # se reemplazaron en su sitio, el resto se añadieron al final de df
+        filas = np.asarray(filas, dtype=np.intp)
+        reemplazadas = filas[filas < self.n]
+        if len(reemplazadas):
+            self.reemplazar(df.iloc[reemplazadas], reemplazadas)
+        if len(df) > self.n:
+            self.agregar(df.iloc[self.n:])
+
+    def reemplazar(self, filas_df, posiciones):
+        posiciones = np.asarray(posiciones, dtype=np.intp)
+        datos = {c: filas_df[c].to_numpy(dtype=np.float64) for c in self.columnas}
+        for c in self.columnas:
+            self.datos[c][posiciones] = datos[c]
+        for m in self.metricas:
+            self.valores[m][posiciones] = self._calcular(m, datos)
+
+        # Grupos afectados: los de antes y los de después del cambio
+        nuevos = self._grupos(filas_df)
+        afectados = {}
+        for agrupacion, valores in nuevos.items():
+            afectados[agrupacion] = set(self.grupos[agrupacion][posiciones]) | set(valores)
+            self.grupos[agrupacion][posiciones] = valores
+
+        for (metrica, por, grupo), (k, _) in list(self.tops.items()):
+            if por is None or grupo in afectados[por]:
+                self._calcular_top(metrica, por, grupo, k)
+        for agrupacion, grupos in afectados.items():
+            for grupo in grupos:
+                if grupo is None:
+                    continue
+                for metrica in self.metricas:
+                    if (metrica, agrupacion, grupo) not in self.tops:
+                        self._calcular_top(metrica, agrupacion, grupo, self.k)
+
+    def agregar(self, nuevas):
+        # nuevas: DataFrame con las filas añadidas al final del dataset
+        inicio = self.n
+        datos = {c: nuevas[c].to_numpy(dtype=np.float64) for c in self.columnas}
+        for c in self.columnas:
+            self.datos[c] = np.concatenate([self.datos[c], datos[c]])
+        for m in self.metricas:
+            self.valores[m] = np.concatenate([self.valores[m], self._calcular(m, datos)])
+        grupos = self._grupos(nuevas)
+        for agrupacion, valores in grupos.items():
+            self.grupos[agrupacion] = np.concatenate([self.grupos[agrupacion], valores])
+        self.n += len(nuevas)
+
+        nuevas_filas = np.arange(inicio, self.n)
+        for (metrica, por, grupo), (k, lista) in list(self.tops.items()):
+            if por is None:
+                candidatas = nuevas_filas
+            else:
+                candidatas = nuevas_filas[grupos[por] == grupo]
+            if len(candidatas):
+                self.tops[(metrica, por, grupo)] = (k, _top(self.valores[metrica], np.concatenate([lista, candidatas]), k))
+
+        # Grupos que no existían hasta ahora
+        for agrupacion, valores in grupos.items():
+            for grupo in pd.unique(valores):
+                if grupo is None:
+                    continue
+                for metrica in self.metricas:
+                    if (metrica, agrupacion, grupo) not in self.tops:
+                        self._calcular_top(metrica, agrupacion, grupo, self.k)
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+from indices import obtener_indice, cache_por_frame
+from instrumentacion import contar
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+# Variables por defecto (las de utils.jugadores_similares)
+FEATURES_BASE = ['xG','xAG','Carries','PrgDist','PrgP']
+
+# Variables de clustering.ipynb (perfil más completo)
+FEATURES_CLUSTER = [
+    'PrgDist','Carries','PrgP','PrgR',
+    'Att_stats_possession','Succ',
+    'xG','xAG',
+    'Tkl+Int','Blocks',
+    'Crs','KP','PrgC','Touches','Sh'
+]
+
+# A partir de este tamaño de grupo se usa el backend ANN (si hnswlib está instalado)
+UMBRAL_ANN = 20000
+
+
+# 🔹 ÍNDICE DE SIMILITUD
+# Matriz de features normalizada (norma L2) por posición: la similitud de coseno
+# se reduce a un producto escalar y el top-k se obtiene con argpartition.
+class IndiceSimilitud:
+    def __init__(self, df, features=None, estandarizar=None, backend='auto', indice=None):
+        if features is None or features == 'base':
+            features = FEATURES_BASE
+        elif features == 'cluster':
+            features = FEATURES_CLUSTER
+        if estandarizar is None:
+            estandarizar = features is FEATURES_CLUSTER
+
+        self.features = list(features)
+        self.indice = obtener_indice(df, indice)
+        self.nombres = df['Player'].to_numpy()
+        self.codigos_nombre = pd.factorize(df['Player'])[0]
+
+        X = df[self.features].fillna(0).to_numpy(dtype=np.float64)
+        if estandarizar:
+            # Igual que el StandardScaler de clustering.ipynb
+            std = X.std(axis=0)
+            X = (X - X.mean(axis=0)) / np.where(std == 0, 1, std)
+        normas = np.linalg.norm(X, axis=1, keepdims=True)
+        self.X = X / np.where(normas == 0, 1, normas)
+
+        # Una matriz por posición (mismo criterio que el pool original)
+        self.pos_fila = df['Pos'].to_numpy()
+        self.grupos = self.indice.posiciones
+        self.matrices = {pos: self.X[filas] for pos, filas in self.grupos.items()}
+
+        self.backend = backend
+        self._ann = {}
+
+    # --- BACKEND ANN (opcional) ---
+    def _usar_ann(self, pos):
+        if self.backend == 'exacto' or hnswlib is None:
+            return False
+        return self.backend == 'ann' or len(self.grupos[pos]) >= UMBRAL_ANN
+
+    def _indice_ann(self, pos):
+        if pos not in self._ann:
+            M = self.matrices[pos]
+            ann = hnswlib.Index(space='ip', dim=M.shape[1])
+            ann.init_index(max_elements=len(M), ef_construction=200, M=16)
+            ann.add_items(M.astype(np.float32), np.arange(len(M)))
+            ann.set_ef(64)
+            self._ann[pos] = ann
+        return self._ann[pos]
+
+    # --- CONSULTAS ---
+    def _top_k(self, pos, fila, k):
+        filas = self.grupos[pos]
+        # Se descartan todas las filas con el mismo nombre (jugadores repetidos)
+        validas = self.codigos_nombre[filas] != self.codigos_nombre[fila]
+        k = min(k, int(validas.sum()))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        if self._usar_ann(pos):
+            ann = self._indice_ann(pos)
+            contar("similitud.consultas_ann")
+            extra = len(filas) - int(validas.sum())
+            etiquetas, distancias = ann.knn_query(self.X[fila].astype(np.float32), k=min(len(filas), k + extra))
+            candidatos = etiquetas[0][validas[etiquetas[0]]][:k]
+            sims = 1 - distancias[0][validas[etiquetas[0]]][:k]
+            return filas[candidatos], sims
+
+        contar("similitud.filas_comparadas", len(filas))
+        sims = self.matrices[pos] @ self.X[fila]
+        sims = np.where(validas, sims, -np.inf)
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top], kind='stable')]
+        return filas[top], sims[top]
+
+    def similares(self, jugador, k=4):
+        fila = self.indice.posicion(jugador)
+        if fila is None:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        return self._top_k(self.pos_fila[fila], fila, k)
+
+    def similares_todos(self, k=4, bloque=2048):
+        # Top-k para todos los jugadores, por bloques para acotar memoria
+        salida = []
+        for pos, filas in self.grupos.items():
+            M = self.matrices[pos]
+            codigos = self.codigos_nombre[filas]
+            kk = min(k, len(filas) - 1)
+            if kk <= 0:
+                continue
+            for ini in range(0, len(filas), bloque):
+                S = M[ini:ini + bloque] @ M.T
+                S[codigos[ini:ini + bloque, None] == codigos[None, :]] = -np.inf
+                top = np.argpartition(-S, kk - 1, axis=1)[:, :kk]
+                sims = np.take_along_axis(S, top, axis=1)
+                orden = np.argsort(-sims, axis=1, kind='stable')
+                top = np.take_along_axis(top, orden, axis=1)
+                sims = np.take_along_axis(sims, orden, axis=1)
+                origen = np.repeat(filas[ini:ini + bloque], kk)
+                bloque_df = pd.DataFrame({
+                    'Player': self.nombres[origen],
+                    'Similar': self.nombres[filas[top.ravel()]],
+                    'Rank': np.tile(np.arange(1, kk + 1), len(top)),
+                    'Similarity': sims.ravel(),
+                    'Fila': origen,
+                    'FilaSimilar': filas[top.ravel()],
+                })
+                salida.append(bloque_df[np.isfinite(bloque_df['Similarity'])])
+        if not salida:
+            return pd.DataFrame(columns=['Player', 'Similar', 'Rank', 'Similarity', 'Fila', 'FilaSimilar'])
+        return pd.concat(salida, ignore_index=True)
+
+
+def obtener_similitud(df, features=None, indice=None):
+    clave = ('similitud', tuple(features) if isinstance(features, list) else features)
+    return cache_por_frame(df, clave, lambda d: IndiceSimilitud(d, features, indice=indice))
@@ -0,0 +1,128 @@
+import sys
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from equipos import matriz_enfrentamientos
+
+# Probabilidad de empate fija: predecir_partido sólo reparte la victoria
+PROB_EMPATE = 0.25
+DESCENSOS = 3
+PLAZAS_CHAMPIONS = 4
+
+
+# 🔹 CALENDARIO
+# Doble vuelta: cada par ordenado (local, visitante) una vez.
+def calendario(n_equipos):
+    local, visitante = np.where(~np.eye(n_equipos, dtype=bool))
+    return local, visitante
+
+
+def aplicar_ajustes(tabla, ajustes):
+    # "What if": {'Barcelona': {'Ataque': 0.9}, ...} multiplica columnas de la tabla
+    if not ajustes:
+        return tabla
+    tabla = tabla.copy()
+    for equipo, cambios in ajustes.items():
+        for columna, factor in cambios.items():
+            tabla[columna] = tabla[columna].astype(np.float64)
+            tabla.loc[equipo, columna] = tabla.loc[equipo, columna] * factor
+    return tabla
+
+
+# 🔹 NÚCLEO MONTE CARLO
+# Todas las temporadas de un bloque a la vez: sorteo uniforme (temporadas x
+# partidos) y puntos por equipo con dos productos de matrices.
+def _simular_bloque(prob_local, local, visitante, n_equipos, n, prob_empate, descensos, semilla, bloque):
+    rng = np.random.default_rng(semilla)
+    n_partidos = len(local)
+
+    H = np.zeros((n_partidos, n_equipos), dtype=np.float32)
+    A = np.zeros((n_partidos, n_equipos), dtype=np.float32)
+    H[np.arange(n_partidos), local] = 1
+    A[np.arange(n_partidos), visitante] = 1
+
+    p_local = (prob_local * (1 - prob_empate)).astype(np.float32)
+    p_empate = np.float32(prob_empate)
+
+    titulos = np.zeros(n_equipos, dtype=np.int64)
+    top = np.zeros(n_equipos, dtype=np.int64)
+    descenso = np.zeros(n_equipos, dtype=np.int64)
+    suma_puntos = np.zeros(n_equipos, dtype=np.float64)
+    suma_posicion = np.zeros(n_equipos, dtype=np.float64)
+
+    hechas = 0
+    while hechas < n:
+        b = min(bloque, n - hechas)
+        u = rng.random((b, n_partidos), dtype=np.float32)
+        gana_local = (u < p_local).astype(np.float32)
+        empate = ((u >= p_local) & (u < p_local + p_empate)).astype(np.float32)
+        gana_visitante = 1 - gana_local - empate
+
+        puntos = 3 * (gana_local @ H + gana_visitante @ A) + empate @ (H + A)
+
+        # Desempate aleatorio (ruido < 1 punto)
+        clave = puntos + rng.random(puntos.shape, dtype=np.float32) * 0.5
+        orden = np.argsort(-clave, axis=1)
+
+        titulos += np.bincount(orden[:, 0], minlength=n_equipos)
+        top += np.bincount(orden[:, :PLAZAS_CHAMPIONS].ravel(), minlength=n_equipos)
+        descenso += np.bincount(orden[:, n_equipos - descensos:].ravel(), minlength=n_equipos)
+        suma_puntos += puntos.sum(axis=0)
+        posiciones = np.empty_like(orden)
+        np.put_along_axis(posiciones, orden, np.arange(1, n_equipos + 1)[None, :], axis=1)
+        suma_posicion += posiciones.sum(axis=0)
+        hechas += b
+
+    return titulos, top, descenso, suma_puntos, suma_posicion
+
+
+def simular_liga(tabla, comp, n=10000, prob_empate=PROB_EMPATE, descensos=DESCENSOS,
+                 semilla=None, procesos=1, bloque=2000, ajustes=None):
+    tabla = aplicar_ajustes(tabla, ajustes)
+    equipos = tabla.index[tabla['Comp'] == comp]
+    n_equipos = len(equipos)
+    prob = matriz_enfrentamientos(tabla, equipos).to_numpy() / 100
+    local, visitante = calendario(n_equipos)
+    prob_local = prob[local, visitante]
+    descensos = min(descensos, n_equipos)
+
+    # Reparto de temporadas entre procesos con semillas independientes
+    semillas = np.random.SeedSequence(semilla).spawn(max(1, procesos))
+    partes = [n // len(semillas) + (1 if i < n % len(semillas) else 0) for i in range(len(semillas))]
+    args = [(prob_local, local, visitante, n_equipos, k, prob_empate, descensos, s, bloque)
+            for k, s in zip(partes, semillas) if k > 0]
+
+    if procesos > 1:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            resultados = list(pool.map(_simular_bloque, *zip(*args)))
+    else:
+        resultados = [_simular_bloque(*a) for a in args]
+
+    titulos, top, descenso, suma_puntos, suma_posicion = (sum(r[i] for r in resultados) for i in range(5))
+
+    salida = pd.DataFrame({
+        'Comp': comp,
+        'Puntos_Medios': suma_puntos / n,
+        'Posicion_Media': suma_posicion / n,
+        'P_Titulo': titulos / n * 100,
+        'P_Top4': top / n * 100,
+        'P_Descenso': descenso / n * 100,
+    }, index=pd.Index(equipos, name='Squad'))
+    return salida.sort_values('Puntos_Medios', ascending=False)
+
+
+# 🔹 TODAS LAS LIGAS
+def simular_temporadas(tabla, comp=None, n=10000, **kwargs):
+    comps = [comp] if comp is not None else sorted(tabla['Comp'].unique())
+    return pd.concat([simular_liga(tabla, c, n=n, **kwargs) for c in comps])
+
+
+if __name__ == "__main__":
+    # python simulacion.py ["es La Liga"] [n_temporadas]
+    from datos import cargar_dataset
+    from equipos import construir_tabla_equipos
+
+    tabla = construir_tabla_equipos(cargar_dataset(imagenes=False))
+    comp = sys.argv[1] if len(sys.argv) > 1 else None
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    print(simular_temporadas(tabla, comp, n=n).round(1).to_string())
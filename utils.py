@@ -1,56 +1,67 @@
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from indices import obtener_indice
+from similitud import obtener_similitud
+from equipos import obtener_tabla_equipos, METRICAS_DNA
+from instrumentacion import instrumentar
 
 # 🔹 COMPARACIÓN DE JUGADORES (Para el Tab 3)
-def compare_players(df, p1, p2):
+@instrumentar()
+def compare_players(df, p1, p2, indice=None, almacen=None):
     cols = ['xG', 'xAG', 'PrgP', 'Carries', 'Tkl+Int']
-    if p1 not in df['Player'].values or p2 not in df['Player'].values:
+    if almacen is not None:
+        # Lectura directa de la matriz compacta (sin construir Series)
+        r1, r2 = almacen.registro(p1), almacen.registro(p2)
+        if r1 is None or r2 is None:
+            return pd.DataFrame()
+        return pd.DataFrame({p1: almacen.valores_fila(r1.fila, cols), p2: almacen.valores_fila(r2.fila, cols)}, index=cols)
+    
+    indice = obtener_indice(df, indice)
+    if not indice.contiene(p1) or not indice.contiene(p2):
         return pd.DataFrame()
     
-    p1_data = df[df['Player'] == p1][cols].iloc[0]
-    p2_data = df[df['Player'] == p2][cols].iloc[0]
+    p1_data = indice.fila(df, p1)[cols]
+    p2_data = indice.fila(df, p2)[cols]
     
     return pd.DataFrame({p1: p1_data, p2: p2_data})
 
 # 🔹 JUGADORES SIMILARES (Corregido para la UI)
-def jugadores_similares(df, jugador, n=4):
-    base = df[df['Player'] == jugador]
-    if base.empty:
-        return pd.DataFrame()
-    
-    pos = base['Pos'].values[0]
-    features = ['xG','xAG','Carries','PrgDist','PrgP']
+@instrumentar()
+def jugadores_similares(df, jugador, n=4, indice=None, similitud=None):
+    if similitud is None:
+        similitud = obtener_similitud(df, indice=indice)
     
-    # Filtrar por misma posición y excluir al mismo jugador
-    pool = df[(df['Pos'] == pos) & (df['Player'] != jugador)].copy()
-    if pool.empty:
+    # Top-N por similitud de coseno dentro de la misma posición (índice precalculado)
+    filas, sims = similitud.similares(jugador, n)
+    if len(filas) == 0:
         return pd.DataFrame()
     
-    # Calcular similitud de coseno
-    sim = cosine_similarity(base[features].fillna(0), pool[features].fillna(0))
-    pool['Similarity'] = sim[0]
-    
     # Devolver los N más similares con las columnas necesarias para el app
-    return pool.sort_values('Similarity', ascending=False).head(n)
+    pool = df.iloc[filas].copy()
+    pool['Similarity'] = sims
+    return pool
 
 # 🔹 ANÁLISIS DE EQUIPOS (Radar)
-def club_dna_vector(df, team):
-    metrics = ['xG','xAG','PrgP','PrgDist','Carries','Tkl+Int']
-    team_df = df[df['Squad'] == team]
-    if team_df.empty:
+@instrumentar()
+def club_dna_vector(df, team, tabla=None):
+    metrics = METRICAS_DNA
+    tabla = obtener_tabla_equipos(df, tabla)
+    if team not in tabla.index:
         return pd.Series([0]*len(metrics), index=metrics)
-    return team_df[metrics].mean()
+    return tabla.loc[team, metrics].astype(float).rename(None)
 
-def radar_data(df, team):
-    cdv = club_dna_vector(df, team)
+@instrumentar()
+def radar_data(df, team, tabla=None):
+    cdv = club_dna_vector(df, team, tabla)
     return cdv.index.tolist(), cdv.values.tolist()
 
 # 🔹 PREDICCIÓN DE ENCUENTRO
-def matchup_predictor(df, team1, team2):
-    metrics = ['xG','xAG','PrgP','PrgDist','Carries','Tkl+Int']
-    t1_score = df[df['Squad']==team1][metrics].mean().sum()
-    t2_score = df[df['Squad']==team2][metrics].mean().sum()
+@instrumentar()
+def matchup_predictor(df, team1, team2, tabla=None):
+    # Volumen de juego precalculado en la tabla de equipos (0 si no existe)
+    tabla = obtener_tabla_equipos(df, tabla)
+    t1_score = tabla['DNA_Total'].get(team1, 0)
+    t2_score = tabla['DNA_Total'].get(team2, 0)
     
     if t1_score > t2_score:
         return f"Ventaja táctica para {team1} (Basado en volumen de juego)"
@@ -59,14 +70,23 @@ def matchup_predictor(df, team1, team2):
 import plotly.graph_objects as go
 
 # 🔹 COMPARACIÓN DE JUGADORES (Corregida para devolver un gráfico)
-def compare_players(df, p1, p2):
+@instrumentar()
+def compare_players(df, p1, p2, indice=None, almacen=None):
     cols = ['xG', 'xAG', 'PrgP', 'Carries', 'Tkl+Int']
-    
-    if p1 not in df['Player'].values or p2 not in df['Player'].values:
-        return None
-    
-    p1_data = df[df['Player'] == p1][cols].iloc[0].values.tolist()
-    p2_data = df[df['Player'] == p2][cols].iloc[0].values.tolist()
+    if almacen is not None:
+        r1, r2 = almacen.registro(p1), almacen.registro(p2)
+        if r1 is None or r2 is None:
+            return None
+        p1_data = almacen.valores_fila(r1.fila, cols).tolist()
+        p2_data = almacen.valores_fila(r2.fila, cols).tolist()
+    else:
+        indice = obtener_indice(df, indice)
+        
+        if not indice.contiene(p1) or not indice.contiene(p2):
+            return None
+        
+        p1_data = indice.fila(df, p1)[cols].values.tolist()
+        p2_data = indice.fila(df, p2)[cols].values.tolist()
     
     fig = go.Figure()
 